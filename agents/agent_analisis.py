@@ -4,22 +4,37 @@
 # =============================================================================
 
 from .base_agent import BaseAgent
-from typing import Dict, Any, List
-from openai import OpenAI
+from typing import Dict, Any
 from config.settings import Config
+from services.llm_gateway import obtener_gateway
+from database.resultado import ResultadoConsulta
+from .analizadores_reglas import REGISTRO_ANALIZADORES
+from .resumen_resultados import resumir_resultados
 
 class AgentAnalisis(BaseAgent):
     def __init__(self):
         super().__init__("Analisis")
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.llm = obtener_gateway()
     
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        resultados = data.get("resultados", [])
+        resultados = data.get("resultados") or ResultadoConsulta.vacio()
         sql_ejecutada = data.get("sql", "")
         texto_usuario = data.get("texto_original", "")
         
         self.log_info("Iniciando análisis de resultados")
         
+        # Consultas predefinidas con reglas locales: sin llamada al LLM
+        analisis_reglas = REGISTRO_ANALIZADORES.analizar(
+            data.get("nombre_consulta"), resultados, data.get("umbrales")
+        )
+        if analisis_reglas is not None:
+            self.log_info(f"Análisis por reglas: {data.get('nombre_consulta')}")
+            return {
+                "analisis": analisis_reglas,
+                "procesado_por": "Reglas",
+                "exito": True
+            }
+        
         try:
             analisis = await self._generar_analisis(texto_usuario, sql_ejecutada, resultados)
             
@@ -37,8 +52,8 @@ class AgentAnalisis(BaseAgent):
                 "exito": False
             }
     
-    async def _generar_analisis(self, texto_usuario: str, sql: str, resultados: List[Dict]) -> str:
-        # Formatear resultados (máximo 5 filas)
+    async def _generar_analisis(self, texto_usuario: str, sql: str, resultados: ResultadoConsulta) -> str:
+        # Resumen estadístico de todas las filas con tamaño acotado
         resumen_resultados = self._formatear_resultados(resultados)
         
         prompt = f"""
@@ -50,7 +65,8 @@ RESULTADOS:
 Proporciona un análisis breve, técnico y claro (máximo 3-4 líneas). Indica si los datos muestran un problema o si todo está dentro de lo esperado.
 """
         
-        respuesta = self.client.chat.completions.create(
+        return await self.llm.completar(
+            self.name,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "Eres un DBA experto en Oracle. Tus análisis deben ser técnicos, concisos y enfocados solo en los resultados SQL. Máximo 3-4 líneas."},
@@ -60,22 +76,6 @@ Proporciona un análisis breve, técnico y claro (máximo 3-4 líneas). Indica s
             max_tokens=300,
             n=1
         )
-        
-        return respuesta.choices[0].message.content.strip()
     
-    def _formatear_resultados(self, resultados: List[Dict], max_filas: int = 5) -> str:
-        if not resultados:
-            return "La consulta no devolvió resultados."
-        
-        resumen = ""
-        filas_mostrar = resultados[:max_filas]
-        
-        for fila in filas_mostrar:
-            fila_texto = ", ".join(f"{k}={v}" for k, v in fila.items())
-            resumen += fila_texto + "\n"
-        
-        if len(resultados) > max_filas:
-            resumen += f"... (se muestran {max_filas} de {len(resultados)} filas)\n"
-        
-        return resumen
-
+    def _formatear_resultados(self, resultados: ResultadoConsulta) -> str:
+        return resumir_resultados(resultados)
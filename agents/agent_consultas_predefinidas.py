@@ -4,65 +4,25 @@
 # =============================================================================
 
 from .base_agent import BaseAgent
+from .catalogo_consultas import CatalogoConsultas, normalizar_texto
+from config.settings import Config
 from typing import Dict, Any
-import unicodedata
-import re
 
 class AgentConsultasPredefinidas(BaseAgent):
-    def __init__(self):
+    def __init__(self, catalogo: CatalogoConsultas = None):
         super().__init__("ConsultasPredefinidas")
-        self.consultas_predefinidas = {
-            "estado_bd": {
-                "patrones": [
-                    "estado de la base",
-                    "estado de la base de datos", 
-                    "estado general",
-                    "estado del sistema",
-                    "revisar base de datos"
-                ],
-                "sql": """
-SELECT INST_ID,
-       INSTANCE_NUMBER,
-       INSTANCE_NAME,
-       HOST_NAME,
-       VERSION,
-       TO_CHAR(STARTUP_TIME, 'DD-MON-YYYY HH24:MI:SS') AS INICIADA,
-       STATUS,
-       PARALLEL,
-       THREAD#,
-       ARCHIVER,
-       DATABASE_STATUS
-FROM GV$INSTANCE
-ORDER BY THREAD#""",
-                "tipo": "predefinida"
-            },
-            "procesos_sesiones": {
-                "patrones": [
-                    "estatus de procesos",
-                    "estatus de sesiones",
-                    "umbrales procesos",
-                    "umbrales de procesos",
-                    "umbrales sesiones",
-                    "limite de sesiones",
-                    "limite de procesos"
-                ],
-                "sql": """
-SELECT INST_ID,
-       resource_name,
-       current_utilization,
-       max_utilization,
-       limit_value
-FROM GV$RESOURCE_LIMIT
-WHERE resource_name IN ('sessions', 'processes', 'transactions')
-ORDER BY resource_name, INST_ID""",
-                "tipo": "predefinida"
-            }
-        }
+        # Catálogo externo (JSON/YAML) que se recarga al cambiar el archivo
+        self.catalogo = catalogo or CatalogoConsultas(
+            Config.CATALOGO_CONSULTAS_RUTA,
+            Config.CATALOGO_RECARGA_INTERVALO
+        )
+    
+    @property
+    def consultas_predefinidas(self) -> Dict[str, Dict[str, Any]]:
+        return self.catalogo.consultas
     
     def normalizar_texto(self, texto: str) -> str:
-        texto = unicodedata.normalize('NFKD', texto)
-        texto = texto.encode('ASCII', 'ignore').decode('utf-8')
-        return re.sub(r"[¿?¡!]", "", texto).lower().strip()
+        return normalizar_texto(texto)
     
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         texto_usuario = data.get("texto", "")
@@ -70,22 +30,36 @@ ORDER BY resource_name, INST_ID""",
         
         self.log_info(f"Analizando consulta: {texto_normalizado}")
         
-        # Verificar si coincide con alguna consulta predefinida
-        for nombre_consulta, config in self.consultas_predefinidas.items():
-            for patron in config["patrones"]:
-                if patron in texto_normalizado:
-                    self.log_info(f"Consulta predefinida encontrada: {nombre_consulta}")
-                    return {
-                        "tipo": "predefinida",
-                        "sql": config["sql"].strip(),
-                        "nombre_consulta": nombre_consulta,
-                        "procesado_por": self.name
-                    }
+        # Buscar en una sola pasada la coincidencia más específica del catálogo
+        nombre_consulta, config, tiempo_match_ms = self.catalogo.buscar(texto_normalizado)
+        self.log_info(f"Búsqueda en catálogo: {tiempo_match_ms:.3f} ms")
+        
+        parametros = self.catalogo.extraer_parametros(config, texto_usuario) if config is not None else None
+        if nombre_consulta is not None and parametros is None:
+            # Plantilla sin todos sus valores en el texto: que la resuelva otro camino
+            self.log_info(f"Plantilla {nombre_consulta} sin parámetros válidos en el texto")
+            nombre_consulta = None
+
+        if nombre_consulta is not None:
+            self.log_info(f"Consulta predefinida encontrada: {nombre_consulta}")
+            return {
+                "tipo": "predefinida",
+                "sql": config["sql"],
+                "nombre_consulta": nombre_consulta,
+                # Segundos que puede reutilizarse el resultado (0 = sin caché)
+                "ttl": config.get("ttl", 0),
+                # Umbrales del analizador por reglas (si la consulta tiene uno)
+                "umbrales": config.get("umbrales", {}),
+                # Valores de las variables bind de una plantilla ({} si no tiene)
+                "parametros": parametros,
+                "tiempo_match_ms": tiempo_match_ms,
+                "procesado_por": self.name
+            }
         
         # No es una consulta predefinida
         return {
             "tipo": "personalizada",
             "texto": texto_usuario,
+            "tiempo_match_ms": tiempo_match_ms,
             "procesado_por": self.name
         }
-
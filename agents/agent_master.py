@@ -7,11 +7,29 @@ from .base_agent import BaseAgent
 from .agent_consultas_predefinidas import AgentConsultasPredefinidas
 from .agent_sql_generator import AgentSQLGenerator
 from .agent_analisis import AgentAnalisis
+from .agent_router import AgentRouterIntenciones
 from .agent_saludo import AgentSaludo  # Importar el nuevo agente de saludo
-from database.oracle_executor import OracleExecutor
-from typing import Dict, Any
+from .agent_seguimiento import AgentSeguimiento
+from .pipeline import Pipeline, Etapa, ErrorEtapa
+from database.oracle_executor import (
+    OracleExecutor, ColaOracleLlenaError, obtener_pool_compartido, es_error_transitorio
+)
+from database.guardia_sql import GuardiaSQL
+from database.destinos import obtener_registro_destinos
+from database.exportacion import ArchivoExportado, detectar_formato, escribir_filas
+from .catalogo_consultas import normalizar_texto
+from database.resultado import ResultadoConsulta
+from cache.resultados import CacheResultados
+from services.recolector import RecolectorMonitoreo, describir_ventana, detectar_ventana
+from services.metricas import medir, anotar, SOLICITUDES
+from config.settings import Config
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
 import asyncio
 
+MAX_LENGTH = 4000
+MAX_LEYENDA = 1024  # límite de Telegram para el texto de un documento
+ENCABEZADO_ANALISIS = "\n\n🧠 Análisis experto:\n"
+
 class AgentMaster(BaseAgent):
     def __init__(self):
         super().__init__("Master")
@@ -19,15 +37,59 @@ class AgentMaster(BaseAgent):
         # Inicializar agentes especializados
         self.agent_saludo = AgentSaludo()  # Instanciar el agente de saludo
         self.agent_consultas = AgentConsultasPredefinidas()
+        # El router comparte el catálogo (y su recarga) con el agente de predefinidas
+        self.agent_router = AgentRouterIntenciones(self.agent_consultas.catalogo)
         self.agent_sql_generator = AgentSQLGenerator()
         self.agent_analisis = AgentAnalisis()
-        self.oracle_executor = OracleExecutor()
+        # Último resultado de cada chat para refinarlo sin volver a Oracle ni al LLM
+        self.agent_seguimiento = AgentSeguimiento()
+        # Todas las solicitudes comparten el mismo pool de conexiones Oracle
+        self.oracle_executor = OracleExecutor(pool=obtener_pool_compartido())
+        self.cache_resultados = CacheResultados()
+        # Revisión de coste de la SQL generada (las predefinidas son de confianza)
+        self.guardia_sql = GuardiaSQL(pool=self.oracle_executor.pool, motor=self.oracle_executor.motor)
+        # Bases adicionales con nombre/etiquetas para consultas en varias a la vez
+        self.destinos = obtener_registro_destinos()
+        # Muestreo en segundo plano de las consultas de monitoreo del catálogo
+        self.recolector = RecolectorMonitoreo(self.agent_consultas.catalogo, self.oracle_executor.pool)
+
+        self.pipeline = Pipeline()
+        self._registrar_etapas()
+
+    def _registrar_etapas(self):
+        # Flujo por defecto como etapas declarativas: cada una dice qué lee y qué deja en el
+        # contexto; un agente nuevo se enchufa con `self.pipeline.registrar(Etapa(...))`
+        self.pipeline.registrar(Etapa("saludo", self._etapa_saludo, produce=("respuesta",), requiere=("texto",)))
+        self.pipeline.registrar(Etapa("seguimiento", self._etapa_seguimiento, produce=("respuesta",),
+                                      despues=("saludo",), opcional=True))
+        self.pipeline.registrar(Etapa("predefinidas", self._etapa_predefinidas, produce=("consulta_catalogo",),
+                                      despues=("seguimiento",)))
+        self.pipeline.registrar(Etapa("router", self._etapa_router, produce=("consulta_catalogo",),
+                                      despues=("predefinidas",), excluye=("consulta_catalogo",), opcional=True))
+        # La generación no espera a que catálogo y router decidan: si tardan más que el margen
+        # arranca ya y se cancela si al final la pregunta tenía consulta en el catálogo
+        self.pipeline.registrar(Etapa("generacion_sql", self._etapa_generacion_sql,
+                                      produce=("sql_generada", "respuesta"), requiere=("texto",),
+                                      excluye=("consulta_catalogo",), timeout=Config.PIPELINE_TIMEOUT_GENERACION,
+                                      especulativa=Config.PIPELINE_ESPECULACION,
+                                      especular_tras=Config.PIPELINE_ESPECULAR_TRAS / 1000))
+        self.pipeline.registrar(Etapa("guardia", self._etapa_guardia, produce=("consulta_generada", "respuesta"),
+                                      requiere=("sql_generada",), timeout=Config.PIPELINE_TIMEOUT_GUARDIA))
+        self.pipeline.registrar(Etapa("plan", self._etapa_plan, produce=("plan",),
+                                      requiere_alguna=("consulta_catalogo", "consulta_generada")))
+        self.pipeline.registrar(Etapa("exportacion", self._etapa_exportacion, produce=("respuesta",),
+                                      requiere=("plan",), condicion=lambda ctx: ctx["plan"]["exportar"]))
+        self.pipeline.registrar(Etapa("ejecucion", self._etapa_ejecucion, produce=("resultados",),
+                                      requiere=("plan",), condicion=lambda ctx: not ctx["plan"]["exportar"]))
+        self.pipeline.registrar(Etapa("responder", self._etapa_responder, produce=("respuesta",),
+                                      requiere=("resultados",)))
 
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         texto_usuario = data.get("texto", "").strip()
         chat_id = data.get("chat_id")
 
         self.log_info(f"Procesando solicitud del chat {chat_id}")
+        self.recolector.asegurar_inicio()
 
         if not texto_usuario:
             return {
@@ -36,65 +98,468 @@ class AgentMaster(BaseAgent):
             }
 
         try:
-            # Paso 1: Verificar si es un saludo (prioritario)
-            resultado_saludo = await self.agent_saludo.process({"texto": texto_usuario, "chat_id": chat_id})
-            if resultado_saludo["exito"]:  # Si es un saludo, responder y salir
-                return resultado_saludo
-
-            # Paso 2: Verificar si es consulta predefinida
-            resultado_consulta = await self.agent_consultas.process({"texto": texto_usuario})
-
-            # Paso 3: Generar SQL (predefinida o personalizada)
-            if resultado_consulta["tipo"] == "predefinida":
-                sql_a_ejecutar = resultado_consulta["sql"]
-                self.log_info(f"Usando consulta predefinida: {resultado_consulta['nombre_consulta']}")
+            contexto = await self.pipeline.ejecutar({
+                "texto": texto_usuario,
+                "texto_normalizado": normalizar_texto(texto_usuario),
+                "chat_id": chat_id,
+                "enviar": data.get("enviar"),
+                "editar": data.get("editar"),
+                "enviar_documento": data.get("enviar_documento"),
+            })
+            if "respuesta" not in contexto:
+                raise ErrorEtapa("Ninguna etapa produjo una respuesta")
+            return contexto["respuesta"]
+
+        except Exception as e:
+            self.log_error(f"Error en procesamiento: {str(e)}")
+            SOLICITUDES.inc(resultado="error")
+            anotar(error=str(e))
+            return {
+                "respuesta": f"❌ Error detectado:\n{str(e)}",
+                "exito": False
+            }
+
+    # -------------------------------------------------------------------------
+    # Etapas del flujo por defecto (leen del contexto y devuelven lo que producen)
+    # -------------------------------------------------------------------------
+
+    async def _etapa_saludo(self, ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Paso 1: Verificar si es un saludo (prioritario)
+        resultado_saludo = await self.agent_saludo.process({"texto": ctx["texto"], "chat_id": ctx["chat_id"]})
+        if resultado_saludo["exito"]:
+            SOLICITUDES.inc(resultado="saludo")
+            return {"respuesta": resultado_saludo}
+        return None
+
+    async def _etapa_seguimiento(self, ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Paso 1b: Seguimiento sobre el último resultado del chat (filtrar, ordenar, paginar...)
+        resultado_seguimiento = await self.agent_seguimiento.process({"texto": ctx["texto"], "chat_id": ctx["chat_id"]})
+        if not resultado_seguimiento["exito"]:
+            return None
+        SOLICITUDES.inc(resultado="seguimiento")
+        with medir("formato"):
+            respuesta = resultado_seguimiento["encabezado"] + self._formatear_resultados(
+                resultado_seguimiento["resultados"]
+            )
+        return {"respuesta": {
+            "respuesta": respuesta,
+            "exito": True,
+            "sql_ejecutada": resultado_seguimiento["sql"],
+            "num_resultados": len(resultado_seguimiento["resultados"])
+        }}
+
+    async def _etapa_predefinidas(self, ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Paso 2: Verificar si es consulta predefinida
+        resultado_consulta = await self.agent_consultas.process({"texto": ctx["texto"]})
+        if resultado_consulta["tipo"] == "predefinida":
+            return {"consulta_catalogo": resultado_consulta}
+        return None
+
+    async def _etapa_router(self, ctx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Paso 2b: Sin coincidencia exacta, intentar el router local antes de pagar una llamada al LLM
+        resultado_consulta = await self.agent_router.process({"texto": ctx["texto"]})
+        if resultado_consulta["tipo"] == "predefinida":
+            return {"consulta_catalogo": resultado_consulta}
+        return None
+
+    async def _etapa_generacion_sql(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        # Paso 3: Generar SQL personalizada
+        resultado_sql = await self.agent_sql_generator.process({"texto": ctx["texto"]})
+        if not resultado_sql.get("exito", False):
+            SOLICITUDES.inc(resultado="error_generacion")
+            return {"respuesta": {
+                "respuesta": f"❌ Error generando SQL: {resultado_sql.get('error', 'Error desconocido')}",
+                "exito": False
+            }}
+        return {"sql_generada": resultado_sql}
+
+    async def _etapa_guardia(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        resultado_sql = ctx["sql_generada"]
+        sql = resultado_sql["sql"]
+        anotar(origen_sql=self.agent_sql_generator.name, sql_desde_cache=resultado_sql.get("desde_cache", False))
+        self.log_info("Usando SQL generada por IA")
+
+        # Paso 3b: Revisar tipo de sentencia y plan antes de tocar la base de datos
+        limitar = None
+        if Config.GUARDIA_ACTIVA:
+            # Con varios destinos el plan se revisa en cada uno: basta que uno lo rechace
+            destinos = self.destinos.resolver(ctx["texto_normalizado"])
+            if destinos:
+                veredictos = await asyncio.gather(*(self.destinos.guardia(d).evaluar(sql) for d in destinos))
+                revisiones = list(zip(destinos, veredictos))
             else:
-                # Generar SQL personalizada
-                resultado_sql = await self.agent_sql_generator.process({"texto": texto_usuario})
-                if not resultado_sql.get("exito", False):
-                    return {
-                        "respuesta": f"❌ Error generando SQL: {resultado_sql.get('error', 'Error desconocido')}",
-                        "exito": False
-                    }
-                sql_a_ejecutar = resultado_sql["sql"]
-                self.log_info("Usando SQL generada por IA")
-
-            # Paso 4: Ejecutar SQL
+                revisiones = [(None, await self.guardia_sql.evaluar(sql))]
+            # El veredicto más restrictivo decide: rechazo antes que límite
+            destino, veredicto = min(revisiones, key=lambda r: (r[1].permitido, r[1].accion != "limitar"))
+            anotar(guardia=veredicto.accion, coste_plan=veredicto.coste)
+            if not veredicto.permitido:
+                SOLICITUDES.inc(resultado="rechazada")
+                await self.agent_sql_generator.descartar(resultado_sql)
+                motivo = f"{destino}: {veredicto.motivo}" if destino else veredicto.motivo
+                return {"respuesta": {
+                    "respuesta": f"🛑 Consulta rechazada por seguridad:\n{motivo}\n\nSQL generada:\n{sql}",
+                    "exito": False,
+                    "sql_ejecutada": None
+                }}
+            if veredicto.accion == "limitar":
+                limitar = True
+        return {"consulta_generada": {"sql": sql, "limitar": limitar}}
+
+    async def _etapa_plan(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        # Qué se ejecuta, dónde y cómo se entrega
+        plan: Dict[str, Any] = {"ttl": 0, "limitar": None, "contexto_analisis": {}, "nombre_consulta": None,
+                                "parametros": {}, "sql_generada": None}
+        resultado_consulta = ctx.get("consulta_catalogo")
+        if resultado_consulta is not None:
+            plan["sql"] = resultado_consulta["sql"]
+            plan["ttl"] = resultado_consulta.get("ttl", 0)
+            plan["nombre_consulta"] = resultado_consulta["nombre_consulta"]
+            # Plantillas: los valores del texto viajan como binds, nunca dentro de la SQL
+            plan["parametros"] = resultado_consulta.get("parametros") or {}
+            plan["contexto_analisis"] = {
+                "nombre_consulta": resultado_consulta["nombre_consulta"],
+                "umbrales": resultado_consulta.get("umbrales", {})
+            }
+            anotar(origen_sql=resultado_consulta["procesado_por"], consulta=resultado_consulta["nombre_consulta"])
+            if plan["parametros"]:
+                anotar(parametros=sorted(plan["parametros"]))
+            self.log_info(f"Usando consulta predefinida: {resultado_consulta['nombre_consulta']}")
+        else:
+            plan["sql"] = ctx["consulta_generada"]["sql"]
+            plan["limitar"] = ctx["consulta_generada"]["limitar"]
+            plan["sql_generada"] = ctx["sql_generada"]
+
+        # Paso 4: En la base principal o a la vez en varios destinos
+        plan["destinos"] = self.destinos.resolver(ctx["texto_normalizado"])
+        # Paso 4b: Exportación pedida explícitamente: el resultado completo va como documento
+        plan["formato_exportacion"] = detectar_formato(ctx["texto_normalizado"])
+        plan["exportar"] = bool(
+            plan["formato_exportacion"] and ctx.get("enviar_documento") is not None and not plan["destinos"]
+        )
+        return {"plan": plan}
+
+    async def _etapa_exportacion(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        plan = ctx["plan"]
+        try:
+            leyenda = await self._exportar_y_enviar(plan["sql"], plan["formato_exportacion"],
+                                                    ctx["enviar_documento"], plan["parametros"])
+        except Exception as e:
+            await self._registrar_sql_generada(plan, e)
+            raise
+        await self._registrar_sql_generada(plan)
+        SOLICITUDES.inc(resultado="exportacion")
+        return {"respuesta": {
+            "respuesta": leyenda,
+            "exito": True,
+            "enviado": True,
+            "sql_ejecutada": plan["sql"]
+        }}
+
+    async def _etapa_ejecucion(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        plan = ctx["plan"]
+        sql_a_ejecutar, destinos, parametros = plan["sql"], plan["destinos"], plan["parametros"]
+        # Misma plantilla con otros valores es otro resultado
+        clave_resultado = sql_a_ejecutar + "".join(f"\x1f{k}={v!r}" for k, v in sorted(parametros.items()))
+        if destinos:
+            self.log_info(f"Ejecutando SQL en {len(destinos)} destinos: {', '.join(destinos)}")
+            anotar(destinos=destinos)
+            clave_resultado += "\x1f" + ",".join(destinos)
+            ejecutar = lambda: self.destinos.ejecutar_en(
+                sql_a_ejecutar, destinos, parametros=parametros, limitar=plan["limitar"]
+            )
+        else:
             self.log_info(f"Ejecutando SQL: {sql_a_ejecutar[:50]}...")
-            resultados = await self.oracle_executor.ejecutar_sql(sql_a_ejecutar)
+            ejecutar = lambda: self.oracle_executor.ejecutar_sql(
+                sql_a_ejecutar, limitar=plan["limitar"], parametros=parametros
+            )
+        resultados, ventana_sin_datos = None, None
+        if plan["nombre_consulta"] and not destinos and not parametros:
+            with medir("recolector"):
+                resultados, ventana_sin_datos = self._desde_recolector(
+                    plan["nombre_consulta"], ctx["texto_normalizado"], plan["contexto_analisis"]
+                )
+        if resultados is None:
+            try:
+                with medir("oracle"):
+                    if plan["ttl"] > 0:
+                        # Consultas de monitoreo: peticiones idénticas comparten ejecución y resultado
+                        resultados = await self.cache_resultados.obtener_o_ejecutar(
+                            clave_resultado, plan["ttl"], ejecutar
+                        )
+                    else:
+                        resultados = await ejecutar()
+            except Exception as e:
+                await self._registrar_sql_generada(plan, e)
+                raise
+            await self._registrar_sql_generada(plan)
+        if ventana_sin_datos is not None:
+            # Se pidió una tendencia y solo hay estado actual: que el usuario lo sepa. Copia
+            # porque el resultado puede estar compartido en la caché de resultados
+            resultados = ResultadoConsulta(
+                resultados.columnas, resultados.filas, hay_mas=resultados.hay_mas, total=resultados.total,
+                obtenido_en=resultados.obtenido_en,
+                avisos=resultados.avisos + [
+                    f"historial de {describir_ventana(ventana_sin_datos)} (aún no hay muestras en "
+                    "memoria); se muestra el estado actual"
+                ],
+            )
+        anotar(filas=len(resultados), hay_mas=resultados.hay_mas)
+        self.agent_seguimiento.recordar(ctx["chat_id"], resultados, sql_a_ejecutar, ctx["texto"])
+        return {"resultados": resultados}
 
-            # Paso 5: Analizar resultados
-            resultado_analisis = await self.agent_analisis.process({
-                "resultados": resultados,
-                "sql": sql_a_ejecutar,
-                "texto_original": texto_usuario
-            })
+    async def _registrar_sql_generada(self, plan: Dict[str, Any], error: Optional[Exception] = None):
+        # La caché de SQL generada solo conserva lo que llegó a ejecutarse bien
+        resultado_sql = plan["sql_generada"]
+        if resultado_sql is None:
+            return
+        if error is None:
+            await self.agent_sql_generator.confirmar(resultado_sql)
+        elif not isinstance(error, ColaOracleLlenaError) and not es_error_transitorio(error):
+            # Base caída o saturada no dice nada de la SQL: solo se olvida si falló ella
+            await self.agent_sql_generator.descartar(resultado_sql)
+
+    async def _etapa_responder(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        plan, resultados, texto_usuario = ctx["plan"], ctx["resultados"], ctx["texto"]
+        sql_a_ejecutar = plan["sql"]
 
-            # Paso 6: Formatear respuesta final
+        # Con callbacks de envío/edición los datos salen ya y el análisis llega después
+        enviar, editar = ctx.get("enviar"), ctx.get("editar")
+        enviar_documento = ctx.get("enviar_documento")
+        if enviar is not None and editar is not None:
+            # Resultados que no caben en el chat: además se envían completos como archivo
+            # (solo se vuelve a la base si el resultado quedó cortado por hay_mas)
+            exportar = (
+                enviar_documento is not None and not plan["destinos"]
+                and (resultados.hay_mas or len(resultados) >= Config.EXPORTAR_UMBRAL_FILAS)
+            )
+            return {"respuesta": await self._responder_en_dos_fases(
+                resultados, sql_a_ejecutar, texto_usuario, enviar, editar, plan["contexto_analisis"],
+                enviar_documento if exportar else None, plan["parametros"]
+            )}
+
+        # Paso 5: Analizar resultados
+        resultado_analisis = await self._analizar_con_medicion(
+            resultados, sql_a_ejecutar, texto_usuario, plan["contexto_analisis"]
+        )
+
+        # Paso 6: Formatear respuesta final
+        with medir("formato"):
             respuesta_final = self._formatear_respuesta_final(
                 resultados,
                 resultado_analisis.get("analisis", "Análisis no disponible")
             )
 
-            self.log_info("Procesamiento completado exitosamente")
+        self.log_info("Procesamiento completado exitosamente")
+        SOLICITUDES.inc(resultado="exito")
 
-            return {
-                "respuesta": respuesta_final,
-                "exito": True,
-                "sql_ejecutada": sql_a_ejecutar,
-                "num_resultados": len(resultados)
-            }
+        return {"respuesta": {
+            "respuesta": respuesta_final,
+            "exito": True,
+            "sql_ejecutada": sql_a_ejecutar,
+            "num_resultados": len(resultados)
+        }}
 
+    def _desde_recolector(self, nombre_consulta: str, texto_normalizado: str,
+                          contexto_analisis: Dict[str, Any]) -> Tuple[Optional[ResultadoConsulta], Optional[int]]:
+        # Consultas muestreadas en segundo plano: la respuesta sale de memoria, sin tocar la base.
+        # Devuelve también la ventana pedida si era una tendencia que no se pudo servir
+        if not self.recolector.muestrea(nombre_consulta):
+            return None, None
+        segundos = detectar_ventana(texto_normalizado)
+        if segundos is not None:
+            resultados = self.recolector.tendencia(nombre_consulta, segundos)
+            if resultados is not None:
+                # La tabla de tendencia no tiene la forma que esperan las reglas: la analiza el LLM
+                contexto_analisis["nombre_consulta"] = None
+                anotar(origen_datos="recolector", ventana_s=segundos)
+                return resultados, None
+            anotar(tendencia_sin_datos=segundos)
+        resultados = self.recolector.instantanea(nombre_consulta)
+        if resultados is not None:
+            anotar(origen_datos="recolector")
+        return resultados, segundos
+
+    async def _responder_en_dos_fases(self, resultados: ResultadoConsulta, sql: str, texto_usuario: str,
+                                      enviar: Callable[[str], Awaitable[Any]],
+                                      editar: Callable[[Any, str], Awaitable[Any]],
+                                      contexto_analisis: Dict[str, Any],
+                                      enviar_documento: Optional[Callable[..., Awaitable[Any]]] = None,
+                                      parametros: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # El análisis arranca antes de enviar los datos para solapar ambas esperas
+        tarea_analisis = asyncio.ensure_future(
+            self._analizar_con_medicion(resultados, sql, texto_usuario, contexto_analisis)
+        )
+
+        with medir("formato"):
+            texto_resultados = self._formatear_resultados(resultados)
+        try:
+            mensaje_id = await enviar(texto_resultados + ENCABEZADO_ANALISIS + "⏳ Generando análisis...")
+        except BaseException:
+            # Sin mensaje que editar el análisis no tiene destino: no debe seguir gastando LLM
+            tarea_analisis.cancel()
+            raise
+        self.log_info("Resultados enviados; esperando análisis")
+
+        # La exportación completa corre a la vez que el análisis
+        tarea_exportacion = None
+        if enviar_documento is not None:
+            tarea_exportacion = asyncio.ensure_future(
+                self._exportar_con_aviso(sql, Config.EXPORTAR_FORMATO, enviar_documento, enviar, parametros,
+                                         resultados)
+            )
+
+        completado = False
+        try:
+            try:
+                resultado_analisis = await asyncio.wait_for(tarea_analisis, timeout=Config.ANALISIS_TIMEOUT)
+                analisis_ok = resultado_analisis.get("exito", False)
+                analisis = resultado_analisis.get("analisis", "Análisis no disponible")
+            except asyncio.TimeoutError:
+                self.log_error(f"Análisis sin respuesta tras {Config.ANALISIS_TIMEOUT}s")
+                analisis_ok, analisis = False, "Análisis no disponible"
+
+            # Los datos ya enviados nunca se pierden: solo cambia la sección de análisis
+            if not analisis_ok:
+                analisis = "⚠️ " + analisis
+            texto_final = texto_resultados + ENCABEZADO_ANALISIS + analisis
+            try:
+                if len(texto_final) <= MAX_LENGTH:
+                    await editar(mensaje_id, texto_final)
+                else:
+                    await editar(mensaje_id, texto_resultados + ENCABEZADO_ANALISIS + "⬇️ En el siguiente mensaje.")
+                    await enviar(ENCABEZADO_ANALISIS.strip() + "\n" + analisis)
+            except Exception as e:
+                self.log_error(f"No se pudo actualizar el mensaje con el análisis: {str(e)}")
+                if analisis_ok:
+                    await enviar(ENCABEZADO_ANALISIS.strip() + "\n" + analisis)
+            completado = True
+        finally:
+            if tarea_exportacion is not None:
+                if not completado:
+                    # Solicitud fallida o cancelada: la exportación no debe quedar suelta
+                    tarea_exportacion.cancel()
+                try:
+                    await tarea_exportacion
+                except asyncio.CancelledError:
+                    if completado:
+                        raise
+
+        SOLICITUDES.inc(resultado="exito")
+        return {
+            "respuesta": texto_final,
+            "exito": True,
+            "enviado": True,
+            "sql_ejecutada": sql,
+            "num_resultados": len(resultados)
+        }
+
+    async def _exportar_y_enviar(self, sql: str, formato: str,
+                                 enviar_documento: Callable[..., Awaitable[Any]],
+                                 parametros: Optional[Dict[str, Any]] = None,
+                                 resultados: Optional[ResultadoConsulta] = None) -> str:
+        if resultados is not None and not resultados.hay_mas:
+            # Ya están todas las filas: repetir la consulta sería otra ejecución completa
+            archivo = escribir_filas(resultados.columnas, resultados.filas, formato, Config.EXPORTAR_DIRECTORIO,
+                                     Config.EXPORTAR_FILAS_VISTA_PREVIA)
+        else:
+            archivo = await self.oracle_executor.exportar_sql(sql, formato, parametros=parametros)
+        try:
+            anotar(filas_exportadas=archivo.filas, bytes_exportados=archivo.bytes)
+            if archivo.bytes > Config.EXPORTAR_MAX_BYTES:
+                raise Exception(
+                    f"El archivo ({archivo.bytes / 1024 / 1024:.1f} MB) supera el límite de "
+                    f"{Config.EXPORTAR_MAX_BYTES / 1024 / 1024:.0f} MB; acota la consulta"
+                )
+            leyenda = self._formatear_leyenda(archivo, formato)
+            with medir("telegram_documento"):
+                await enviar_documento(archivo.ruta, archivo.nombre, leyenda)
+            return leyenda
+        finally:
+            # El archivo temporal no sobrevive a la solicitud
+            archivo.eliminar()
+
+    async def _exportar_con_aviso(self, sql: str, formato: str, enviar_documento: Callable[..., Awaitable[Any]],
+                                  enviar: Callable[[str], Awaitable[Any]],
+                                  parametros: Optional[Dict[str, Any]] = None,
+                                  resultados: Optional[ResultadoConsulta] = None):
+        try:
+            with medir("exportacion"):
+                await self._exportar_y_enviar(sql, formato, enviar_documento, parametros, resultados)
         except Exception as e:
-            self.log_error(f"Error en procesamiento: {str(e)}")
-            return {
-                "respuesta": f"❌ Error detectado:\n{str(e)}",
-                "exito": False
-            }
+            self.log_error(f"Error exportando resultados: {str(e)}")
+            try:
+                await enviar(f"⚠️ No se pudo generar el archivo con todos los resultados:\n{str(e)}")
+            except Exception as e_envio:
+                self.log_error(f"No se pudo avisar del error de exportación: {str(e_envio)}")
 
-    def _formatear_respuesta_final(self, resultados: list, analisis: str) -> str:
+    def _formatear_leyenda(self, archivo: ArchivoExportado, formato_pedido: Optional[str] = None) -> str:
+        # Vista previa compacta: cabe en la leyenda del documento
+        MAX_LINEA = 120
+        tamano_kb = archivo.bytes / 1024
+        leyenda = f"📎 {archivo.filas} filas · {archivo.formato.upper()} · {tamano_kb:.0f} KB\n"
+        if formato_pedido and formato_pedido != archivo.formato:
+            # Sin openpyxl en el servidor el Excel pedido sale como CSV
+            leyenda += f"⚠️ {formato_pedido.upper()} no disponible en el servidor: se entrega en {archivo.formato.upper()}.\n"
+        if archivo.truncado:
+            leyenda += f"⚠️ Exportación limitada a {archivo.filas} filas.\n"
+        if archivo.vista_previa:
+            leyenda += "\n" + " | ".join(archivo.columnas)[:MAX_LINEA] + "\n"
+            for fila in archivo.vista_previa:
+                valores = " | ".join("NULL" if v is None else str(v) for v in fila)
+                leyenda += valores[:MAX_LINEA] + "\n"
+            if archivo.filas > len(archivo.vista_previa):
+                leyenda += f"… y {archivo.filas - len(archivo.vista_previa)} filas más en el archivo."
+        return leyenda[:MAX_LEYENDA]
+
+    async def _analizar_con_medicion(self, resultados: ResultadoConsulta, sql: str, texto_usuario: str,
+                                     contexto_analisis: Dict[str, Any]) -> Dict[str, Any]:
+        with medir("analisis"):
+            resultado_analisis = await self.agent_analisis.process({
+                "resultados": resultados,
+                "sql": sql,
+                "texto_original": texto_usuario,
+                **contexto_analisis
+            })
+        anotar(analisis_por=resultado_analisis.get("procesado_por"))
+        return resultado_analisis
+
+    def precalentar(self, antes_de_fork: bool = False) -> Dict[str, Any]:
+        # Datos de solo lectura construidos una vez (con gunicorn --preload, antes del fork,
+        # para que todos los workers los compartan en lugar de construirlos cada uno)
+        indice_esquema = self.agent_sql_generator.indice_esquema
+        if antes_de_fork and indice_esquema.num_vistas == 0:
+            # Sin copia en disco: se lee el diccionario una vez aquí y no una por worker
+            indice_esquema.refrescar()
+            # Ninguna conexión abierta debe cruzar el fork: cada worker abre las suyas
+            self.oracle_executor.pool.cerrar()
+        return {
+            "consultas": len(self.agent_consultas.catalogo.consultas),
+            "documentos_router": self.agent_router.precalentar(),
+            "vistas_esquema": indice_esquema.num_vistas,
+        }
+
+    def cerrar(self):
+        # Hook de apagado: libera las conexiones del pool compartido
+        self.oracle_executor.cerrar()
+        self.destinos.cerrar()
+
+    def _formatear_respuesta_final(self, resultados: ResultadoConsulta, analisis: str) -> str:
+        respuesta = self._formatear_resultados(resultados)
+
+        # Añadir análisis
+        respuesta += ENCABEZADO_ANALISIS + analisis
+
+        # Truncar si excede límite de Telegram
+        if len(respuesta) > MAX_LENGTH:
+            respuesta = respuesta[:MAX_LENGTH] + "\n\n⚠️ Resultado truncado por longitud."
+
+        return respuesta
+
+    def _formatear_resultados(self, resultados: ResultadoConsulta) -> str:
         MAX_VALUE_LEN = 100
-        MAX_LENGTH = 4000
+        MAX_FILAS = 5
+        # Deja espacio para la sección de análisis dentro del límite de Telegram
+        MAX_LENGTH_RESULTADOS = MAX_LENGTH - 1000
 
         if not resultados:
             respuesta = "✅ Consulta ejecutada correctamente, sin resultados."
@@ -102,20 +567,23 @@ class AgentMaster(BaseAgent):
             respuesta = "📊 Resultados:\n"
 
             # Mostrar máximo 5 filas
-            for fila in resultados[:5]:
+            for fila in resultados.filas_como_dict(MAX_FILAS):
                 for k, v in fila.items():
-                    v = "NULL" if v is None else str(v)
+                    v = "NULL" if v is None else v
                     if len(v) > MAX_VALUE_LEN:
                         v = v[:MAX_VALUE_LEN] + "..."
                     respuesta += f"🔸 {k.upper()}: {v}\n"
                 respuesta += "\n"
 
-        # Añadir análisis
-        respuesta += "\n\n🧠 Análisis experto:\n" + analisis
+            if len(resultados) > MAX_FILAS or resultados.hay_mas:
+                respuesta += f"ℹ️ Se muestran {MAX_FILAS} de {resultados.describir_tamano()}.\n"
 
-        # Truncar si excede límite de Telegram
-        if len(respuesta) > MAX_LENGTH:
-            respuesta = respuesta[:MAX_LENGTH] + "\n\n⚠️ Resultado truncado por longitud."
+        respuesta += f"🕒 Origen: {resultados.describir_antiguedad()}\n"
+        if resultados.avisos:
+            # Fallos parciales de una consulta en varios destinos
+            respuesta += "⚠️ Sin datos de: " + "; ".join(resultados.avisos) + "\n"
 
-        return respuesta
+        if len(respuesta) > MAX_LENGTH_RESULTADOS:
+            respuesta = respuesta[:MAX_LENGTH_RESULTADOS] + "\n⚠️ Resultado truncado por longitud.\n"
 
+        return respuesta
@@ -0,0 +1,187 @@
+# =============================================================================
+# ARCHIVO: agents/agent_router.py
+# Descripción: Router local de intenciones (TF-IDF de n-gramas de caracteres)
+#              que resuelve preguntas parecidas a las del catálogo sin llamar al LLM
+# =============================================================================
+
+from .base_agent import BaseAgent
+from .catalogo_consultas import CatalogoConsultas, normalizar_texto
+from config.settings import Config
+from typing import Dict, Any, List, Optional, Set, Tuple
+from collections import Counter, defaultdict
+import threading
+import math
+import time
+import re
+
+# Palabras vacías que no aportan a la intención
+PALABRAS_VACIAS = {
+    "de", "la", "el", "los", "las", "del", "al", "que", "y", "a", "en", "un", "una",
+    "me", "mi", "por", "para", "con", "se", "es", "lo", "le", "su", "favor", "cual",
+    "cuales", "como", "dame", "muestra", "muestrame", "quiero", "ver", "hay"
+}
+
+# Todo el bot habla de la base de datos: nombrarla no distingue una consulta de otra
+PALABRAS_DOMINIO = {"base", "datos", "bd", "bds", "oracle"}
+
+def extraer_palabras(texto_normalizado: str) -> List[str]:
+    return [p for p in re.findall(r"[a-z0-9_$#]+", texto_normalizado) if p not in PALABRAS_VACIAS]
+
+def raiz(palabra: str) -> str:
+    # Plural a singular aproximado: "sesiones" y "sesion", "activas" y "activa" cuentan igual
+    if len(palabra) > 4 and palabra.endswith("es"):
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith("s"):
+        return palabra[:-1]
+    return palabra
+
+def extraer_ngramas(texto_normalizado: str, n: int = 3) -> Counter:
+    palabras = extraer_palabras(texto_normalizado)
+    ngramas = Counter()
+    for palabra in palabras:
+        # Relleno con espacios para que inicios y finales de palabra pesen
+        relleno = f" {palabra} "
+        for i in range(len(relleno) - n + 1):
+            ngramas[relleno[i:i + n]] += 1
+    return ngramas
+
+class IndiceIntenciones:
+    def __init__(self, documentos: List[Tuple[str, str]], n: int = 3):
+        # documentos: (texto normalizado, nombre de consulta)
+        self.n = n
+        self._etiquetas: List[str] = []
+        # Índice invertido: n-grama -> [(documento, peso normalizado)]
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        self._idf: Dict[str, float] = {}
+        # Raíces de las palabras de contenido de cada consulta (para contrastar el ganador)
+        self.vocabulario: Dict[str, Set[str]] = defaultdict(set)
+        self._consultas_por_raiz: Dict[str, Set[str]] = defaultdict(set)
+
+        frecuencias = [extraer_ngramas(texto, n) for texto, _ in documentos]
+        total = len(documentos)
+        df = Counter(ng for tf in frecuencias for ng in tf)
+        self._idf = {ng: math.log((total + 1) / (d + 1)) + 1 for ng, d in df.items()}
+        self._idf_desconocido = math.log(total + 1) + 1
+
+        for indice, (tf, (texto, etiqueta)) in enumerate(zip(frecuencias, documentos)):
+            self._etiquetas.append(etiqueta)
+            for palabra in extraer_palabras(texto):
+                self.vocabulario[etiqueta].add(raiz(palabra))
+                self._consultas_por_raiz[raiz(palabra)].add(etiqueta)
+            pesos = {ng: (1 + math.log(c)) * self._idf[ng] for ng, c in tf.items()}
+            norma = math.sqrt(sum(p * p for p in pesos.values())) or 1.0
+            for ng, peso in pesos.items():
+                self._postings[ng].append((indice, peso / norma))
+
+    def buscar(self, texto_normalizado: str) -> Tuple[str, float]:
+        candidatos = self.candidatos(texto_normalizado)
+        return candidatos[0] if candidatos else (None, 0.0)
+
+    def candidatos(self, texto_normalizado: str) -> List[Tuple[str, float]]:
+        # Mejor puntuación de cada consulta, de mayor a menor
+        # Coseno disperso: solo se recorren los documentos que comparten algún n-grama
+        tf = extraer_ngramas(texto_normalizado, self.n)
+        pesos = {ng: (1 + math.log(c)) * self._idf[ng] for ng, c in tf.items() if ng in self._idf}
+        if not pesos:
+            return []
+        # La norma incluye los n-gramas desconocidos: palabras ajenas al catálogo bajan la similitud
+        norma = math.sqrt(sum(
+            ((1 + math.log(c)) * self._idf.get(ng, self._idf_desconocido)) ** 2 for ng, c in tf.items()
+        ))
+
+        puntuaciones: Dict[int, float] = defaultdict(float)
+        for ng, peso in pesos.items():
+            for indice, peso_doc in self._postings[ng]:
+                puntuaciones[indice] += peso * peso_doc
+
+        mejores: Dict[str, float] = {}
+        for indice, puntuacion in puntuaciones.items():
+            etiqueta = self._etiquetas[indice]
+            mejores[etiqueta] = max(mejores.get(etiqueta, 0.0), puntuacion / norma)
+        return sorted(mejores.items(), key=lambda x: x[1], reverse=True)
+
+    def motivo_descarte(self, texto_normalizado: str, etiqueta: str) -> Optional[str]:
+        # Parecido de n-gramas no basta: la pregunta debe compartir alguna palabra con la
+        # consulta ganadora y no nombrar algo que solo conocen otras ("sesiones" frente a
+        # "estado de la base", "usuario" o "instancia" frente a "sesiones disponibles")
+        propias = self.vocabulario.get(etiqueta, set())
+        raices = {raiz(p) for p in extraer_palabras(texto_normalizado) if p not in PALABRAS_DOMINIO}
+        if not raices & propias:
+            return "sin palabras en común"
+        ajenas = sorted(r for r in raices - propias if self._consultas_por_raiz.get(r))
+        if ajenas:
+            return f"nombra {', '.join(ajenas)} de otra consulta"
+        return None
+
+class AgentRouterIntenciones(BaseAgent):
+    def __init__(self, catalogo: CatalogoConsultas, umbral: float = None):
+        super().__init__("RouterIntenciones")
+        self.catalogo = catalogo
+        self.umbral = Config.ROUTER_UMBRAL if umbral is None else umbral
+        self.margen = Config.ROUTER_MARGEN
+        self._indice = None
+        self._version_indice = -1
+        self._lock = threading.Lock()
+
+    def _obtener_indice(self) -> IndiceIntenciones:
+        # El índice se reconstruye solo cuando el catálogo cambia de versión
+        if self._version_indice != self.catalogo.version:
+            with self._lock:
+                if self._version_indice != self.catalogo.version:
+                    version = self.catalogo.version
+                    documentos = []
+                    for nombre, config in self.catalogo.consultas.items():
+                        for texto in config.get("patrones", []) + config.get("ejemplos", []):
+                            documentos.append((normalizar_texto(texto), nombre))
+                    self._indice = IndiceIntenciones(documentos)
+                    self._version_indice = version
+                    self.log_info(f"Índice de intenciones construido: {len(documentos)} documentos")
+        return self._indice
+
+    def precalentar(self) -> int:
+        # Construye el índice ya (p.ej. antes del fork) en lugar de en la primera pregunta
+        return len(self._obtener_indice()._etiquetas)
+
+    async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        texto_usuario = data.get("texto", "")
+
+        inicio = time.perf_counter()
+        self.catalogo.revisar_recarga()
+        texto_normalizado = normalizar_texto(texto_usuario)
+        indice = self._obtener_indice()
+        candidatos = indice.candidatos(texto_normalizado)
+        nombre_consulta, confianza = candidatos[0] if candidatos else (None, 0.0)
+        segunda = candidatos[1][1] if len(candidatos) > 1 else 0.0
+        motivo = None
+        if nombre_consulta and confianza >= self.umbral:
+            if confianza - segunda < self.margen:
+                motivo = f"empate con {candidatos[1][0]} ({segunda:.2f})"
+            else:
+                motivo = indice.motivo_descarte(texto_normalizado, nombre_consulta)
+        tiempo_ms = (time.perf_counter() - inicio) * 1000
+
+        config = self.catalogo.obtener(nombre_consulta) if nombre_consulta else None
+        parametros = None
+        if config is not None and confianza >= self.umbral and motivo is None:
+            parametros = self.catalogo.extraer_parametros(config, texto_usuario)
+        if parametros is not None:
+            self.log_info(f"Intención resuelta localmente: {nombre_consulta} (confianza={confianza:.2f}, {tiempo_ms:.3f} ms)")
+            return {
+                "tipo": "predefinida",
+                "sql": config["sql"],
+                "nombre_consulta": nombre_consulta,
+                "ttl": config.get("ttl", 0),
+                "umbrales": config.get("umbrales", {}),
+                "parametros": parametros,
+                "confianza": confianza,
+                "procesado_por": self.name
+            }
+
+        self.log_info(f"Sin intención confiable (mejor={nombre_consulta}, confianza={confianza:.2f}"
+                      + (f", {motivo})" if motivo else ")"))
+        return {
+            "tipo": "personalizada",
+            "texto": texto_usuario,
+            "confianza": confianza,
+            "procesado_por": self.name
+        }
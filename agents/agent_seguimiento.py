@@ -0,0 +1,324 @@
+# =============================================================================
+# ARCHIVO: agents/agent_seguimiento.py
+# Descripción: Agente de preguntas de seguimiento (filtrar, ordenar, top-N,
+#              agrupar, paginar) resueltas en local sobre el último resultado
+# =============================================================================
+
+from .base_agent import BaseAgent
+from .catalogo_consultas import normalizar_texto
+from cache.sesiones import CacheSesiones, SesionResultado
+from database.resultado import ResultadoConsulta
+from config.settings import Config
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+
+# Mismo número de filas que muestra el master en cada respuesta
+FILAS_PAGINA = 5
+
+# Preguntas que piden explícitamente datos nuevos: nunca se responden en local
+PATRON_DATOS_NUEVOS = re.compile(r"\b(actualiza\w*|refresca\w*|de nuevo|otra vez|vuelve a consultar|ahora mismo)\b")
+
+PATRON_RESTABLECER = re.compile(
+    r"^(?:quita\w*|elimina\w*|borra\w*|sin)\s+(?:el\s+|los\s+)?(?:filtros?|orden\w*)$|^(?:todos|todas|todo)(?:\s+de nuevo)?$"
+)
+PATRON_PAGINA = re.compile(
+    r"^(?:ver\s+|muestra(?:me)?\s+|dame\s+)?(?:(mas|siguientes?|los siguientes|las siguientes|otr[oa]s)"
+    r"|(anterior(?:es)?)|pagina\s+(\d+))(?:\s+filas?)?$"
+)
+PATRON_ORDEN = re.compile(
+    r"^(?:y\s+)?(?:ordena\w*|ordenar|ordenad[oa]s?)\s+(?:por|segun)\s+(.+?)"
+    r"(?:\s+(desc\w*|asc\w*|de mayor a menor|de menor a mayor))?$"
+)
+PATRON_TOP = re.compile(
+    r"^(?:(?:dame|muestra(?:me)?|ver)\s+)?(?:(?:los|las)\s+)?(?:top\s+(\d+)|(\d+)\s+(primer[oa]s|mayores|menores)"
+    r"|(primer[oa]s|mayores|menores)\s+(\d+))(?:\s+(?:por|segun|de|en)\s+(.+))?$"
+)
+PATRON_AGRUPAR = re.compile(r"^(?:y\s+)?(?:agrupa\w*|agrupar|agrupad[oa]s?|totales|cuenta\w*|resume\w*)\s+por\s+(.+)$")
+PATRON_FILTRO = re.compile(
+    r"^(?:y\s+)?(?:solo|solamente|unicamente|nada mas|filtra\w*(?:\s+por)?)\s+(?:(?:el|la|los|las|en|de|del|con)\s+)*(.+)$"
+)
+PATRON_COMPARACION = re.compile(
+    r"^(mayor(?:es)?\s+(?:a|que|de)|menor(?:es)?\s+(?:a|que|de)|distint[oa]s?\s+(?:a|de)|>=|<=|!=|>|<|=)\s*(.+)$"
+)
+# Identificadores numéricos (INST_ID, THREAD#...) no se suman al agrupar
+PATRON_IDENTIFICADOR = re.compile(r"(ID|#|NUMBER)$")
+
+# Palabras de la pregunta que apuntan a columnas habituales de las vistas de monitoreo
+ALIAS_COLUMNAS = {
+    "instancia": ("INST_ID", "INSTANCE_NAME", "INSTANCE_NUMBER"),
+    "instancias": ("INST_ID", "INSTANCE_NAME", "INSTANCE_NUMBER"),
+    "usuario": ("USERNAME", "OWNER"),
+    "usuarios": ("USERNAME", "OWNER"),
+    "estado": ("STATUS",),
+    "recurso": ("RESOURCE_NAME",),
+    "recursos": ("RESOURCE_NAME",),
+    "destino": ("DESTINO",),
+    "base": ("DESTINO",),
+    "maquina": ("MACHINE",),
+    "programa": ("PROGRAM",),
+    "uso": ("CURRENT_UTILIZATION",),
+    "utilizacion": ("CURRENT_UTILIZATION",),
+    "pico": ("MAX_UTILIZATION",),
+    "limite": ("LIMIT_VALUE",),
+}
+
+def _a_numero(valor: Any) -> Optional[float]:
+    try:
+        return float(str(valor).strip())
+    except (TypeError, ValueError):
+        return None
+
+def ordenar_indices(indices: List[int], valores: List[Any], descendente: bool) -> List[int]:
+    # Números (aunque lleguen como texto, p.ej. LIMIT_VALUE), luego texto y NULL siempre al
+    # final: el sentido solo invierte cada grupo, nunca el orden entre grupos
+    numeros, textos, nulos = [], [], []
+    for i in indices:
+        valor = valores[i]
+        if valor is None:
+            nulos.append(i)
+            continue
+        numero = _a_numero(valor)
+        if numero is not None:
+            numeros.append((numero, i))
+        else:
+            textos.append((str(valor).lower(), i))
+    numeros.sort(key=lambda par: par[0], reverse=descendente)
+    textos.sort(key=lambda par: par[0], reverse=descendente)
+    return [i for _, i in numeros] + [i for _, i in textos] + nulos
+
+class AgentSeguimiento(BaseAgent):
+    def __init__(self, sesiones: Optional[CacheSesiones] = None):
+        super().__init__("Seguimiento")
+        self.sesiones = sesiones or CacheSesiones(Config.SESIONES_MAX, Config.SESIONES_TTL)
+        self._intenciones: List[Tuple[re.Pattern, Callable]] = [
+            (PATRON_RESTABLECER, self._restablecer),
+            (PATRON_PAGINA, self._paginar),
+            (PATRON_ORDEN, self._ordenar),
+            (PATRON_TOP, self._top),
+            (PATRON_AGRUPAR, self._agrupar),
+            (PATRON_FILTRO, self._filtrar),
+        ]
+
+    def recordar(self, chat_id: Any, resultados: ResultadoConsulta, sql: str, texto: str):
+        # Solo tiene sentido refinar un resultado con filas
+        if chat_id is None or not resultados:
+            return
+        self.sesiones.guardar(chat_id, SesionResultado(resultados, sql, texto))
+
+    async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = data.get("chat_id")
+        texto = normalizar_texto(data.get("texto", "")).rstrip(" .")
+        no_aplica = {"exito": False, "procesado_por": self.name}
+
+        if chat_id is None or PATRON_DATOS_NUEVOS.search(texto):
+            return no_aplica
+        sesion = self.sesiones.obtener(chat_id)
+        if sesion is None:
+            return no_aplica
+
+        for patron, manejador in self._intenciones:
+            coincidencia = patron.match(texto)
+            if coincidencia is None:
+                continue
+            descripcion = manejador(sesion, coincidencia)
+            if descripcion is None:
+                # Parece un seguimiento pero no encaja con el resultado guardado
+                return no_aplica
+            self.sesiones.renovar(chat_id)
+            self.log_info(f"Seguimiento resuelto en local: {descripcion}")
+            return {
+                "exito": True,
+                "resultados": sesion.pagina(FILAS_PAGINA),
+                "encabezado": self._encabezado(sesion, descripcion),
+                "sql": sesion.sql,
+                "procesado_por": self.name
+            }
+        return no_aplica
+
+    # -------------------------------------------------------------------------
+    # Resolución de columnas y valores
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _resolver_columna(columnas: List[str], frase: str) -> Optional[str]:
+        frase = frase.strip()
+        if not frase:
+            return None
+        por_nombre = {c.lower(): c for c in columnas}
+        exacta = por_nombre.get(frase.replace(" ", "_")) or por_nombre.get(frase.replace(" ", ""))
+        if exacta:
+            return exacta
+        for candidata in ALIAS_COLUMNAS.get(frase, ()):
+            if candidata.lower() in por_nombre:
+                return por_nombre[candidata.lower()]
+        # "max" -> MAX_UTILIZATION: todas las palabras de la frase están en el nombre
+        palabras = set(re.split(r"[\s_]+", frase))
+        candidatas = [c for c in columnas if palabras <= set(c.lower().split("_"))]
+        return candidatas[0] if len(candidatas) == 1 else None
+
+    def _columna_y_resto(self, columnas: List[str], texto: str) -> Tuple[Optional[str], str]:
+        # Prefijo más largo del texto que nombra una columna; el resto es el valor
+        palabras = texto.split()
+        for corte in range(len(palabras), 0, -1):
+            columna = self._resolver_columna(columnas, " ".join(palabras[:corte]))
+            if columna is not None:
+                return columna, " ".join(palabras[corte:])
+        return None, texto
+
+    @staticmethod
+    def _comparador(expresion: str) -> Tuple[str, str]:
+        coincidencia = PATRON_COMPARACION.match(expresion)
+        if coincidencia is None:
+            return "=", expresion
+        operador = coincidencia.group(1)
+        if operador.startswith("mayor"):
+            operador = ">"
+        elif operador.startswith("menor"):
+            operador = "<"
+        elif operador.startswith("distint"):
+            operador = "!="
+        return operador, coincidencia.group(2).strip()
+
+    @staticmethod
+    def _cumple(valor: Any, operador: str, objetivo: str) -> bool:
+        if valor is None:
+            return False
+        numero, numero_objetivo = _a_numero(valor), _a_numero(objetivo)
+        if numero is not None and numero_objetivo is not None:
+            a, b = numero, numero_objetivo
+        else:
+            a, b = str(valor).lower(), objetivo.lower()
+        if operador == ">":
+            return a > b
+        if operador == "<":
+            return a < b
+        if operador == ">=":
+            return a >= b
+        if operador == "<=":
+            return a <= b
+        if operador == "!=":
+            return a != b
+        return a == b
+
+    # -------------------------------------------------------------------------
+    # Intenciones
+    # -------------------------------------------------------------------------
+
+    def _restablecer(self, sesion: SesionResultado, _coincidencia) -> Optional[str]:
+        sesion.restablecer()
+        return "sin filtros ni orden"
+
+    def _paginar(self, sesion: SesionResultado, coincidencia) -> Optional[str]:
+        if coincidencia.group(1):
+            sesion.desde = min(sesion.desde + FILAS_PAGINA, sesion.total_vista)
+        elif coincidencia.group(2):
+            sesion.desde = max(0, sesion.desde - FILAS_PAGINA)
+        else:
+            sesion.desde = max(0, (int(coincidencia.group(3)) - 1) * FILAS_PAGINA)
+        return "página siguiente" if coincidencia.group(1) else "página"
+
+    def _ordenar(self, sesion: SesionResultado, coincidencia) -> Optional[str]:
+        if sesion.hay_mas or sesion.agrupado is not None:
+            return None
+        columna = self._resolver_columna(sesion.columnas, coincidencia.group(1))
+        if columna is None:
+            return None
+        direccion = coincidencia.group(2) or ""
+        descendente = direccion.startswith("desc") or direccion == "de mayor a menor"
+        sesion.indices = ordenar_indices(sesion.indices, sesion.columna(columna), descendente)
+        sesion.desde = 0
+        sesion.operaciones.append(f"orden {columna} {'desc' if descendente else 'asc'}")
+        return sesion.operaciones[-1]
+
+    def _top(self, sesion: SesionResultado, coincidencia) -> Optional[str]:
+        if sesion.hay_mas or sesion.agrupado is not None:
+            return None
+        n = int(coincidencia.group(1) or coincidencia.group(2) or coincidencia.group(5))
+        sentido = coincidencia.group(3) or coincidencia.group(4) or "top"
+        frase = coincidencia.group(6)
+        if frase:
+            columna = self._resolver_columna(sesion.columnas, frase)
+            if columna is None:
+                return None
+            # "top"/"mayores" de mayor a menor; "menores" de menor a mayor
+            descendente = not sentido.startswith("menor")
+            sesion.indices = ordenar_indices(sesion.indices, sesion.columna(columna), descendente)
+            sesion.operaciones.append(f"orden {columna} {'desc' if descendente else 'asc'}")
+        sesion.indices = sesion.indices[:n]
+        sesion.desde = 0
+        sesion.operaciones.append(f"primeras {n}")
+        return sesion.operaciones[-1]
+
+    def _agrupar(self, sesion: SesionResultado, coincidencia) -> Optional[str]:
+        if sesion.hay_mas:
+            return None
+        columna = self._resolver_columna(sesion.columnas, coincidencia.group(1))
+        if columna is None:
+            return None
+        claves = sesion.columna(columna)
+        # Columnas numéricas en todas las filas visibles: se suman por grupo
+        numericas: List[Tuple[str, Tuple]] = []
+        for nombre in sesion.columnas:
+            if nombre == columna or PATRON_IDENTIFICADOR.search(nombre):
+                continue
+            valores = sesion.columna(nombre)
+            if all(valores[i] is None or _a_numero(valores[i]) is not None for i in sesion.indices):
+                numericas.append((nombre, valores))
+        grupos: Dict[Any, List[float]] = {}
+        for i in sesion.indices:
+            acumulado = grupos.setdefault(claves[i], [0.0] * (len(numericas) + 1))
+            acumulado[0] += 1
+            for k, (_, valores) in enumerate(numericas, start=1):
+                acumulado[k] += _a_numero(valores[i]) or 0.0
+        filas = sorted(
+            ((clave, int(totales[0]), *[round(t, 2) for t in totales[1:]]) for clave, totales in grupos.items()),
+            key=lambda fila: fila[1], reverse=True
+        )
+        sesion.agrupado = ResultadoConsulta([columna, "FILAS"] + [f"SUMA_{nombre}" for nombre, _ in numericas], filas,
+                                            obtenido_en=sesion.obtenido_en)
+        sesion.desde = 0
+        sesion.operaciones.append(f"agrupado por {columna}")
+        return sesion.operaciones[-1]
+
+    def _filtrar(self, sesion: SesionResultado, coincidencia) -> Optional[str]:
+        if sesion.hay_mas or sesion.agrupado is not None:
+            return None
+        columna, expresion = self._columna_y_resto(sesion.columnas, coincidencia.group(1))
+        if columna is not None and not expresion:
+            return None
+        operador, objetivo = self._comparador(expresion)
+        if columna is not None:
+            valores = sesion.columna(columna)
+            indices = [i for i in sesion.indices if self._cumple(valores[i], operador, objetivo)]
+            descripcion = f"{columna} {operador} {objetivo}"
+        else:
+            # Solo un valor ("solo sessions"): filas donde alguna columna lo contiene exactamente
+            indices = [i for i in sesion.indices
+                       if any(self._cumple(col[i], "=", objetivo) for col in sesion.valores)]
+            if not indices:
+                # Sin columna ni coincidencias: probablemente es una pregunta nueva
+                return None
+            descripcion = f"= {objetivo}"
+        sesion.indices = indices
+        sesion.desde = 0
+        sesion.operaciones.append(f"filtro {descripcion}")
+        return sesion.operaciones[-1]
+
+    # -------------------------------------------------------------------------
+    # Presentación
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _encabezado(sesion: SesionResultado, descripcion: str) -> str:
+        total = sesion.total_vista
+        if total == 0:
+            rango = "Ninguna fila cumple"
+        elif sesion.desde >= total:
+            rango = f"No hay más filas (total {total})"
+        else:
+            rango = f"Filas {sesion.desde + 1}–{min(total, sesion.desde + FILAS_PAGINA)} de {total}"
+        encabezado = f"🔎 {rango} · {', '.join(sesion.operaciones) or descripcion}\n"
+        if sesion.hay_mas and sesion.desde + FILAS_PAGINA >= total:
+            encabezado += (f"ℹ️ El resultado original se cortó en {sesion.num_filas} filas; "
+                           f"pide la consulta completa como archivo para ver el resto.\n")
+        return encabezado
@@ -5,14 +5,24 @@
 
 from .base_agent import BaseAgent
 from typing import Dict, Any
-from openai import OpenAI
 from config.settings import Config
+from services.llm_gateway import obtener_gateway
+from cache.sql_cache import CacheSQL
+from .agent_consultas_predefinidas import normalizar_texto
+from .indice_esquema import obtener_indice_esquema
+import asyncio
 import re
 
+MODELO = "gpt-4.1-mini"
+# Incrementar cuando cambie el prompt para invalidar la caché de SQL
+VERSION_PROMPT = "2"
+
 class AgentSQLGenerator(BaseAgent):
     def __init__(self):
         super().__init__("SQLGenerator")
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.llm = obtener_gateway()
+        self.cache = CacheSQL(Config.SQL_CACHE_MAX, Config.SQL_CACHE_TTL, Config.SQL_CACHE_RUTA)
+        self.indice_esquema = obtener_indice_esquema()
     
     async def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
         texto_usuario = data.get("texto", "")
@@ -20,6 +30,19 @@ class AgentSQLGenerator(BaseAgent):
         self.log_info(f"Generando SQL para: {texto_usuario}")
         
         try:
+            pregunta_normalizada = " ".join(normalizar_texto(texto_usuario).split())
+            sql_cache = await self._en_cache(self.cache.obtener, pregunta_normalizada, MODELO, VERSION_PROMPT)
+            if sql_cache is not None:
+                self.log_info("SQL obtenida de caché")
+                return {
+                    "tipo": "generada",
+                    "sql": sql_cache,
+                    "pregunta_normalizada": pregunta_normalizada,
+                    "procesado_por": self.name,
+                    "desde_cache": True,
+                    "exito": True
+                }
+            
             contexto_extra = self._obtener_contexto_adicional(texto_usuario)
             
             prompt = f"""
@@ -29,8 +52,9 @@ Pregunta: {texto_usuario}
 SQL:
 """
             
-            respuesta = self.client.chat.completions.create(
-                model="gpt-4.1-mini",
+            sql_generada = await self.llm.completar(
+                self.name,
+                model=MODELO,
                 messages=[
                     {"role": "system", "content": "Eres un generador experto de consultas Oracle SQL."},
                     {"role": "user", "content": prompt}
@@ -40,15 +64,17 @@ SQL:
                 n=1
             )
             
-            sql_generada = respuesta.choices[0].message.content.strip()
             sql_limpia = self._limpiar_sql(sql_generada)
             
             self.log_info("SQL generada exitosamente")
             
+            # No se guarda aún: la caché solo recibe SQL que pasó la guardia y se ejecutó bien
             return {
                 "tipo": "generada",
                 "sql": sql_limpia,
+                "pregunta_normalizada": pregunta_normalizada,
                 "procesado_por": self.name,
+                "desde_cache": False,
                 "exito": True
             }
             
@@ -61,14 +87,27 @@ SQL:
                 "exito": False
             }
     
+    async def confirmar(self, resultado_sql: Dict[str, Any]):
+        # La SQL se ejecutó sin error: ya puede reutilizarse para la misma pregunta
+        if resultado_sql.get("desde_cache") or not resultado_sql.get("sql"):
+            return
+        await self._en_cache(self.cache.guardar, resultado_sql["pregunta_normalizada"], MODELO, VERSION_PROMPT,
+                             resultado_sql["sql"])
+    
+    async def descartar(self, resultado_sql: Dict[str, Any]):
+        await self._en_cache(self.cache.invalidar, resultado_sql["pregunta_normalizada"], MODELO, VERSION_PROMPT)
+    
+    async def _en_cache(self, operacion, *args):
+        # Con SQLite cada operación toca disco y puede esperar al bloqueo del archivo (hasta 5 s):
+        # se hace en un hilo para no parar el loop; solo en memoria no compensa el salto
+        if self.cache.ruta_sqlite:
+            return await asyncio.to_thread(operacion, *args)
+        return operacion(*args)
+    
     def _obtener_contexto_adicional(self, texto: str) -> str:
-        texto_lower = texto.lower()
-        if "usuarios" in texto_lower and "iniciado sesion" in texto_lower and "hoy" in texto_lower:
-            return """
--- Ejemplo para usuarios que iniciaron sesión hoy:
--- Usar V$SESSION, columnas USERNAME y LOGON_TIME (fecha/hora inicio sesión)
-"""
-        return ""
+        # Solo las columnas de las vistas relevantes, dentro del presupuesto de tokens
+        self.indice_esquema.asegurar_refresco()
+        return self.indice_esquema.contexto_prompt(texto)
     
     def _limpiar_sql(self, sql: str) -> str:
         # Limpiar formato Markdown
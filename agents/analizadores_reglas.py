@@ -0,0 +1,144 @@
+# =============================================================================
+# ARCHIVO: agents/analizadores_reglas.py
+# Descripción: Analizadores locales por consulta predefinida (sin LLM):
+#              reglas y umbrales evaluados sobre el resultado completo
+# =============================================================================
+
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import Config
+from database.resultado import ResultadoConsulta
+import heapq
+from itertools import compress
+import logging
+
+logger = logging.getLogger("agentebd.reglas")
+
+# Un analizador recibe el resultado y los umbrales efectivos; devuelve el texto
+# del análisis o None si sus reglas no aplican (p.ej. faltan columnas)
+Analizador = Callable[[ResultadoConsulta, Dict[str, Any]], Optional[str]]
+
+class RegistroAnalizadores:
+    def __init__(self):
+        self._analizadores: Dict[str, Analizador] = {}
+
+    def registrar(self, nombre_consulta: str):
+        def decorador(funcion: Analizador) -> Analizador:
+            self._analizadores[nombre_consulta] = funcion
+            return funcion
+        return decorador
+
+    def tiene(self, nombre_consulta: Optional[str]) -> bool:
+        return nombre_consulta in self._analizadores
+
+    def analizar(self, nombre_consulta: Optional[str], resultados: ResultadoConsulta,
+                 umbrales: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        analizador = self._analizadores.get(nombre_consulta)
+        if analizador is None or not resultados:
+            return None
+        # Los umbrales del catálogo sobrescriben los valores por defecto de Config
+        efectivos = {
+            "aviso_pct": Config.REGLAS_UMBRAL_AVISO,
+            "critico_pct": Config.REGLAS_UMBRAL_CRITICO,
+        }
+        efectivos.update(umbrales or {})
+        try:
+            return analizador(resultados, efectivos)
+        except (KeyError, TypeError, ValueError) as e:
+            # Resultado con forma inesperada: que lo analice el LLM
+            logger.warning(f"⚠️ Regla '{nombre_consulta}' no aplicable: {str(e)}")
+            return None
+
+REGISTRO_ANALIZADORES = RegistroAnalizadores()
+
+def _etiquetas_instancia(resultados: ResultadoConsulta, columna: str,
+                         filas: Optional[List[int]] = None) -> List[str]:
+    # Con resultados de varios destinos la instancia se identifica como DESTINO/INSTANCIA;
+    # con `filas` solo se etiquetan las que se van a mostrar
+    nombres = [columna]
+    if "DESTINO" in (c.upper() for c in resultados.columnas):
+        nombres.insert(0, "DESTINO")
+    if filas is None:
+        valores = resultados.columnas_valores(*nombres)
+    else:
+        indices = [resultados.indice_columna(nombre) for nombre in nombres]
+        valores = [[resultados.filas[f][i] for f in filas] for i in indices]
+    if len(valores) == 1:
+        return [str(i) for i in valores[0]]
+    return [f"{d}/{i}" for d, i in zip(*valores)]
+
+def _a_numero(valor: Any) -> Optional[float]:
+    # LIMIT_VALUE llega como texto y puede ser 'UNLIMITED'
+    try:
+        return float(str(valor).strip())
+    except (TypeError, ValueError):
+        return None
+
+def _columna_numerica(valores: List[Any]) -> List[Optional[float]]:
+    # Pocos valores distintos (límites, 'UNLIMITED'): se convierte cada uno una vez
+    convertidos = {valor: _a_numero(valor) for valor in set(valores)}
+    return list(map(convertidos.__getitem__, valores))
+
+@REGISTRO_ANALIZADORES.registrar("procesos_sesiones")
+def analizar_procesos_sesiones(resultados: ResultadoConsulta, umbrales: Dict[str, Any]) -> Optional[str]:
+    aviso, critico = float(umbrales["aviso_pct"]), float(umbrales["critico_pct"])
+
+    # Evaluación por columnas: cada regla es una pasada con una comparación por fila y solo
+    # las filas que disparan alguna llegan a formatearse
+    recursos, actuales, maximos, limites = resultados.columnas_valores(
+        "RESOURCE_NAME", "CURRENT_UTILIZATION", "MAX_UTILIZATION", "LIMIT_VALUE"
+    )
+    limites = _columna_numerica(limites)
+    # Recursos sin límite (UNLIMITED, 0) no tienen porcentaje
+    con_limite = list(map(bool, limites))
+    filas = list(compress(range(len(limites)), con_limite))
+    if not filas:
+        return None
+    recursos, actuales, maximos, limites = (list(compress(columna, con_limite))
+                                            for columna in (recursos, actuales, maximos, limites))
+    pct_actuales = [float(actual or 0) * 100 / limite for actual, limite in zip(actuales, limites)]
+    pct_maximos = [float(maximo or 0) * 100 / limite for maximo, limite in zip(maximos, limites)]
+
+    peor = dict.fromkeys(recursos, 0.0)
+    for recurso, pct in zip(recursos, pct_actuales):
+        if pct > peor[recurso]:
+            peor[recurso] = pct
+    disparadas = [k for k, (pct_actual, pct_maximo) in enumerate(zip(pct_actuales, pct_maximos))
+                  if pct_actual >= aviso or pct_maximo >= critico]
+
+    resumen = ", ".join(f"{recurso} {pct:.1f}%" for recurso, pct in sorted(peor.items()))
+    if not disparadas:
+        return f"✅ Utilización dentro de lo esperado (máximo por recurso: {resumen}; aviso al {aviso:.0f}%)."
+
+    mostradas = heapq.nlargest(5, disparadas, key=pct_actuales.__getitem__)
+    instancias = _etiquetas_instancia(resultados, "INST_ID", [filas[k] for k in mostradas])
+    lineas = []
+    for k, instancia in zip(mostradas, instancias):
+        nivel = "🔴" if pct_actuales[k] >= critico else "🟠"
+        lineas.append(f"{nivel} {recursos[k]} en instancia {instancia}: {actuales[k]}/{limites[k]:.0f} "
+                      f"({pct_actuales[k]:.1f}%, pico {pct_maximos[k]:.1f}%)")
+    if len(disparadas) > 5:
+        lineas.append(f"... y {len(disparadas) - 5} alertas más")
+    return "\n".join(lineas + [f"Máximo por recurso: {resumen}."])
+
+@REGISTRO_ANALIZADORES.registrar("estado_bd")
+def analizar_estado_bd(resultados: ResultadoConsulta, umbrales: Dict[str, Any]) -> Optional[str]:
+    esperados = {
+        "STATUS": umbrales.get("status", "OPEN"),
+        "DATABASE_STATUS": umbrales.get("database_status", "ACTIVE"),
+        "ARCHIVER": umbrales.get("archiver", "STARTED"),
+    }
+    instancias = _etiquetas_instancia(resultados, "INSTANCE_NAME")
+    columnas = resultados.columnas_valores(*esperados)
+    problemas = []
+    for (columna, esperado), valores in zip(esperados.items(), columnas):
+        # Una comparación por valor distinto de la columna; las filas solo se recorren si hay fallos
+        esperado_upper = str(esperado).upper()
+        incorrectos = {valor for valor in set(valores) if str(valor).upper() != esperado_upper}
+        if incorrectos:
+            problemas.extend(f"🔴 {instancia}: {columna}={valor} (esperado {esperado})"
+                             for instancia, valor in zip(instancias, valores) if valor in incorrectos)
+
+    if problemas:
+        return "\n".join(problemas)
+    return (f"✅ {len(instancias)} instancia(s) abiertas y activas, archivado en marcha "
+            f"({', '.join(str(i) for i in instancias)}).")
@@ -0,0 +1,279 @@
+# =============================================================================
+# ARCHIVO: agents/catalogo_consultas.py
+# Descripción: Catálogo externo de consultas predefinidas con recarga en caliente,
+#              búsqueda de patrones en una sola pasada (Aho-Corasick) y plantillas
+#              con parámetros tipados que se ejecutan con variables bind
+# =============================================================================
+
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+import unicodedata
+import threading
+import logging
+import json
+import time
+import os
+import re
+
+try:
+    import yaml
+except ImportError:  # PyYAML es opcional: sin él solo se aceptan catálogos JSON
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+def quitar_acentos(texto: str) -> str:
+    texto = unicodedata.normalize('NFKD', texto)
+    return texto.encode('ASCII', 'ignore').decode('utf-8')
+
+def normalizar_texto(texto: str) -> str:
+    return re.sub(r"[¿?¡!]", "", quitar_acentos(texto)).lower().strip()
+
+# Variables bind de una sentencia, sin contar lo que va entre comillas ('HH24:MI:SS')
+PATRON_LITERAL = re.compile(r"'(?:[^']|'')*'")
+PATRON_BIND = re.compile(r":([A-Za-z][A-Za-z0-9_]*)")
+PATRON_IDENTIFICADOR = re.compile(r"^[A-Za-z][A-Za-z0-9_$#]{0,127}$")
+
+# Palabras de la propia pregunta que un patrón como "usuario\s+(\w+)" captura por error
+# ("sesiones del usuario actual", "usuario con más conexiones"): no son nombres de objeto
+PALABRAS_NO_IDENTIFICADOR = {
+    "a", "al", "con", "sin", "de", "del", "el", "la", "los", "las", "en", "y", "o", "u", "por", "para",
+    "que", "quien", "cual", "cuales", "cuantas", "cuantos", "hay", "es", "son", "esta", "estan", "tiene",
+    "tienen", "mas", "menos", "mayor", "menor", "todo", "todos", "todas", "cada", "su", "sus", "mi",
+    "este", "ese", "actual", "actuales", "ahora", "hoy", "activa", "activas", "activo", "activos",
+    "inactiva", "inactivas", "inactivo", "inactivos", "abierta", "abiertas", "conectado", "conectados",
+    "bloqueada", "bloqueadas", "bloqueado", "bloqueados", "sesion", "sesiones", "conexion", "conexiones",
+    "usuario", "usuarios", "esquema", "esquemas",
+}
+
+def variables_bind(sql: str) -> List[str]:
+    return sorted({nombre.lower() for nombre in PATRON_BIND.findall(PATRON_LITERAL.sub("", sql))})
+
+class ParametroPlantilla:
+    # Hueco tipado de una plantilla: se rellena con lo que capture alguno de sus patrones
+    TIPOS = ("entero", "identificador", "texto")
+
+    def __init__(self, nombre: str, config: Dict[str, Any]):
+        self.nombre = nombre
+        self.tipo = config.get("tipo", "texto")
+        if self.tipo not in self.TIPOS:
+            raise ValueError(f"Parámetro '{nombre}': tipo '{self.tipo}' no soportado ({', '.join(self.TIPOS)})")
+        extraer = config.get("extraer", [])
+        if isinstance(extraer, str):
+            extraer = [extraer]
+        self.patrones = [re.compile(p, re.IGNORECASE) for p in extraer]
+        self.defecto = config.get("defecto")
+        self.max_longitud = int(config.get("max_longitud", 128))
+        # Cada plantilla puede descartar además sus propias palabras ("excluir": ["sistema"])
+        self.excluir = PALABRAS_NO_IDENTIFICADOR | {p.lower() for p in config.get("excluir", [])}
+
+    def convertir(self, valor: str) -> Any:
+        # Solo valores del tipo declarado llegan a la base, y siempre como bind
+        valor = valor.strip()
+        if self.tipo == "entero":
+            if not re.fullmatch(r"[+-]?\d{1,18}", valor):
+                raise ValueError(f"'{valor}' no es un entero")
+            return int(valor)
+        if self.tipo == "identificador":
+            if not PATRON_IDENTIFICADOR.match(valor):
+                raise ValueError(f"'{valor}' no es un identificador Oracle válido")
+            if valor.lower() in self.excluir:
+                raise ValueError(f"'{valor}' es una palabra de la pregunta, no un identificador")
+            # Sin comillas Oracle guarda los nombres en mayúsculas
+            return valor.upper()
+        if not valor or len(valor) > self.max_longitud:
+            raise ValueError(f"valor vacío o de más de {self.max_longitud} caracteres")
+        return valor
+
+    def extraer(self, texto: str) -> Any:
+        # Primera captura válida; si todas se descartan, el error de la última
+        error = None
+        for patron in self.patrones:
+            for coincidencia in patron.finditer(texto):
+                try:
+                    return self.convertir(coincidencia.group(1) if patron.groups else coincidencia.group(0))
+                except ValueError as e:
+                    error = e
+        if error is not None:
+            raise error
+        return self.defecto
+
+class AutomataPatrones:
+    # Autómata Aho-Corasick: encuentra todos los patrones en una pasada sobre el texto
+    def __init__(self, patrones: List[Tuple[str, Any]]):
+        self._transiciones: List[Dict[str, int]] = [{}]
+        self._fallo: List[int] = [0]
+        # Por estado: (longitud, valor) del patrón más largo que termina en él
+        self._salida: List[Optional[Tuple[int, Any]]] = [None]
+        self.num_patrones = 0
+
+        for patron, valor in patrones:
+            if patron:
+                self._agregar(patron, valor)
+        self._construir_fallos()
+
+    def _agregar(self, patron: str, valor: Any):
+        estado = 0
+        for caracter in patron:
+            siguiente = self._transiciones[estado].get(caracter)
+            if siguiente is None:
+                siguiente = len(self._transiciones)
+                self._transiciones[estado][caracter] = siguiente
+                self._transiciones.append({})
+                self._fallo.append(0)
+                self._salida.append(None)
+            estado = siguiente
+        # Si el mismo patrón aparece dos veces gana la primera definición
+        if self._salida[estado] is None:
+            self._salida[estado] = (len(patron), valor)
+        self.num_patrones += 1
+
+    def _construir_fallos(self):
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            estado = cola.popleft()
+            for caracter, siguiente in self._transiciones[estado].items():
+                cola.append(siguiente)
+                fallo = self._fallo[estado]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[siguiente] = destino if destino != siguiente else 0
+                # Sin patrón propio, hereda el más largo que termina en su sufijo
+                if self._salida[siguiente] is None:
+                    self._salida[siguiente] = self._salida[self._fallo[siguiente]]
+
+    def mejor_coincidencia(self, texto: str) -> Optional[Tuple[Any, int, int]]:
+        # Devuelve (valor, inicio, longitud) del patrón más largo; a igual longitud, el primero
+        transiciones, fallos, salidas = self._transiciones, self._fallo, self._salida
+        estado = 0
+        mejor: Optional[Tuple[Any, int, int]] = None
+        for posicion, caracter in enumerate(texto):
+            while estado and caracter not in transiciones[estado]:
+                estado = fallos[estado]
+            estado = transiciones[estado].get(caracter, 0)
+            salida = salidas[estado]
+            if salida is not None and (mejor is None or salida[0] > mejor[2]):
+                mejor = (salida[1], posicion - salida[0] + 1, salida[0])
+        return mejor
+
+class CatalogoConsultas:
+    def __init__(self, ruta: Optional[str] = None, intervalo_recarga: float = 5.0):
+        self.ruta = ruta
+        self.intervalo_recarga = intervalo_recarga
+        self.version = 0
+        # Consultas y autómata se publican juntos para que una búsqueda nunca los mezcle
+        self._estado: Tuple[Dict[str, Dict[str, Any]], AutomataPatrones] = ({}, AutomataPatrones([]))
+        self._mtime: Optional[float] = None
+        self._ultima_revision = 0.0
+        self._lock = threading.Lock()
+
+        if ruta:
+            self.recargar()
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> "CatalogoConsultas":
+        catalogo = cls()
+        catalogo._instalar(datos)
+        return catalogo
+
+    def _leer_archivo(self) -> Dict[str, Any]:
+        with open(self.ruta, encoding="utf-8") as archivo:
+            if self.ruta.endswith((".yaml", ".yml")):
+                if yaml is None:
+                    raise RuntimeError("PyYAML no está instalado; usa un catálogo JSON")
+                return yaml.safe_load(archivo) or {}
+            return json.load(archivo)
+
+    def recargar(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.ruta)
+            datos = self._leer_archivo()
+            self._instalar(datos)
+            self._mtime = mtime
+            logger.info(f"📚 Catálogo cargado: {len(self.consultas)} consultas (versión {self.version})")
+            return True
+        except Exception as e:
+            # Un catálogo roto no debe tumbar el bot: se mantiene la versión anterior
+            logger.error(f"❌ Error cargando catálogo {self.ruta}: {str(e)}")
+            return False
+
+    def _instalar(self, datos: Dict[str, Any]):
+        consultas = {}
+        patrones = []
+        for nombre, config in (datos.get("consultas") or {}).items():
+            sql = config["sql"]
+            if isinstance(sql, list):
+                sql = "\n".join(sql)
+            consulta = dict(config)
+            consulta["sql"] = sql.strip()
+            consulta["tipo"] = "predefinida"
+            consulta["patrones"] = [normalizar_texto(p) for p in config.get("patrones", [])]
+            consulta["parametros"] = self._compilar_parametros(nombre, consulta["sql"], config.get("parametros") or {})
+            consultas[nombre] = consulta
+            patrones.extend((patron, nombre) for patron in consulta["patrones"])
+
+        automata = AutomataPatrones(patrones)
+        # Intercambio atómico: las búsquedas en curso siguen usando la versión anterior
+        with self._lock:
+            self._estado = (consultas, automata)
+            self.version += 1
+
+    @staticmethod
+    def _compilar_parametros(nombre: str, sql: str, definiciones: Dict[str, Any]) -> List[ParametroPlantilla]:
+        # Plantilla y huecos deben coincidir: un bind sin declarar fallaría en cada ejecución
+        parametros = [ParametroPlantilla(p.lower(), config) for p, config in definiciones.items()]
+        declarados = sorted(p.nombre for p in parametros)
+        en_sql = variables_bind(sql)
+        if declarados != en_sql:
+            raise ValueError(
+                f"Consulta '{nombre}': parámetros declarados {declarados} y binds de la SQL {en_sql} no coinciden"
+            )
+        return parametros
+
+    def extraer_parametros(self, consulta: Dict[str, Any], texto: str) -> Optional[Dict[str, Any]]:
+        # Valores de los binds sacados del texto; None si falta alguno o no es del tipo declarado
+        valores = {}
+        texto = quitar_acentos(texto)
+        for parametro in consulta.get("parametros", []):
+            try:
+                valor = parametro.extraer(texto)
+            except ValueError as e:
+                logger.info(f"Parámetro '{parametro.nombre}' descartado: {str(e)}")
+                return None
+            if valor is None:
+                return None
+            valores[parametro.nombre] = valor
+        return valores
+
+    def revisar_recarga(self):
+        if not self.ruta:
+            return
+        ahora = time.monotonic()
+        if ahora - self._ultima_revision < self.intervalo_recarga:
+            return
+        self._ultima_revision = ahora
+        try:
+            mtime = os.path.getmtime(self.ruta)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.recargar()
+
+    @property
+    def consultas(self) -> Dict[str, Dict[str, Any]]:
+        return self._estado[0]
+
+    def buscar(self, texto_normalizado: str) -> Tuple[Optional[str], Optional[Dict[str, Any]], float]:
+        # Devuelve (nombre, configuración de la consulta, tiempo de búsqueda en ms)
+        self.revisar_recarga()
+        consultas, automata = self._estado
+        inicio = time.perf_counter()
+        mejor = automata.mejor_coincidencia(texto_normalizado)
+        tiempo_ms = (time.perf_counter() - inicio) * 1000
+        if mejor is None:
+            return None, None, tiempo_ms
+        return mejor[0], consultas[mejor[0]], tiempo_ms
+
+    def obtener(self, nombre: str) -> Optional[Dict[str, Any]]:
+        return self.consultas.get(nombre)
@@ -0,0 +1,265 @@
+# =============================================================================
+# ARCHIVO: agents/indice_esquema.py
+# Descripción: Índice local del diccionario de datos (vistas DBA_/V$/GV$ y sus
+#              columnas) persistido en disco, refrescado en segundo plano y
+#              consultable por palabras clave para el prompt del generador de SQL
+# =============================================================================
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from config.settings import Config
+from database.oracle_executor import PoolOracle, obtener_pool_compartido
+from .catalogo_consultas import normalizar_texto
+from .agent_router import PALABRAS_VACIAS
+
+logger = logging.getLogger("agentebd.esquema")
+
+# Fracción de la mejor puntuación que debe alcanzar una vista para entrar en el prompt
+RELEVANCIA_MINIMA = 0.35
+
+SQL_VISTAS_FIJAS = "SELECT VIEW_NAME FROM V$FIXED_VIEW_DEFINITION"
+
+# Las vistas V$/GV$ son sinónimos públicos de SYS.V_$/GV_$: sus columnas están en DBA_TAB_COLUMNS
+SQL_COLUMNAS = r"""
+SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE
+FROM DBA_TAB_COLUMNS
+WHERE OWNER = 'SYS'
+  AND (TABLE_NAME LIKE 'DBA\_%' ESCAPE '\'
+       OR TABLE_NAME LIKE 'V\_$%' ESCAPE '\'
+       OR TABLE_NAME LIKE 'GV\_$%' ESCAPE '\')
+ORDER BY TABLE_NAME, COLUMN_ID
+"""
+
+# Términos habituales en las preguntas (español) -> fragmentos de nombres del diccionario
+SINONIMOS = {
+    "sesion": ["session"], "sesiones": ["session"], "conectados": ["session", "username"],
+    "usuario": ["user", "username"], "usuarios": ["user", "username"],
+    "bloqueo": ["lock", "blocking"], "bloqueos": ["lock", "blocking"],
+    "proceso": ["process"], "procesos": ["process"],
+    "espacio": ["tablespace", "free", "bytes"], "tablespaces": ["tablespace"],
+    "archivo": ["file"], "archivos": ["file"], "datafiles": ["data", "file"],
+    "tabla": ["table"], "tablas": ["table"], "indice": ["index", "ind"], "indices": ["index", "ind"],
+    "objeto": ["object"], "objetos": ["object"], "invalidos": ["status", "invalid"],
+    "instancia": ["instance"], "instancias": ["instance"], "memoria": ["sga", "pga", "memory"],
+    "parametro": ["parameter"], "parametros": ["parameter"], "espera": ["wait", "event"],
+    "esperas": ["wait", "event"], "consultas": ["sql"], "sentencias": ["sql"],
+    "trabajos": ["job", "scheduler"], "respaldo": ["backup", "rman"], "respaldos": ["backup", "rman"],
+    "redo": ["log", "redo"], "logs": ["log"], "privilegios": ["priv", "role"], "roles": ["role"],
+    "inicio": ["logon", "startup"], "iniciado": ["logon"], "hoy": ["time", "logon"],
+}
+
+def _tokens_nombre(nombre: str) -> List[str]:
+    # V$SESSION_WAIT -> ["session", "wait"]; DBA_DATA_FILES -> ["data", "files", "file"]
+    tokens = []
+    for parte in re.split(r"[_$#]+", nombre.lower()):
+        if len(parte) < 2 or parte in ("v", "gv", "dba"):
+            continue
+        tokens.append(parte)
+        if parte.endswith("s") and len(parte) > 3:
+            tokens.append(parte[:-1])
+    return tokens
+
+def _tokens_pregunta(texto: str) -> List[str]:
+    tokens = []
+    for palabra in re.findall(r"[a-z0-9_$#]+", normalizar_texto(texto)):
+        if palabra in PALABRAS_VACIAS or len(palabra) < 2:
+            continue
+        tokens.extend(SINONIMOS.get(palabra, []))
+        tokens.extend(_tokens_nombre(palabra))
+    return tokens
+
+class IndiceEsquema:
+    def __init__(self, pool: Optional[PoolOracle] = None, ruta: Optional[str] = None,
+                 intervalo_refresco: float = 86400, tokens_max: int = 400, max_vistas: int = 4):
+        self.pool = pool
+        self.ruta = ruta or None
+        self.intervalo_refresco = intervalo_refresco
+        self.tokens_max = tokens_max
+        self.max_vistas = max_vistas
+
+        # Estado publicado de una vez: (vistas, índice invertido, construido_en)
+        self._estado: Tuple[Dict[str, List[Tuple[str, str]]], Dict[str, Dict[str, float]], float] = ({}, {}, 0.0)
+        self._lock = threading.Lock()
+        self._hilo_pid: Optional[int] = None
+
+        if self.ruta:
+            self._cargar_disco()
+
+    # -------------------------------------------------------------------------
+    # Construcción y persistencia
+    # -------------------------------------------------------------------------
+
+    def _instalar(self, vistas: Dict[str, List[Tuple[str, str]]], construido_en: float):
+        # Peso por vista y término: nombre de la vista x3, columnas x1
+        invertido: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for vista, columnas in vistas.items():
+            for token in _tokens_nombre(vista):
+                invertido[token][vista] = invertido[token].get(vista, 0.0) + 3.0
+            for columna, _tipo in columnas:
+                for token in _tokens_nombre(columna):
+                    invertido[token][vista] = invertido[token].get(vista, 0.0) + 1.0
+        with self._lock:
+            self._estado = (vistas, dict(invertido), construido_en)
+
+    def _cargar_disco(self):
+        try:
+            with open(self.ruta, encoding="utf-8") as archivo:
+                datos = json.load(archivo)
+            vistas = {v: [tuple(c) for c in cols] for v, cols in datos["vistas"].items()}
+            self._instalar(vistas, float(datos.get("construido_en", 0)))
+            logger.info(f"📖 Índice de esquema cargado: {len(vistas)} vistas")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Índice de esquema ilegible en {self.ruta}: {str(e)}")
+
+    def _guardar_disco(self, vistas: Dict[str, List[Tuple[str, str]]], construido_en: float):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"construido_en": construido_en, "vistas": vistas}, archivo)
+        # Reemplazo atómico: otro worker nunca lee un archivo a medias
+        os.replace(temporal, self.ruta)
+
+    def _leer_diccionario(self) -> Dict[str, List[Tuple[str, str]]]:
+        pool = self.pool or obtener_pool_compartido()
+        vistas: Dict[str, List[Tuple[str, str]]] = {}
+        with pool.conexion() as conn:
+            with conn.cursor() as cursor:
+                cursor.arraysize = 1000
+                cursor.prefetchrows = 1000
+                cursor.execute(SQL_VISTAS_FIJAS)
+                fijas: Set[str] = {fila[0] for fila in cursor.fetchall()}
+
+                cursor.execute(SQL_COLUMNAS)
+                while True:
+                    bloque = cursor.fetchmany()
+                    if not bloque:
+                        break
+                    for tabla, columna, tipo in bloque:
+                        # SYS.V_$SESSION se consulta como V$SESSION
+                        vista = tabla.replace("V_$", "V$", 1) if tabla.startswith(("V_$", "GV_$")) else tabla
+                        if "$" in vista and fijas and vista not in fijas:
+                            continue
+                        vistas.setdefault(vista, []).append((columna, tipo))
+        return vistas
+
+    def refrescar(self) -> bool:
+        try:
+            inicio = time.perf_counter()
+            vistas = self._leer_diccionario()
+            if not vistas:
+                logger.warning("⚠️ El diccionario de datos no devolvió vistas; se mantiene el índice anterior")
+                return False
+            construido_en = time.time()
+            self._instalar(vistas, construido_en)
+            if self.ruta:
+                self._guardar_disco(vistas, construido_en)
+            logger.info(f"📖 Índice de esquema refrescado: {len(vistas)} vistas en "
+                        f"{(time.perf_counter() - inicio) * 1000:.0f} ms")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error refrescando índice de esquema: {str(e)}")
+            return False
+
+    def _bucle_refresco(self):
+        while True:
+            _, _, construido_en = self._estado
+            espera = construido_en + self.intervalo_refresco - time.time()
+            if espera > 0:
+                time.sleep(espera)
+                continue
+            if not self.refrescar():
+                # Sin base de datos disponible: reintentar más tarde sin saturar los logs
+                time.sleep(min(300.0, self.intervalo_refresco))
+
+    def asegurar_refresco(self):
+        # Hilo de refresco creado en el primer uso de cada proceso (seguro tras fork)
+        if self._hilo_pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo_pid == os.getpid():
+                return
+            self._hilo_pid = os.getpid()
+        threading.Thread(target=self._bucle_refresco, name="indice-esquema", daemon=True).start()
+
+    # -------------------------------------------------------------------------
+    # Búsqueda
+    # -------------------------------------------------------------------------
+
+    @property
+    def num_vistas(self) -> int:
+        return len(self._estado[0])
+
+    def buscar(self, texto: str, limite: Optional[int] = None) -> List[Tuple[str, float]]:
+        vistas, invertido, _ = self._estado
+        if not vistas:
+            return []
+        puntuaciones: Dict[str, float] = defaultdict(float)
+        for token in set(_tokens_pregunta(texto)):
+            coincidencias = invertido.get(token)
+            if not coincidencias:
+                continue
+            # Términos que aparecen en pocas vistas discriminan más
+            idf = math.log(1 + len(vistas) / len(coincidencias))
+            for vista, peso in coincidencias.items():
+                puntuaciones[vista] += peso * idf
+        # A igual puntuación, la vista más específica (menos columnas) primero
+        ordenadas = sorted(puntuaciones.items(), key=lambda kv: (-kv[1], len(vistas[kv[0]]), kv[0]))
+        if not ordenadas:
+            return []
+        # Coincidencias marginales (una columna genérica) solo gastarían presupuesto
+        minimo = ordenadas[0][1] * RELEVANCIA_MINIMA
+        return [(vista, p) for vista, p in ordenadas[:limite or self.max_vistas] if p >= minimo]
+
+    def contexto_prompt(self, texto: str) -> str:
+        # Columnas de las vistas relevantes, cortadas al presupuesto (~4 caracteres por token)
+        vistas, _, _ = self._estado
+        presupuesto = self.tokens_max * 4
+        lineas: List[str] = []
+        usado = 0
+        for vista, _puntuacion in self.buscar(texto):
+            cabecera = f"-- {vista}("
+            restante = presupuesto - usado - len(cabecera) - 2
+            if restante < 40:
+                break
+            columnas = []
+            for columna, tipo in vistas[vista]:
+                entrada = f"{columna} {tipo}"
+                if len(entrada) + 2 > restante:
+                    columnas.append("...")
+                    break
+                columnas.append(entrada)
+                restante -= len(entrada) + 2
+            linea = cabecera + ", ".join(columnas) + ")"
+            lineas.append(linea)
+            usado += len(linea) + 1
+        if not lineas:
+            return ""
+        return "\n-- Vistas y columnas disponibles (usa solo estas columnas):\n" + "\n".join(lineas) + "\n"
+
+_indice_compartido: Optional[IndiceEsquema] = None
+_lock_indice = threading.Lock()
+
+def obtener_indice_esquema() -> IndiceEsquema:
+    global _indice_compartido
+    if _indice_compartido is None:
+        with _lock_indice:
+            if _indice_compartido is None:
+                _indice_compartido = IndiceEsquema(
+                    ruta=Config.ESQUEMA_INDICE_RUTA,
+                    intervalo_refresco=Config.ESQUEMA_REFRESCO_INTERVALO,
+                    tokens_max=Config.ESQUEMA_TOKENS_MAX,
+                    max_vistas=Config.ESQUEMA_MAX_VISTAS
+                )
+    return _indice_compartido
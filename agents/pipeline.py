@@ -0,0 +1,238 @@
+# =============================================================================
+# ARCHIVO: agents/pipeline.py
+# Descripción: Motor de etapas declarativas (DAG) para el coordinador: cada etapa
+#              declara lo que necesita y produce, con plazos y ejecución especulativa
+# =============================================================================
+
+import asyncio
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from services.metricas import REGISTRO, anotar, medir
+
+logger = logging.getLogger("agentebd.pipeline")
+
+ESPECULACIONES = REGISTRO.contador("agentebd_pipeline_especulaciones_total",
+                                   "Etapas lanzadas por adelantado según si su resultado se usó")
+
+# Clave terminal: en cuanto una etapa la produce, el resto se cancela
+RESPUESTA = "respuesta"
+
+FuncionEtapa = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+class Etapa:
+    def __init__(self, nombre: str, funcion: FuncionEtapa, produce: Iterable[str],
+                 requiere: Iterable[str] = (), requiere_alguna: Iterable[str] = (),
+                 excluye: Iterable[str] = (), despues: Iterable[str] = (),
+                 condicion: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 timeout: Optional[float] = None, especulativa: bool = False,
+                 especular_tras: float = 0.0, opcional: bool = False):
+        self.nombre = nombre
+        self.funcion = funcion
+        # Claves del contexto que la etapa puede escribir (el resto de su salida se ignora)
+        self.produce = tuple(produce)
+        # Todas presentes / al menos una presente / ninguna presente para poder correr
+        self.requiere = tuple(requiere)
+        self.requiere_alguna = tuple(requiere_alguna)
+        self.excluye = tuple(excluye)
+        # Etapas que deben haber terminado antes (orden de prioridad entre caminos)
+        self.despues = tuple(despues)
+        self.condicion = condicion
+        self.timeout = timeout
+        # Especulativa: arranca sin esperar a que se decidan sus exclusiones y se
+        # cancela si al final aparece alguna; `especular_tras` evita lanzarla si la
+        # decisión llega antes de ese margen (segundos)
+        self.especulativa = especulativa
+        self.especular_tras = especular_tras
+        # Opcional: un fallo o plazo agotado deja sus claves sin producir en vez de abortar
+        self.opcional = opcional
+
+class ErrorEtapa(Exception):
+    pass
+
+class Pipeline:
+    def __init__(self):
+        self._etapas: Dict[str, Etapa] = {}
+
+    def registrar(self, etapa: Etapa) -> Etapa:
+        # Registrar con un nombre existente sustituye la etapa (p.ej. otro agente para el mismo paso)
+        self._etapas[etapa.nombre] = etapa
+        return etapa
+
+    def etapa(self, nombre: str, **opciones):
+        def decorador(funcion: FuncionEtapa) -> FuncionEtapa:
+            self.registrar(Etapa(nombre, funcion, **opciones))
+            return funcion
+        return decorador
+
+    @property
+    def etapas(self) -> List[str]:
+        return list(self._etapas)
+
+    async def ejecutar(self, contexto: Dict[str, Any]) -> Dict[str, Any]:
+        return await _Ejecucion(list(self._etapas.values()), contexto).correr()
+
+class _Ejecucion:
+    # Estado de una solicitud: etapas pendientes, en curso y terminadas sobre un contexto común
+    def __init__(self, etapas: List[Etapa], contexto: Dict[str, Any]):
+        self.contexto = contexto
+        self.pendientes: Dict[str, Etapa] = {e.nombre: e for e in etapas}
+        self.en_curso: Dict[asyncio.Task, Etapa] = {}
+        self.terminadas: Set[str] = set()
+        self.productores: Dict[str, Set[str]] = {}
+        for etapa in etapas:
+            for clave in etapa.produce:
+                self.productores.setdefault(clave, set()).add(etapa.nombre)
+        self.especulativas: Set[str] = set()
+        self.listas_desde: Dict[str, float] = {}
+        # Especulaciones que terminaron antes de decidirse si hacían falta
+        self.retenidas: Dict[str, tuple] = {}
+
+    def _imposible(self, clave: str, excepto: str) -> bool:
+        # Ya no puede aparecer: todos sus productores (salvo quien pregunta) terminaron sin producirla
+        if clave in self.contexto:
+            return False
+        return all(p in self.terminadas for p in self.productores.get(clave, ()) if p != excepto)
+
+    def _descartar(self, etapa: Etapa, motivo: str):
+        self.pendientes.pop(etapa.nombre, None)
+        self.terminadas.add(etapa.nombre)
+        logger.debug(f"Etapa '{etapa.nombre}' omitida: {motivo}")
+
+    def _planificar(self) -> Optional[float]:
+        # Lanza las etapas que ya pueden correr; devuelve cuándo volver a mirar (especulación)
+        ahora = time.monotonic()
+        proxima: Optional[float] = None
+        for etapa in list(self.pendientes.values()):
+            nombre = etapa.nombre
+            if any(d not in self.terminadas for d in etapa.despues):
+                continue
+            if any(self._imposible(c, nombre) for c in etapa.requiere) or (
+                etapa.requiere_alguna and all(self._imposible(c, nombre) for c in etapa.requiere_alguna)
+            ):
+                self._descartar(etapa, "faltan entradas")
+                continue
+            if any(c in self.contexto for c in etapa.excluye):
+                self._descartar(etapa, "excluida")
+                continue
+            listos = all(c in self.contexto for c in etapa.requiere) and (
+                not etapa.requiere_alguna or any(c in self.contexto for c in etapa.requiere_alguna)
+            )
+            if not listos:
+                continue
+            decidida = all(self._imposible(c, nombre) for c in etapa.excluye)
+            if not decidida:
+                if not etapa.especulativa:
+                    continue
+                desde = self.listas_desde.setdefault(nombre, ahora)
+                if ahora - desde < etapa.especular_tras:
+                    limite = desde + etapa.especular_tras
+                    proxima = limite if proxima is None else min(proxima, limite)
+                    continue
+                self.especulativas.add(nombre)
+            if etapa.condicion is not None and not etapa.condicion(self.contexto):
+                self._descartar(etapa, "condición no cumplida")
+                continue
+            del self.pendientes[nombre]
+            tarea = asyncio.ensure_future(self._correr_etapa(etapa))
+            self.en_curso[tarea] = etapa
+        return proxima
+
+    async def _correr_etapa(self, etapa: Etapa) -> Optional[Dict[str, Any]]:
+        with medir(etapa.nombre):
+            if etapa.timeout is None:
+                return await etapa.funcion(self.contexto)
+            try:
+                return await asyncio.wait_for(etapa.funcion(self.contexto), timeout=etapa.timeout)
+            except asyncio.TimeoutError:
+                raise ErrorEtapa(f"La etapa '{etapa.nombre}' superó su plazo de {etapa.timeout:.0f}s")
+
+    def _publicar(self, etapa: Etapa, salida: Dict[str, Any]):
+        self.terminadas.add(etapa.nombre)
+        for clave in etapa.produce:
+            if clave in salida:
+                self.contexto[clave] = salida[clave]
+
+    def _resolver_especulaciones(self):
+        # Especulaciones que perdieron (otra rama produjo una de sus exclusiones) se cancelan;
+        # las que ganaron publican su salida retenida
+        for tarea, etapa in list(self.en_curso.items()):
+            if etapa.nombre in self.especulativas and any(c in self.contexto for c in etapa.excluye):
+                tarea.cancel()
+                del self.en_curso[tarea]
+                self._contar_especulacion(etapa, "cancelada")
+                self.terminadas.add(etapa.nombre)
+        for nombre, (etapa, salida) in list(self.retenidas.items()):
+            if any(c in self.contexto for c in etapa.excluye):
+                del self.retenidas[nombre]
+                self._contar_especulacion(etapa, "descartada")
+                self.terminadas.add(nombre)
+            elif all(self._imposible(c, nombre) for c in etapa.excluye):
+                del self.retenidas[nombre]
+                self._contar_especulacion(etapa, "aprovechada")
+                self._publicar(etapa, salida)
+
+    @staticmethod
+    def _contar_especulacion(etapa: Etapa, resultado: str):
+        ESPECULACIONES.inc(etapa=etapa.nombre, resultado=resultado)
+        anotar(**{f"especulacion_{etapa.nombre}": resultado})
+
+    def _cancelar_todo(self):
+        for tarea in self.en_curso:
+            tarea.cancel()
+        self.en_curso.clear()
+
+    def _avanzar(self) -> Optional[float]:
+        # Repite la planificación hasta que no cambie nada: omitir o publicar una etapa puede
+        # desbloquear otras en la misma vuelta
+        while True:
+            antes = (len(self.pendientes), len(self.en_curso), len(self.retenidas), len(self.contexto))
+            proxima = self._planificar()
+            self._resolver_especulaciones()
+            if antes == (len(self.pendientes), len(self.en_curso), len(self.retenidas), len(self.contexto)):
+                return proxima
+
+    def _publicar_retenidas(self):
+        # Exclusiones que ya nadie va a decidir (etapas bloqueadas): lo retenido se da por bueno
+        for nombre in list(self.retenidas):
+            etapa, salida = self.retenidas.pop(nombre)
+            self._contar_especulacion(etapa, "aprovechada")
+            self._publicar(etapa, salida)
+
+    async def correr(self) -> Dict[str, Any]:
+        try:
+            while True:
+                proxima = self._avanzar()
+                if RESPUESTA in self.contexto:
+                    return self.contexto
+                if not self.en_curso:
+                    if self.retenidas and proxima is None:
+                        self._publicar_retenidas()
+                        continue
+                    if proxima is None:
+                        # Nada más que hacer: el llamador decide qué significa no tener respuesta
+                        return self.contexto
+                    await asyncio.sleep(max(0.0, proxima - time.monotonic()))
+                    continue
+
+                espera = None if proxima is None else max(0.0, proxima - time.monotonic())
+                hechas, _ = await asyncio.wait(list(self.en_curso), timeout=espera,
+                                               return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechas:
+                    etapa = self.en_curso.pop(tarea)
+                    try:
+                        salida = tarea.result() or {}
+                    except (Exception, asyncio.CancelledError) as e:
+                        if isinstance(e, asyncio.CancelledError) or not etapa.opcional:
+                            raise
+                        logger.warning(f"⚠️ Etapa opcional '{etapa.nombre}' falló: {str(e)}")
+                        self.terminadas.add(etapa.nombre)
+                        continue
+                    if etapa.nombre in self.especulativas:
+                        # Su salida no se publica hasta saber si la rama especulada es la buena
+                        self.retenidas[etapa.nombre] = (etapa, salida)
+                    else:
+                        self._publicar(etapa, salida)
+        finally:
+            self._cancelar_todo()
@@ -0,0 +1,206 @@
+# =============================================================================
+# ARCHIVO: agents/resumen_resultados.py
+# Descripción: Resumen estadístico en una sola pasada de las filas leídas
+#              (tipos, rangos, percentiles, nulos, valores frecuentes, atípicos)
+#              con tamaño acotado para el prompt del análisis
+# =============================================================================
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+import math
+import random
+
+from database.resultado import ResultadoConsulta
+
+MAX_COLUMNAS = 12         # columnas descritas en el resumen
+TOP_K = 3                 # valores más frecuentes por columna
+CONTADORES_FRECUENCIA = 32  # memoria del conteo aproximado de frecuencias (Misra-Gries)
+TAMANO_MUESTRA = 512      # muestra por reservorio para percentiles y atípicos
+MAX_LARGO_VALOR = 40
+FILAS_EJEMPLO = 3
+
+def _como_numero(valor: Any) -> Optional[float]:
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float, Decimal)):
+        return float(valor)
+    if isinstance(valor, str):
+        try:
+            return float(valor.strip())
+        except ValueError:
+            return None
+    return None
+
+def _recortar(valor: Any) -> str:
+    texto = str(valor)
+    return texto if len(texto) <= MAX_LARGO_VALOR else texto[:MAX_LARGO_VALOR - 1] + "…"
+
+def _formatear_numero(valor: float) -> str:
+    if valor == int(valor) and abs(valor) < 1e15:
+        return str(int(valor))
+    return f"{valor:.4g}"
+
+class EstadisticaColumna:
+    # Acumulador de memoria constante: se alimenta valor a valor
+    def __init__(self, nombre: str, aleatorio: random.Random):
+        self.nombre = nombre
+        self.total = 0
+        self.nulos = 0
+        self.numericos = 0
+        self.fechas = 0
+        # Media y varianza incrementales (Welford)
+        self.media = 0.0
+        self._m2 = 0.0
+        self.minimo: Optional[float] = None
+        self.maximo: Optional[float] = None
+        self.fecha_min: Any = None
+        self.fecha_max: Any = None
+        self.muestra: List[float] = []
+        self.frecuencias: Dict[str, int] = {}
+        # True si algún valor se descartó del conteo: las frecuencias pasan a ser cotas inferiores
+        self.saturado = False
+        self._aleatorio = aleatorio
+
+    def agregar(self, valor: Any):
+        self.total += 1
+        if valor is None:
+            self.nulos += 1
+            return
+
+        numero = _como_numero(valor)
+        if numero is not None and math.isfinite(numero):
+            self._agregar_numero(numero)
+        elif isinstance(valor, (datetime, date)):
+            self.fechas += 1
+            self.fecha_min = valor if self.fecha_min is None else min(self.fecha_min, valor)
+            self.fecha_max = valor if self.fecha_max is None else max(self.fecha_max, valor)
+
+        self._contar(_recortar(valor))
+
+    def _agregar_numero(self, numero: float):
+        self.numericos += 1
+        delta = numero - self.media
+        self.media += delta / self.numericos
+        self._m2 += delta * (numero - self.media)
+        self.minimo = numero if self.minimo is None else min(self.minimo, numero)
+        self.maximo = numero if self.maximo is None else max(self.maximo, numero)
+        # Muestreo por reservorio: cada valor visto tiene la misma probabilidad de quedar
+        if len(self.muestra) < TAMANO_MUESTRA:
+            self.muestra.append(numero)
+        else:
+            j = self._aleatorio.randrange(self.numericos)
+            if j < TAMANO_MUESTRA:
+                self.muestra[j] = numero
+
+    def _contar(self, clave: str):
+        # Misra-Gries con decremento por lotes: garantiza encontrar los valores realmente
+        # frecuentes con memoria fija y coste amortizado O(1) por valor
+        self.frecuencias[clave] = self.frecuencias.get(clave, 0) + 1
+        if len(self.frecuencias) > 2 * CONTADORES_FRECUENCIA:
+            self.saturado = True
+            corte = sorted(self.frecuencias.values(), reverse=True)[CONTADORES_FRECUENCIA]
+            self.frecuencias = {k: c - corte for k, c in self.frecuencias.items() if c > corte}
+
+    @property
+    def no_nulos(self) -> int:
+        return self.total - self.nulos
+
+    @property
+    def tipo(self) -> str:
+        if not self.no_nulos:
+            return "vacía"
+        if self.numericos >= 0.9 * self.no_nulos:
+            return "numérica"
+        if self.fechas >= 0.9 * self.no_nulos:
+            return "fecha"
+        return "texto"
+
+    @property
+    def desviacion(self) -> float:
+        return math.sqrt(self._m2 / (self.numericos - 1)) if self.numericos > 1 else 0.0
+
+    def percentiles(self) -> Dict[str, float]:
+        ordenada = sorted(self.muestra)
+        if not ordenada:
+            return {}
+        def q(p: float) -> float:
+            return ordenada[min(len(ordenada) - 1, int(p * len(ordenada)))]
+        return {"p25": q(0.25), "p50": q(0.5), "p75": q(0.75), "p95": q(0.95)}
+
+    def atipicos(self) -> List[float]:
+        # Vallas de Tukey sobre la muestra (exacto mientras quepa todo en el reservorio)
+        pct = self.percentiles()
+        if len(self.muestra) < 8:
+            return []
+        rango = pct["p75"] - pct["p25"]
+        if rango == 0:
+            return []
+        bajo, alto = pct["p25"] - 1.5 * rango, pct["p75"] + 1.5 * rango
+        return sorted((v for v in self.muestra if v < bajo or v > alto), key=lambda v: -abs(v - pct["p50"]))
+
+    def top(self) -> List[tuple]:
+        return sorted(self.frecuencias.items(), key=lambda kv: -kv[1])[:TOP_K]
+
+    def describir(self) -> str:
+        partes = [f"{self.nombre} ({self.tipo})"]
+        if self.nulos:
+            partes.append(f"nulos={self.nulos}")
+        if self.tipo == "numérica":
+            pct = self.percentiles()
+            partes.append(f"min={_formatear_numero(self.minimo)} max={_formatear_numero(self.maximo)} "
+                          f"media={_formatear_numero(self.media)} desv={_formatear_numero(self.desviacion)}")
+            # Percentiles exactos mientras todos los valores quepan en el reservorio
+            signo = "=" if len(self.muestra) == self.numericos else "≈"
+            partes.append(" ".join(f"{k}{signo}{_formatear_numero(v)}" for k, v in pct.items()))
+            atipicos = self.atipicos()
+            if atipicos:
+                ejemplos = ", ".join(_formatear_numero(v) for v in atipicos[:3])
+                if len(self.muestra) == self.numericos:
+                    # Todos los valores caben en la muestra: el conteo es exacto
+                    partes.append(f"atípicos={len(atipicos)} ({ejemplos})")
+                else:
+                    estimado = round(len(atipicos) * self.numericos / len(self.muestra))
+                    partes.append(f"atípicos={len(atipicos)} en una muestra de {len(self.muestra)}, "
+                                  f"≈{estimado} en total ({ejemplos})")
+        elif self.tipo == "fecha":
+            partes.append(f"desde={self.fecha_min} hasta={self.fecha_max}")
+
+        top = self.top()
+        if not self.saturado:
+            # Conteo exacto; en columnas numéricas casi únicas los frecuentes no aportan nada
+            if top and (self.tipo != "numérica" or top[0][1] > 1):
+                partes.append(f"distintos={len(self.frecuencias)} top: " + ", ".join(f"{v}×{c}" for v, c in top))
+        else:
+            partes.append(f"distintos>{CONTADORES_FRECUENCIA}")
+            if top and top[0][1] > 1:
+                partes.append("top≈: " + ", ".join(f"{v}×≥{c}" for v, c in top))
+        return "; ".join(partes)
+
+def resumir_resultados(resultados: ResultadoConsulta, semilla: int = 0) -> str:
+    # Recorre todas las filas una vez; el texto resultante no crece con el número de filas
+    if not resultados:
+        return "La consulta no devolvió resultados."
+
+    aleatorio = random.Random(semilla)
+    columnas = resultados.columnas[:MAX_COLUMNAS]
+    estadisticas = [EstadisticaColumna(nombre, aleatorio) for nombre in columnas]
+    for fila in resultados.filas:
+        for estadistica, valor in zip(estadisticas, fila):
+            estadistica.agregar(valor)
+
+    if resultados.hay_mas:
+        # Solo se leyó el presupuesto de filas: nada de lo siguiente describe el resto
+        lineas = [f"Filas: {resultados.describir_tamano()}. Las estadísticas cubren solo las "
+                  f"{len(resultados)} filas leídas, no el resultado completo"]
+    else:
+        lineas = [f"Filas: {resultados.describir_tamano()} (estadísticas del resultado completo)"]
+    if len(resultados.columnas) > MAX_COLUMNAS:
+        lineas.append(f"Columnas: {len(resultados.columnas)} (se resumen las primeras {MAX_COLUMNAS})")
+    lineas.append("Columnas:")
+    lineas.extend(f"- {e.describir()}" for e in estadisticas)
+
+    lineas.append("Ejemplos:")
+    for fila in resultados.filas_como_dict(FILAS_EJEMPLO):
+        lineas.append(", ".join(f"{k}={_recortar(v)}" for k, v in list(fila.items())[:MAX_COLUMNAS]))
+    return "\n".join(lineas)
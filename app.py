@@ -3,54 +3,252 @@
 # Descripción: Aplicación principal Flask mejorada
 # =============================================================================
 
-from flask import Flask, request
-import telegram
-import traceback
+from services.arranque import TIEMPOS, congelar_memoria  # primero: marca el inicio del import
+from flask import Flask, request, Response
 import asyncio
+import traceback
+import threading
+import time
+import os
+from typing import Dict, Any, Optional
 from config.settings import Config
 from agents.agent_master import AgentMaster
-
-# Validar configuración al inicio
-Config.validate()
+from services.ingesta import BucleFondo, ColaIngesta, ACEPTADO, LLENO
+from services.llm_gateway import obtener_gateway, cargar_sdk
+from services.telegram_salida import obtener_despachador
+from services.metricas import REGISTRO, iniciar_traza, medir
 
 app = Flask(__name__)
-bot = telegram.Bot(token=Config.TELEGRAM_TOKEN)
-agent_master = AgentMaster()
+# Todas las llamadas a la Bot API pasan por el despachador (límites de tasa, reintentos, cola)
+despachador = obtener_despachador()
 
-@app.route("/webhook", methods=["POST"])
-def webhook():
-    data = request.get_json()
-    
-    if "message" in data and "text" in data["message"]:
-        chat_id = data["message"]["chat"]["id"]
-        texto = data["message"]["text"]
-        
+_agent_master: Optional[AgentMaster] = None
+_lock_agent_master = threading.Lock()
+
+def obtener_agent_master() -> AgentMaster:
+    # Importar app no valida la configuración ni crea agentes: se hace en el primer uso
+    # (precalentar, iniciar_proceso o la primera petición)
+    global _agent_master
+    if _agent_master is None:
+        with _lock_agent_master:
+            if _agent_master is None:
+                Config.validate()
+                agent_master = AgentMaster()
+                agent_master.recolector.notificar = notificar_alerta
+                _agent_master = agent_master
+    return _agent_master
+
+async def atender_update(update: Dict[str, Any]) -> str:
+    chat_id = update["message"]["chat"]["id"]
+    texto = update["message"]["text"]
+
+    async def enviar(texto_mensaje: str):
+        with medir("telegram_envio"):
+            return await despachador.enviar_mensaje(chat_id, texto_mensaje)
+
+    async def editar(message_id, texto_mensaje: str):
+        with medir("telegram_edicion"):
+            await despachador.editar_mensaje(chat_id, message_id, texto_mensaje)
+
+    async def enviar_documento(ruta: str, nombre: str, leyenda: str):
+        return await despachador.enviar_documento(chat_id, ruta, nombre, leyenda)
+
+    inicio = time.perf_counter()
+    with iniciar_traza(chat_id=chat_id, update_id=update.get("update_id")):
+        resultado = {}
         try:
-            # Procesar con el sistema multiagente
-            resultado = asyncio.run(agent_master.process({
+            # Procesar con el sistema multiagente (resultados primero, análisis como edición)
+            resultado = await obtener_agent_master().process({
                 "texto": texto,
-                "chat_id": chat_id
-            }))
-            
+                "chat_id": chat_id,
+                "enviar": enviar,
+                "editar": editar,
+                "enviar_documento": enviar_documento
+            })
+
             respuesta = resultado["respuesta"]
-            
+
         except Exception as e:
             traceback.print_exc()
             respuesta = f"❌ Error del sistema:\n{str(e)}"
-        
-        # Enviar respuesta a Telegram
+
+        # Enviar respuesta a Telegram si el master no la envió ya
+        if not resultado.get("enviado"):
+            try:
+                await enviar(respuesta)
+            except Exception as e:
+                print(f"❌ Error enviando mensaje: {str(e)}")
+
+    TIEMPOS.registrar_solicitud(time.perf_counter() - inicio)
+    return respuesta
+
+async def enviar_alerta(texto: str):
+    # Alertas proactivas del recolector a los chats de guardia configurados
+    for chat_id in Config.ALERTAS_CHAT_IDS:
         try:
-            bot.send_message(chat_id=chat_id, text=respuesta)
+            await despachador.enviar_mensaje(chat_id, texto)
         except Exception as e:
-            print(f"❌ Error enviando mensaje: {str(e)}")
-    
+            print(f"❌ Error enviando alerta al chat {chat_id}: {str(e)}")
+
+# Bajo ASGI las alertas van al loop del servidor (mismo cliente y cola del despachador);
+# sin él, al loop de fondo de WSGI
+_loop_alertas: Optional[asyncio.AbstractEventLoop] = None
+
+def vincular_alertas(loop: asyncio.AbstractEventLoop):
+    global _loop_alertas
+    _loop_alertas = loop
+
+def notificar_alerta(texto: str):
+    # Se llama desde el hilo del recolector: el envío se agenda en el loop que corresponda
+    if Config.ALERTAS_CHAT_IDS:
+        if _loop_alertas is not None:
+            asyncio.run_coroutine_threadsafe(enviar_alerta(texto), _loop_alertas)
+        else:
+            bucle_fondo.ejecutar(enviar_alerta(texto))
+
+def crear_cola_ingesta() -> ColaIngesta:
+    return ColaIngesta(
+        atender_update,
+        concurrencia=Config.INGESTA_CONCURRENCIA,
+        max_pendientes=Config.INGESTA_MAX_PENDIENTES,
+        tamano_dedup=Config.INGESTA_DEDUP_TAMANO
+    )
+
+def es_mensaje_texto(data: Dict[str, Any]) -> bool:
+    return bool(data) and "message" in data and "text" in data["message"]
+
+def estado_sistema() -> Dict[str, Any]:
+    agent_master = obtener_agent_master()
+    return {
+        "status": "ok",
+        "system": "multiagent-sql-bot",
+        "oracle_pool": agent_master.oracle_executor.estadisticas_pool(),
+        "cache_sql": agent_master.agent_sql_generator.cache.estadisticas(),
+        "cache_resultados": agent_master.cache_resultados.estadisticas(),
+        "destinos": agent_master.destinos.estadisticas(),
+        "recolector": agent_master.recolector.estadisticas(),
+        "sesiones": agent_master.agent_seguimiento.sesiones.estadisticas(),
+        "telegram": despachador.estadisticas(),
+        "ingesta": cola_ingesta.estadisticas(),
+        "llm": obtener_gateway().estadisticas(),
+        "arranque": TIEMPOS.estadisticas()
+    }
+
+def colector_sistema():
+    # Traduce las estadísticas de cada componente a familias Prometheus en cada scrape
+    agent_master = obtener_agent_master()
+    pool = agent_master.oracle_executor.estadisticas_pool()
+    motor = pool["motor"]
+    cache_sql = agent_master.agent_sql_generator.cache.estadisticas()
+    cache_resultados = agent_master.cache_resultados.estadisticas()
+    ingesta = cola_ingesta.estadisticas()
+    llm = obtener_gateway().estadisticas()["agentes"]
+    recolector = agent_master.recolector.estadisticas()
+    telegram = despachador.estadisticas()
+
+    return [
+        ("agentebd_oracle_pool_conexiones", "gauge", "Conexiones del pool Oracle por estado",
+         [({"estado": "abiertas"}, pool["abiertas"]), ({"estado": "ocupadas"}, pool["ocupadas"])]),
+        ("agentebd_oracle_pool_espera_segundos", "gauge", "Espera al adquirir conexión del pool",
+         [({"estadistico": "media"}, pool["espera_media_ms"] / 1000), ({"estadistico": "max"}, pool["espera_max_ms"] / 1000)]),
+        ("agentebd_oracle_motor_pendientes", "gauge", "Sentencias en cola o en ejecución",
+         [({}, motor["pendientes"])]),
+        ("agentebd_oracle_motor_eventos_total", "counter", "Sentencias rechazadas, expiradas o canceladas",
+         [({"evento": e}, motor[e]) for e in ("rechazadas", "timeouts", "canceladas")]),
+        ("agentebd_cache_aciertos_total", "counter", "Aciertos por caché",
+         [({"cache": "sql"}, cache_sql["aciertos"]), ({"cache": "resultados"}, cache_resultados["aciertos"] + cache_resultados["coalescidas"])]),
+        ("agentebd_cache_fallos_total", "counter", "Fallos por caché",
+         [({"cache": "sql"}, cache_sql["fallos"]), ({"cache": "resultados"}, cache_resultados["fallos"])]),
+        ("agentebd_ingesta_pendientes", "gauge", "Updates aceptados aún sin procesar",
+         [({}, ingesta["pendientes"])]),
+        ("agentebd_ingesta_updates_total", "counter", "Updates recibidos por resultado de admisión",
+         [({"resultado": r}, ingesta[r]) for r in ("aceptados", "duplicados", "rechazados", "errores")]),
+        ("agentebd_llm_tokens_total", "counter", "Tokens consumidos por agente",
+         [({"agente": a, "tipo": t}, u[f"tokens_{t}"]) for a, u in llm.items() for t in ("prompt", "respuesta")]),
+        ("agentebd_llm_llamadas_total", "counter", "Llamadas al LLM por agente y resultado",
+         [({"agente": a, "resultado": r}, u[r]) for a, u in llm.items() for r in ("llamadas", "errores", "reintentos")]),
+        ("agentebd_recolector_series", "gauge", "Series temporales en memoria y alertas activas",
+         [({"estadistico": "series"}, recolector["series"]), ({"estadistico": "muestras"}, recolector["muestras"]),
+          ({"estadistico": "alertas_activas"}, recolector["alertas_activas"])]),
+        ("agentebd_telegram_pendientes", "gauge", "Envíos a Telegram en cola",
+         [({}, telegram["pendientes"])]),
+        ("agentebd_arranque_segundos", "gauge", "Duración de cada fase de arranque del proceso",
+         [({"fase": f}, s) for f, s in TIEMPOS.fases().items()]),
+    ]
+
+# Un único event loop persistente atiende todas las peticiones de los hilos de Flask
+bucle_fondo = BucleFondo()
+cola_ingesta = crear_cola_ingesta()
+REGISTRO.registrar_colector(colector_sistema)
+
+_pid_iniciado = None
+_lock_inicio = threading.Lock()
+
+def iniciar_proceso(vincular_ingesta: bool = True):
+    # Loop, hilos y conexiones son de cada proceso: tras un fork se crean de nuevo en el hijo
+    global _pid_iniciado
+    if _pid_iniciado == os.getpid():
+        return
+    with _lock_inicio:
+        if _pid_iniciado == os.getpid():
+            return
+        with TIEMPOS.medir("inicio_proceso"):
+            if vincular_ingesta:
+                cola_ingesta.vincular(bucle_fondo.iniciar())
+            obtener_agent_master().recolector.asegurar_inicio()
+        _pid_iniciado = os.getpid()
+
+def precalentar(antes_de_fork: bool = False):
+    # Catálogo e índice del router listos antes de servir; antes de un fork además el índice
+    # de esquema y el SDK del LLM, que los workers heredan copy-on-write en vez de cargarlos
+    with TIEMPOS.medir("precalentamiento"):
+        resumen = obtener_agent_master().precalentar(antes_de_fork)
+        if antes_de_fork:
+            cargar_sdk()
+            congelar_memoria()
+    print(f"🔥 Precalentado: {resumen}")
+
+@app.before_request
+def asegurar_proceso():
+    # Modo diferido sin hook post_fork: el primer request de cada proceso lo inicia
+    iniciar_proceso()
+
+if Config.ARRANQUE_MODO != "diferido":
+    if Config.ARRANQUE_PRECALENTAR:
+        precalentar()
+    iniciar_proceso()
+TIEMPOS.marcar("import", time.perf_counter() - TIEMPOS.inicio)
+
+@app.route("/webhook", methods=["POST"])
+def webhook():
+    data = request.get_json()
+
+    if es_mensaje_texto(data):
+        chat_id = data["message"]["chat"]["id"]
+        estado, futuro = cola_ingesta.enviar(data, chat_id)
+
+        if estado == LLENO:
+            # Telegram reintentará más tarde: contrapresión en lugar de perder el mensaje
+            return "busy", 503
+
+        if estado == ACEPTADO and Config.INGESTA_MODO == "sincrono":
+            try:
+                futuro.result(timeout=Config.INGESTA_TIMEOUT_SINCRONO)
+            except Exception as e:
+                print(f"❌ Error procesando mensaje: {str(e)}")
+
     return "ok"
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    return {"status": "ok", "system": "multiagent-sql-bot"}
+    return estado_sistema()
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRO.exportar(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     print("🚀 Iniciando sistema multiagente...")
     print("📋 Agentes disponibles: Master, ConsultasPredefinidas, SQLGenerator, Analisis")
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    print(f"📥 Ingesta en modo {Config.INGESTA_MODO} (concurrencia={Config.INGESTA_CONCURRENCIA})")
+    app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
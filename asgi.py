@@ -0,0 +1,93 @@
+# =============================================================================
+# ARCHIVO: asgi.py
+# Descripción: Punto de entrada ASGI (uvicorn/hypercorn) con ingesta asíncrona
+# Uso: uvicorn asgi:app --host 0.0.0.0 --port 5000
+# =============================================================================
+
+import asyncio
+import json
+import os
+
+# La ingesta corre en el loop del servidor: importar app no debe arrancar su loop de fondo
+# (el modo inmediato se cumple en el arranque del lifespan)
+os.environ["ARRANQUE_MODO"] = "diferido"
+
+from config.settings import Config
+from app import crear_cola_ingesta, es_mensaje_texto, estado_sistema, LLENO
+from services.metricas import REGISTRO
+import app as aplicacion_wsgi
+
+# En ASGI la cola vive en el loop del propio servidor, no en el hilo de fondo
+cola_ingesta = crear_cola_ingesta()
+aplicacion_wsgi.cola_ingesta = cola_ingesta
+
+async def _leer_cuerpo(receive) -> bytes:
+    cuerpo = b""
+    while True:
+        mensaje = await receive()
+        cuerpo += mensaje.get("body", b"")
+        if not mensaje.get("more_body", False):
+            return cuerpo
+
+async def _responder(send, estado: int, cuerpo: bytes, tipo: bytes = b"text/plain; charset=utf-8"):
+    await send({
+        "type": "http.response.start",
+        "status": estado,
+        "headers": [(b"content-type", tipo), (b"content-length", str(len(cuerpo)).encode())]
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+async def _lifespan(receive, send):
+    while True:
+        mensaje = await receive()
+        if mensaje["type"] == "lifespan.startup":
+            # Hilos del proceso (recolector); la ingesta y las alertas usan el loop del servidor
+            if Config.ARRANQUE_PRECALENTAR:
+                aplicacion_wsgi.precalentar()
+            aplicacion_wsgi.vincular_alertas(asyncio.get_running_loop())
+            aplicacion_wsgi.iniciar_proceso(vincular_ingesta=False)
+            cola_ingesta.vincular(asyncio.get_running_loop())
+            await send({"type": "lifespan.startup.complete"})
+        elif mensaje["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    if scope["type"] != "http":
+        return
+
+    ruta, metodo = scope["path"], scope["method"]
+
+    if ruta == "/webhook" and metodo == "POST":
+        try:
+            data = json.loads(await _leer_cuerpo(receive) or b"{}")
+        except ValueError:
+            await _responder(send, 400, b"bad request")
+            return
+
+        if es_mensaje_texto(data):
+            # Por si el servidor no soporta lifespan
+            aplicacion_wsgi.vincular_alertas(asyncio.get_running_loop())
+            aplicacion_wsgi.iniciar_proceso(vincular_ingesta=False)
+            cola_ingesta.vincular(asyncio.get_running_loop())
+            estado, _ = cola_ingesta.enviar(data, data["message"]["chat"]["id"])
+            if estado == LLENO:
+                await _responder(send, 503, b"busy")
+                return
+
+        await _responder(send, 200, b"ok")
+        return
+
+    if ruta == "/health" and metodo == "GET":
+        await _responder(send, 200, json.dumps(estado_sistema()).encode(), b"application/json")
+        return
+
+    if ruta == "/metrics" and metodo == "GET":
+        await _responder(send, 200, REGISTRO.exportar().encode(), b"text/plain; version=0.0.4")
+        return
+
+    await _responder(send, 404, b"not found")
@@ -0,0 +1,82 @@
+# =============================================================================
+# ARCHIVO: benchmarks/bench_catalogo.py
+# Descripción: Micro-benchmark del matcher del catálogo (1,000 consultas)
+# Uso: python -m benchmarks.bench_catalogo [--consultas 1000] [--repeticiones 2000]
+# =============================================================================
+
+import argparse
+import random
+import time
+from agents.catalogo_consultas import CatalogoConsultas, normalizar_texto
+
+PALABRAS = [
+    "estado", "sesiones", "procesos", "tablespace", "espacio", "bloqueos", "usuarios",
+    "instancia", "memoria", "sga", "pga", "redo", "archivelog", "backup", "jobs",
+    "indices", "invalidos", "objetos", "cpu", "esperas", "locks", "undo", "temp",
+    "crecimiento", "listener", "servicios", "parametros", "alertas", "dataguard", "rman"
+]
+
+def generar_catalogo(num_consultas: int, patrones_por_consulta: int, semilla: int = 42) -> dict:
+    aleatorio = random.Random(semilla)
+    consultas = {}
+    for i in range(num_consultas):
+        patrones = [
+            " ".join(aleatorio.sample(PALABRAS, aleatorio.randint(2, 4))) + f" {i}-{j}"
+            for j in range(patrones_por_consulta)
+        ]
+        consultas[f"consulta_{i}"] = {"patrones": patrones, "sql": f"SELECT {i} FROM DUAL", "ttl": 0}
+    return {"consultas": consultas}
+
+def generar_textos(catalogo: dict, cantidad: int, semilla: int = 7) -> list:
+    aleatorio = random.Random(semilla)
+    nombres = list(catalogo["consultas"])
+    textos = []
+    for i in range(cantidad):
+        if i % 2 == 0:
+            # Mitad con coincidencia, mitad sin ella (peor caso para el bucle ingenuo)
+            patron = aleatorio.choice(catalogo["consultas"][aleatorio.choice(nombres)]["patrones"])
+            textos.append(normalizar_texto(f"¿Me puedes mostrar {patron} por favor?"))
+        else:
+            textos.append(normalizar_texto("¿" + " ".join(aleatorio.sample(PALABRAS, 6)) + " de la base?"))
+    return textos
+
+def buscar_ingenuo(consultas: dict, texto: str):
+    # Réplica del algoritmo anterior: bucle anidado con `patron in texto`
+    for nombre, config in consultas.items():
+        for patron in config["patrones"]:
+            if patron in texto:
+                return nombre
+    return None
+
+def medir(funcion, textos: list, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        funcion(textos[i % len(textos)])
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark del matcher de consultas predefinidas")
+    parser.add_argument("--consultas", type=int, default=1000)
+    parser.add_argument("--patrones", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    datos = generar_catalogo(args.consultas, args.patrones)
+
+    inicio = time.perf_counter()
+    catalogo = CatalogoConsultas.desde_dict(datos)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    consultas = catalogo.consultas
+    textos = generar_textos(datos, 200)
+
+    us_ingenuo = medir(lambda t: buscar_ingenuo(consultas, t), textos, args.repeticiones)
+    us_automata = medir(lambda t: catalogo.buscar(t)[0], textos, args.repeticiones)
+
+    print(f"Catálogo: {args.consultas} consultas, {args.consultas * args.patrones} patrones")
+    print(f"Construcción del autómata: {construccion_ms:.1f} ms")
+    print(f"Bucle anidado:  {us_ingenuo:9.1f} µs/búsqueda")
+    print(f"Aho-Corasick:   {us_automata:9.1f} µs/búsqueda  (x{us_ingenuo / us_automata:.1f})")
+
+if __name__ == "__main__":
+    main()
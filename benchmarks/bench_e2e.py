@@ -0,0 +1,270 @@
+# =============================================================================
+# ARCHIVO: benchmarks/bench_e2e.py
+# Descripción: Benchmark extremo a extremo offline: /webhook -> AgentMaster ->
+#              Oracle/OpenAI/Telegram falsos, con línea base para detectar regresiones
+# Uso: python -m benchmarks.bench_e2e --solicitudes 500 --concurrencia 16
+#      python -m benchmarks.bench_e2e --guardar-baseline
+#      python -m benchmarks.bench_e2e --baseline benchmarks/baseline.json
+# =============================================================================
+
+import argparse
+import http.client
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+CORPUS_POR_DEFECTO = os.path.join(DIRECTORIO, "corpus_webhook.json")
+BASELINE_POR_DEFECTO = os.path.join(DIRECTORIO, "baseline.json")
+
+# (métrica, True si más alto es mejor)
+METRICAS_COMPARADAS = [
+    ("throughput_rps", True),
+    ("latencia_e2e_ms.p50", False),
+    ("latencia_e2e_ms.p95", False),
+    ("memoria.rss_max_mb", False),
+]
+
+def percentiles(valores: List[float]) -> Dict[str, float]:
+    if not valores:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordenados = sorted(valores)
+    def q(p):
+        return round(ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))], 3)
+    return {"p50": q(0.5), "p95": q(0.95), "p99": q(0.99)}
+
+def leer_metrica(datos: Dict[str, Any], ruta: str) -> float:
+    for parte in ruta.split("."):
+        datos = datos[parte]
+    return float(datos)
+
+def preparar_entorno(args, url_openai: str, url_telegram: str):
+    # Debe ejecutarse antes de importar config.settings: la configuración se lee al importar
+    os.environ.update({
+        "TELEGRAM_TOKEN": "123456:BENCH",
+        "TELEGRAM_BASE_URL": url_telegram,
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": url_openai,
+        "ORACLE_USER": "bench",
+        "ORACLE_PASSWORD": "bench",
+        "ORACLE_DSN": "bench/falso",
+        "INGESTA_MODO": args.modo,
+        "SQL_CACHE_RUTA": "",
+        "ESQUEMA_INDICE_RUTA": "",
+        "LLM_TASA_POR_SEGUNDO": "0",
+    })
+
+def cargar_corpus(ruta: str, solicitudes: int) -> List[Dict[str, Any]]:
+    with open(ruta, encoding="utf-8") as archivo:
+        base = json.load(archivo)
+    corpus = []
+    for i in range(solicitudes):
+        update = json.loads(json.dumps(base[i % len(base)]))
+        # update_id y chat únicos: cada respuesta en Telegram identifica su solicitud
+        update["update_id"] = 10_000_000 + i
+        update["message"]["chat"]["id"] = 20_000_000 + i
+        corpus.append(update)
+    return corpus
+
+def ejecutar(args) -> Dict[str, Any]:
+    from fakes.openai_server import ServidorOpenAIFalso
+    from fakes.telegram_server import ServidorTelegramFalso
+
+    servidor_openai = ServidorOpenAIFalso(latencia=args.latencia_llm, jitter=args.latencia_llm * 0.2,
+                                          tasa_error=args.error_llm).iniciar()
+    servidor_telegram = ServidorTelegramFalso(latencia=args.latencia_telegram,
+                                              tasa_error=args.error_telegram).iniciar()
+    preparar_entorno(args, servidor_openai.base_url, servidor_telegram.base_url)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    from fakes.oracle import FabricaOracleFalso
+    from database.oracle_executor import establecer_fabrica_pool
+    fabrica_oracle = FabricaOracleFalso(latencia=args.latencia_oracle, jitter=args.latencia_oracle * 0.2,
+                                        tasa_error=args.error_oracle, filas=args.filas)
+    establecer_fabrica_pool(fabrica_oracle)
+
+    inicio_import = time.perf_counter()
+    import app as aplicacion
+    import_ms = (time.perf_counter() - inicio_import) * 1000
+    from services.metricas import LATENCIA_ETAPA
+    from werkzeug.serving import make_server
+
+    servidor_http = make_server("127.0.0.1", 0, aplicacion.app, threaded=True)
+    puerto = servidor_http.server_port
+    threading.Thread(target=servidor_http.serve_forever, daemon=True).start()
+
+    corpus = cargar_corpus(args.corpus, args.solicitudes)
+    envios: Dict[int, float] = {}
+    latencias_ack: List[float] = []
+    errores_http = 0
+    reintentos_503 = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def enviar_http(cuerpo: bytes) -> int:
+        conexion = getattr(local, "conexion", None)
+        if conexion is None:
+            conexion = local.conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=300)
+        try:
+            conexion.request("POST", "/webhook", cuerpo, {"Content-Type": "application/json"})
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            return respuesta.status
+        except Exception:
+            local.conexion = None
+            return 0
+
+    def publicar(update: Dict[str, Any]):
+        nonlocal errores_http, reintentos_503
+        cuerpo = json.dumps(update).encode()
+        inicio = time.perf_counter()
+        with lock:
+            envios[update["message"]["chat"]["id"]] = inicio
+        estado = enviar_http(cuerpo)
+        # Como Telegram, reintentar más tarde si el bot aplica contrapresión
+        for _ in range(args.reintentos_503):
+            if estado != 503:
+                break
+            with lock:
+                reintentos_503 += 1
+            time.sleep(0.5)
+            estado = enviar_http(cuerpo)
+        with lock:
+            latencias_ack.append((time.perf_counter() - inicio) * 1000)
+            if estado != 200:
+                errores_http += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as hilos:
+        list(hilos.map(publicar, corpus))
+
+    # En modo asíncrono la respuesta llega a Telegram después del ack
+    limite = time.perf_counter() + args.espera_max
+    while time.perf_counter() < limite:
+        with servidor_telegram._lock:
+            chats = {str(l["chat_id"]) for l in servidor_telegram.llamadas}
+        if len(chats) >= len(corpus) - errores_http:
+            break
+        time.sleep(0.05)
+    duracion = time.perf_counter() - inicio
+
+    primera_respuesta: Dict[str, float] = {}
+    with servidor_telegram._lock:
+        for llamada in servidor_telegram.llamadas:
+            primera_respuesta.setdefault(str(llamada["chat_id"]), llamada["instante"])
+    latencias_e2e = [
+        (primera_respuesta[str(chat)] - enviado) * 1000
+        for chat, enviado in envios.items() if str(chat) in primera_respuesta
+    ]
+
+    etapas = {}
+    for etiquetas in LATENCIA_ETAPA.series():
+        cuantiles = LATENCIA_ETAPA.cuantiles(**etiquetas)
+        etapas[etiquetas["etapa"]] = {f"p{int(q * 100)}": round(v * 1000, 3) for q, v in cuantiles.items()}
+
+    memoria = {"rss_max_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if args.tracemalloc:
+        memoria["tracemalloc_pico_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+
+    servidor_http.shutdown()
+    servidor_openai.detener()
+    servidor_telegram.detener()
+
+    return {
+        "configuracion": {
+            "modo": args.modo,
+            "solicitudes": args.solicitudes,
+            "concurrencia": args.concurrencia,
+            "latencia_oracle_s": args.latencia_oracle,
+            "latencia_llm_s": args.latencia_llm,
+            "latencia_telegram_s": args.latencia_telegram,
+            "filas": args.filas,
+        },
+        "completadas": len(latencias_e2e),
+        "errores_http": errores_http,
+        "reintentos_503": reintentos_503,
+        "duracion_s": round(duracion, 3),
+        "throughput_rps": round(len(latencias_e2e) / duracion, 2) if duracion else 0.0,
+        "latencia_ack_ms": percentiles(latencias_ack),
+        "latencia_e2e_ms": percentiles(latencias_e2e),
+        "etapas_ms": etapas,
+        "memoria": memoria,
+        "import_app_ms": round(import_ms, 1),
+        "llamadas_externas": {
+            "oracle": fabrica_oracle.ejecuciones,
+            "llm": servidor_openai.peticiones,
+            "telegram": len(servidor_telegram.llamadas),
+        },
+    }
+
+def comparar(resultado: Dict[str, Any], baseline: Dict[str, Any], tolerancia: float) -> List[str]:
+    regresiones = []
+    for metrica, mayor_es_mejor in METRICAS_COMPARADAS:
+        try:
+            actual, referencia = leer_metrica(resultado, metrica), leer_metrica(baseline, metrica)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if referencia == 0:
+            continue
+        if mayor_es_mejor and actual < referencia * (1 - tolerancia):
+            regresiones.append(f"{metrica}: {actual} < {referencia} (-{tolerancia:.0%})")
+        if not mayor_es_mejor and actual > referencia * (1 + tolerancia):
+            regresiones.append(f"{metrica}: {actual} > {referencia} (+{tolerancia:.0%})")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extremo a extremo con servicios falsos")
+    parser.add_argument("--corpus", default=CORPUS_POR_DEFECTO)
+    parser.add_argument("--solicitudes", type=int, default=300)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--modo", choices=("asincrono", "sincrono"), default="asincrono")
+    parser.add_argument("--latencia-oracle", type=float, default=0.02)
+    parser.add_argument("--latencia-llm", type=float, default=0.2)
+    parser.add_argument("--latencia-telegram", type=float, default=0.02)
+    parser.add_argument("--error-oracle", type=float, default=0.0)
+    parser.add_argument("--error-llm", type=float, default=0.0)
+    parser.add_argument("--error-telegram", type=float, default=0.0)
+    parser.add_argument("--filas", type=int, default=50, help="filas devueltas por consulta falsa")
+    parser.add_argument("--reintentos-503", type=int, default=60, help="reintentos ante 503 (contrapresión)")
+    parser.add_argument("--espera-max", type=float, default=120, help="segundos para esperar respuestas pendientes")
+    parser.add_argument("--tracemalloc", action="store_true", help="mide el pico de memoria Python (más lento)")
+    parser.add_argument("--salida", default=None, help="ruta del JSON de resultados")
+    parser.add_argument("--baseline", default=None, help="línea base contra la que comparar")
+    parser.add_argument("--guardar-baseline", action="store_true")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    resultado = ejecutar(args)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+
+    if args.guardar_baseline:
+        with open(args.baseline or BASELINE_POR_DEFECTO, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+        print(f"💾 Línea base guardada en {args.baseline or BASELINE_POR_DEFECTO}")
+        return
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as archivo:
+            baseline = json.load(archivo)
+        regresiones = comparar(resultado, baseline, args.tolerancia)
+        if regresiones:
+            print("❌ Regresiones detectadas:\n  " + "\n  ".join(regresiones))
+            sys.exit(1)
+        print("✅ Sin regresiones respecto a la línea base")
+
+if __name__ == "__main__":
+    main()
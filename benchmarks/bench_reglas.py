@@ -0,0 +1,56 @@
+# =============================================================================
+# ARCHIVO: benchmarks/bench_reglas.py
+# Descripción: Micro-benchmark de los analizadores locales por reglas sobre
+#              resultados de distinto tamaño (1 instancia a muchos destinos)
+# Uso: python -m benchmarks.bench_reglas [--repeticiones 200]
+# =============================================================================
+
+import argparse
+import logging
+import random
+import time
+from agents.analizadores_reglas import REGISTRO_ANALIZADORES
+from database.resultado import ResultadoConsulta
+
+RECURSOS = ["processes", "sessions", "enqueue_locks", "enqueue_resources", "ges_procs", "ges_locks",
+            "max_rollback_segments", "parallel_max_servers", "transactions", "dml_locks"]
+
+def generar_recursos(filas: int, semilla: int = 42) -> ResultadoConsulta:
+    aleatorio = random.Random(semilla)
+    columnas = ["DESTINO", "INST_ID", "RESOURCE_NAME", "CURRENT_UTILIZATION", "MAX_UTILIZATION", "LIMIT_VALUE"]
+    datos = []
+    for i in range(filas):
+        limite = aleatorio.choice([300, 472, 1000, 2000, None])
+        actual = aleatorio.randint(0, int((limite or 500) * 0.95))
+        datos.append((f"bd{i // (len(RECURSOS) * 4)}", (i // len(RECURSOS)) % 4 + 1, RECURSOS[i % len(RECURSOS)],
+                      actual, actual + aleatorio.randint(0, 20), " UNLIMITED" if limite is None else f"{limite:>10}"))
+    return ResultadoConsulta(columnas, datos)
+
+def generar_estado(filas: int, semilla: int = 7) -> ResultadoConsulta:
+    aleatorio = random.Random(semilla)
+    columnas = ["DESTINO", "INSTANCE_NAME", "STATUS", "DATABASE_STATUS", "ARCHIVER"]
+    datos = [(f"bd{i // 4}", f"ORCL{i % 4 + 1}", "OPEN" if aleatorio.random() > 0.01 else "MOUNTED",
+              "ACTIVE", "STARTED" if aleatorio.random() > 0.01 else "STOPPED") for i in range(filas)]
+    return ResultadoConsulta(columnas, datos)
+
+def medir(nombre: str, resultados: ResultadoConsulta, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        REGISTRO_ANALIZADORES.analizar(nombre, resultados)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de los analizadores por reglas")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'filas':>8} {'procesos_sesiones':>20} {'estado_bd':>14}")
+    for filas in (40, 1000, 10000, 100000):
+        repeticiones = max(3, args.repeticiones * 40 // filas) if filas > 1000 else args.repeticiones
+        us_recursos = medir("procesos_sesiones", generar_recursos(filas), repeticiones)
+        us_estado = medir("estado_bd", generar_estado(filas), repeticiones)
+        print(f"{filas:>8} {us_recursos:>17.1f} µs {us_estado:>11.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# =============================================================================
+# ARCHIVO: benchmarks/bench_router.py
+# Descripción: Casos de regresión y latencia del router local de intenciones
+# Uso: python -m benchmarks.bench_router [--repeticiones 2000]
+# =============================================================================
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from agents.agent_router import AgentRouterIntenciones
+from agents.catalogo_consultas import CatalogoConsultas, normalizar_texto
+from config.settings import Config
+
+# (pregunta, consulta esperada); None = debe caer al generador de SQL
+CASOS = [
+    ("cuantas sesiones hay", "procesos_sesiones"),
+    ("sesiones disponibles ahora", "procesos_sesiones"),
+    ("cuantas sesiones quedan libres", "procesos_sesiones"),
+    ("limite de procesos de la base", "procesos_sesiones"),
+    ("estado general del sistema", "estado_bd"),
+    ("la base de datos esta arriba", "estado_bd"),
+    ("como esta la instancia 2", "estado_instancia"),
+    ("sesiones del usuario scott", "sesiones_usuario"),
+    ("quien esta conectado como usuario hr", "sesiones_usuario"),
+    # Parecidas a una consulta del catálogo pero piden otra cosa
+    ("lista las sesiones activas", None),
+    ("cuantas sesiones hay por usuario", None),
+    ("sesiones libres en la instancia 2", None),
+    ("que tal esta la bd", None),
+    ("tablespaces llenos", None),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Regresión y latencia del router de intenciones")
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    router = AgentRouterIntenciones(CatalogoConsultas(Config.CATALOGO_CONSULTAS_RUTA))
+    router.precalentar()
+
+    fallos = 0
+    for pregunta, esperada in CASOS:
+        respuesta = asyncio.run(router.process({"texto": pregunta}))
+        obtenida = respuesta.get("nombre_consulta")
+        correcto = obtenida == esperada
+        fallos += not correcto
+        print(f"{'✅' if correcto else '❌'} {pregunta!r:42} -> {obtenida} "
+              f"(esperada {esperada}, confianza {respuesta['confianza']:.2f})")
+
+    indice = router._obtener_indice()
+    textos = [normalizar_texto(pregunta) for pregunta, _ in CASOS]
+    inicio = time.perf_counter()
+    for i in range(args.repeticiones):
+        texto = textos[i % len(textos)]
+        candidatos = indice.candidatos(texto)
+        if candidatos:
+            indice.motivo_descarte(texto, candidatos[0][0])
+    us_busqueda = (time.perf_counter() - inicio) / args.repeticiones * 1e6
+
+    print(f"Umbral {router.umbral}, margen {router.margen}: {len(CASOS) - fallos}/{len(CASOS)} casos correctos")
+    print(f"Búsqueda en el índice: {us_busqueda:.1f} µs")
+    sys.exit(1 if fallos else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# =============================================================================
+# ARCHIVO: cache/resultados.py
+# Descripción: Caché de resultados de corta duración con coalescencia de peticiones
+# =============================================================================
+
+import asyncio
+import threading
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CacheResultados:
+    def __init__(self, max_entradas: int = 256):
+        self.max_entradas = max_entradas
+        # sql -> (resultado, expira_en)
+        self._entradas: Dict[str, Tuple[Any, float]] = {}
+        # sql -> futuro de la ejecución en curso (single-flight)
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+        self._aciertos = 0
+        self._fallos = 0
+        self._coalescidas = 0
+
+    def obtener(self, clave: str):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] > time.monotonic():
+                self._aciertos += 1
+                return entrada[0]
+        return None
+
+    def guardar(self, clave: str, resultado: Any, ttl: float):
+        with self._lock:
+            self._entradas[clave] = (resultado, time.monotonic() + ttl)
+            if len(self._entradas) > self.max_entradas:
+                self._purgar()
+
+    def _purgar(self):
+        ahora = time.monotonic()
+        for clave in [c for c, (_, expira) in self._entradas.items() if expira <= ahora]:
+            del self._entradas[clave]
+        # Si sigue lleno, se descartan las que caducan antes
+        while len(self._entradas) > self.max_entradas:
+            clave = min(self._entradas, key=lambda c: self._entradas[c][1])
+            del self._entradas[clave]
+
+    async def obtener_o_ejecutar(self, clave: str, ttl: float, ejecutar: Callable[[], Awaitable[Any]]) -> Any:
+        resultado = self.obtener(clave)
+        if resultado is not None:
+            return resultado
+
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None and futuro.get_loop() is asyncio.get_running_loop():
+            # Ya hay una ejecución idéntica en curso: se comparte su resultado
+            with self._lock:
+                self._coalescidas += 1
+            return await asyncio.shield(futuro)
+
+        with self._lock:
+            self._fallos += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            resultado = await ejecutar()
+            if ttl > 0:
+                self.guardar(clave, resultado, ttl)
+            futuro.set_result(resultado)
+            return resultado
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                # Quien esperaba la ejecución compartida no pidió cancelar: recibe un error normal
+                e = Exception("La ejecución compartida de la consulta fue cancelada")
+            futuro.set_exception(e)
+            # Evita el aviso de excepción no recuperada si nadie más esperaba
+            futuro.exception()
+            raise
+        finally:
+            if self._en_vuelo.get(clave) is futuro:
+                del self._en_vuelo[clave]
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "en_vuelo": len(self._en_vuelo),
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "coalescidas": self._coalescidas,
+            }
@@ -0,0 +1,105 @@
+# =============================================================================
+# ARCHIVO: cache/sesiones.py
+# Descripción: Sesiones por chat (LRU + TTL) con el último resultado en forma
+#              columnar y la vista actual (filtro, orden, página) sobre él
+# =============================================================================
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from database.resultado import ResultadoConsulta
+
+class SesionResultado:
+    def __init__(self, resultado: ResultadoConsulta, sql: str, texto: str):
+        # Columnar: una tupla por columna; las filas solo se rearman para mostrarlas
+        self.columnas = list(resultado.columnas)
+        self.valores: List[Tuple] = [tuple(col) for col in zip(*resultado.filas)] if resultado.filas \
+            else [() for _ in self.columnas]
+        self.num_filas = len(resultado)
+        self.hay_mas = resultado.hay_mas
+        self.obtenido_en = resultado.obtenido_en
+        self.avisos = list(resultado.avisos)
+        self.sql = sql
+        self.texto = texto
+        # Vista actual: índices de fila visibles (en orden) y descripción de lo aplicado
+        self.indices: List[int] = list(range(self.num_filas))
+        self.operaciones: List[str] = []
+        self.desde = 0
+        # Resultado agrupado: sustituye a la tabla base hasta que se quiten los filtros
+        self.agrupado: Optional[ResultadoConsulta] = None
+
+    def columna(self, nombre: str) -> Tuple:
+        return self.valores[self.columnas.index(nombre)]
+
+    def restablecer(self):
+        self.indices = list(range(self.num_filas))
+        self.operaciones = []
+        self.desde = 0
+        self.agrupado = None
+
+    def filas(self, indices: List[int]) -> List[Tuple]:
+        valores = self.valores
+        return [tuple(col[i] for col in valores) for i in indices]
+
+    def pagina(self, tamano: int) -> ResultadoConsulta:
+        if self.agrupado is not None:
+            filas = self.agrupado.filas[self.desde:self.desde + tamano]
+            return ResultadoConsulta(self.agrupado.columnas, filas, obtenido_en=self.obtenido_en)
+        filas = self.filas(self.indices[self.desde:self.desde + tamano])
+        return ResultadoConsulta(self.columnas, filas, obtenido_en=self.obtenido_en, avisos=self.avisos)
+
+    @property
+    def total_vista(self) -> int:
+        return len(self.agrupado) if self.agrupado is not None else len(self.indices)
+
+class CacheSesiones:
+    def __init__(self, max_entradas: int, ttl: float):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        # chat_id -> (sesión, expira_en); el orden de inserción es el de uso (LRU)
+        self._sesiones: "OrderedDict[Any, Tuple[SesionResultado, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._aciertos = 0
+        self._fallos = 0
+        self._expulsadas = 0
+
+    def obtener(self, chat_id: Any) -> Optional[SesionResultado]:
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._sesiones.get(chat_id)
+            if entrada is not None:
+                sesion, expira = entrada
+                if expira > ahora:
+                    self._sesiones.move_to_end(chat_id)
+                    self._aciertos += 1
+                    return sesion
+                del self._sesiones[chat_id]
+            self._fallos += 1
+        return None
+
+    def guardar(self, chat_id: Any, sesion: SesionResultado):
+        with self._lock:
+            self._sesiones[chat_id] = (sesion, time.monotonic() + self.ttl)
+            self._sesiones.move_to_end(chat_id)
+            while len(self._sesiones) > self.max_entradas:
+                self._sesiones.popitem(last=False)
+                self._expulsadas += 1
+
+    def renovar(self, chat_id: Any):
+        # Cada seguimiento atendido en local alarga la vida de la sesión
+        with self._lock:
+            entrada = self._sesiones.get(chat_id)
+            if entrada is not None:
+                self._sesiones[chat_id] = (entrada[0], time.monotonic() + self.ttl)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sesiones": len(self._sesiones),
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "expulsadas": self._expulsadas,
+            }
@@ -0,0 +1,160 @@
+# =============================================================================
+# ARCHIVO: cache/sql_cache.py
+# Descripción: Caché persistente pregunta -> SQL generada (LRU + TTL, SQLite opcional)
+# =============================================================================
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CacheSQL:
+    def __init__(self, max_entradas: int, ttl: int, ruta_sqlite: Optional[str] = None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ruta_sqlite = ruta_sqlite or None
+
+        # Nivel 1: memoria del proceso (clave -> (sql, expira_en))
+        self._memoria: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Nivel 2: SQLite compartido entre procesos (se abre por PID para ser seguro tras fork)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+
+        self._aciertos = 0
+        self._aciertos_disco = 0
+        self._fallos = 0
+        self._invalidaciones = 0
+
+    @staticmethod
+    def calcular_clave(pregunta_normalizada: str, modelo: str, version_prompt: str) -> str:
+        base = f"{modelo}\x1f{version_prompt}\x1f{pregunta_normalizada}"
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def _conexion(self) -> Optional[sqlite3.Connection]:
+        if not self.ruta_sqlite:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            directorio = os.path.dirname(self.ruta_sqlite)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            conn = sqlite3.connect(self.ruta_sqlite, timeout=5, check_same_thread=False, isolation_level=None)
+            # WAL permite lectores concurrentes de varios workers mientras uno escribe
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    clave TEXT PRIMARY KEY,
+                    pregunta TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    expira REAL NOT NULL,
+                    ultimo_uso REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sql_cache_uso ON sql_cache (ultimo_uso)")
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def obtener(self, pregunta_normalizada: str, modelo: str, version_prompt: str) -> Optional[str]:
+        clave = self.calcular_clave(pregunta_normalizada, modelo, version_prompt)
+        ahora = time.time()
+
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                sql, expira = entrada
+                if expira > ahora:
+                    self._memoria.move_to_end(clave)
+                    self._aciertos += 1
+                    return sql
+                del self._memoria[clave]
+
+            sql = self._obtener_disco(clave, ahora)
+            if sql is not None:
+                self._aciertos += 1
+                self._aciertos_disco += 1
+                self._guardar_memoria(clave, sql, ahora + self.ttl)
+                return sql
+
+            self._fallos += 1
+            return None
+
+    def guardar(self, pregunta_normalizada: str, modelo: str, version_prompt: str, sql: str):
+        clave = self.calcular_clave(pregunta_normalizada, modelo, version_prompt)
+        expira = time.time() + self.ttl
+
+        with self._lock:
+            self._guardar_memoria(clave, sql, expira)
+            self._guardar_disco(clave, pregunta_normalizada, sql, expira)
+
+    def invalidar(self, pregunta_normalizada: str, modelo: str, version_prompt: str):
+        # SQL rechazada o que falló al ejecutarse: la próxima vez se genera de nuevo
+        clave = self.calcular_clave(pregunta_normalizada, modelo, version_prompt)
+        with self._lock:
+            self._memoria.pop(clave, None)
+            try:
+                conn = self._conexion()
+                if conn is not None:
+                    conn.execute("DELETE FROM sql_cache WHERE clave = ?", (clave,))
+            except sqlite3.Error as e:
+                logger.error(f"❌ Error invalidando caché SQL en disco: {str(e)}")
+            self._invalidaciones += 1
+
+    def _guardar_memoria(self, clave: str, sql: str, expira: float):
+        self._memoria[clave] = (sql, expira)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def _obtener_disco(self, clave: str, ahora: float) -> Optional[str]:
+        try:
+            conn = self._conexion()
+            if conn is None:
+                return None
+            fila = conn.execute("SELECT sql, expira FROM sql_cache WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                return None
+            if fila[1] <= ahora:
+                conn.execute("DELETE FROM sql_cache WHERE clave = ?", (clave,))
+                return None
+            conn.execute("UPDATE sql_cache SET ultimo_uso = ? WHERE clave = ?", (ahora, clave))
+            return fila[0]
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error leyendo caché SQL en disco: {str(e)}")
+            return None
+
+    def _guardar_disco(self, clave: str, pregunta: str, sql: str, expira: float):
+        try:
+            conn = self._conexion()
+            if conn is None:
+                return
+            ahora = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO sql_cache (clave, pregunta, sql, expira, ultimo_uso) VALUES (?, ?, ?, ?, ?)",
+                (clave, pregunta, sql, expira, ahora)
+            )
+            # Expulsión: primero lo caducado, luego lo menos usado por encima del máximo
+            conn.execute("DELETE FROM sql_cache WHERE expira <= ?", (ahora,))
+            conn.execute("""
+                DELETE FROM sql_cache WHERE clave IN (
+                    SELECT clave FROM sql_cache ORDER BY ultimo_uso DESC LIMIT -1 OFFSET ?
+                )""", (self.max_entradas,))
+        except sqlite3.Error as e:
+            logger.error(f"❌ Error guardando caché SQL en disco: {str(e)}")
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entradas_memoria": len(self._memoria),
+                "aciertos": self._aciertos,
+                "aciertos_disco": self._aciertos_disco,
+                "fallos": self._fallos,
+                "invalidaciones": self._invalidaciones,
+                "persistente": bool(self.ruta_sqlite),
+            }
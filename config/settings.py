@@ -3,17 +3,144 @@
 # Descripción: Configuración centralizada
 # =============================================================================
 
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger("agentebd.config")
+
+DIRECTORIO_CONFIG = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+    TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "https://api.telegram.org/bot")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # p.ej. servidor falso local en pruebas
     ORACLE_USER = os.getenv("ORACLE_USER")
     ORACLE_PASSWORD = os.getenv("ORACLE_PASSWORD")
     ORACLE_DSN = os.getenv("ORACLE_DSN")
+
+    # Pool de conexiones Oracle
+    ORACLE_POOL_MIN = int(os.getenv("ORACLE_POOL_MIN", "1"))
+    ORACLE_POOL_MAX = int(os.getenv("ORACLE_POOL_MAX", "4"))
+    ORACLE_POOL_INCREMENT = int(os.getenv("ORACLE_POOL_INCREMENT", "1"))
+    ORACLE_POOL_PING_INTERVAL = int(os.getenv("ORACLE_POOL_PING_INTERVAL", "60"))  # segundos
+    ORACLE_POOL_WAIT_TIMEOUT = int(os.getenv("ORACLE_POOL_WAIT_TIMEOUT", "5000"))  # milisegundos
+    ORACLE_STMT_CACHE_SIZE = int(os.getenv("ORACLE_STMT_CACHE_SIZE", "50"))
+
+    # Motor de ejecución (hilos fuera del event loop)
+    ORACLE_WORKERS = int(os.getenv("ORACLE_WORKERS", os.getenv("ORACLE_POOL_MAX", "4")))
+    ORACLE_MAX_PENDIENTES = int(os.getenv("ORACLE_MAX_PENDIENTES", "16"))
+    ORACLE_CALL_TIMEOUT = int(os.getenv("ORACLE_CALL_TIMEOUT", "30000"))  # milisegundos por sentencia
+
+    # Lectura de resultados
+    ORACLE_MAX_FILAS = int(os.getenv("ORACLE_MAX_FILAS", "200"))
+    ORACLE_ARRAYSIZE = int(os.getenv("ORACLE_ARRAYSIZE", "100"))
+    ORACLE_LIMITAR_SQL = os.getenv("ORACLE_LIMITAR_SQL", "true").lower() == "true"  # envolver con FETCH FIRST
+
+    # Ingesta de webhooks
+    INGESTA_MODO = os.getenv("INGESTA_MODO", "asincrono")  # asincrono | sincrono
+    INGESTA_CONCURRENCIA = int(os.getenv("INGESTA_CONCURRENCIA", "8"))
+    INGESTA_MAX_PENDIENTES = int(os.getenv("INGESTA_MAX_PENDIENTES", "200"))
+    INGESTA_DEDUP_TAMANO = int(os.getenv("INGESTA_DEDUP_TAMANO", "5000"))
+    INGESTA_TIMEOUT_SINCRONO = int(os.getenv("INGESTA_TIMEOUT_SINCRONO", "120"))  # segundos
+    
+    # Caché de SQL generada
+    SQL_CACHE_MAX = int(os.getenv("SQL_CACHE_MAX", "1000"))
+    SQL_CACHE_TTL = int(os.getenv("SQL_CACHE_TTL", "604800"))  # segundos (7 días)
+    SQL_CACHE_RUTA = os.getenv("SQL_CACHE_RUTA", "")  # p.ej. data/sql_cache.sqlite3; vacío = solo memoria
+    
+    # Catálogo de consultas predefinidas
+    CATALOGO_CONSULTAS_RUTA = os.getenv("CATALOGO_CONSULTAS_RUTA", os.path.join(DIRECTORIO_CONFIG, "consultas_predefinidas.json"))
+    CATALOGO_RECARGA_INTERVALO = float(os.getenv("CATALOGO_RECARGA_INTERVALO", "5"))  # segundos entre revisiones del archivo
+    
+    # Router local de intenciones (similitud coseno 0-1)
+    ROUTER_UMBRAL = float(os.getenv("ROUTER_UMBRAL", "0.6"))
+    # Ventaja mínima sobre la segunda consulta más parecida
+    ROUTER_MARGEN = float(os.getenv("ROUTER_MARGEN", "0.1"))
+    
+    # Gateway LLM compartido
+    LLM_MAX_CONCURRENCIA = int(os.getenv("LLM_MAX_CONCURRENCIA", "8"))
+    LLM_TASA_POR_SEGUNDO = float(os.getenv("LLM_TASA_POR_SEGUNDO", "5"))
+    LLM_RAFAGA = float(os.getenv("LLM_RAFAGA", "10"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # segundos por llamada, reintentos incluidos
+    LLM_REINTENTOS = int(os.getenv("LLM_REINTENTOS", "3"))
+    LLM_MAX_CONEXIONES = int(os.getenv("LLM_MAX_CONEXIONES", "20"))
+    
+    # Respuesta en dos fases: tiempo máximo de espera del análisis
+    ANALISIS_TIMEOUT = float(os.getenv("ANALISIS_TIMEOUT", "45"))  # segundos
+    
+    # Analizadores por reglas: % de utilización para aviso y alerta crítica
+    REGLAS_UMBRAL_AVISO = float(os.getenv("REGLAS_UMBRAL_AVISO", "80"))
+    REGLAS_UMBRAL_CRITICO = float(os.getenv("REGLAS_UMBRAL_CRITICO", "90"))
+    
+    # Índice del diccionario de datos para el prompt del generador de SQL
+    ESQUEMA_INDICE_RUTA = os.getenv("ESQUEMA_INDICE_RUTA", os.path.join(os.path.dirname(DIRECTORIO_CONFIG), "data", "esquema_indice.json"))  # vacío = solo memoria
+    ESQUEMA_REFRESCO_INTERVALO = float(os.getenv("ESQUEMA_REFRESCO_INTERVALO", "86400"))  # segundos
+    ESQUEMA_TOKENS_MAX = int(os.getenv("ESQUEMA_TOKENS_MAX", "400"))
+    ESQUEMA_MAX_VISTAS = int(os.getenv("ESQUEMA_MAX_VISTAS", "4"))
+    
+    # Guardián de SQL generada (EXPLAIN PLAN antes de ejecutar)
+    GUARDIA_ACTIVA = os.getenv("GUARDIA_ACTIVA", "true").lower() == "true"
+    GUARDIA_PERMITIR_DML = os.getenv("GUARDIA_PERMITIR_DML", "false").lower() == "true"
+    GUARDIA_COSTE_MAX = float(os.getenv("GUARDIA_COSTE_MAX", "100000"))
+    GUARDIA_CARDINALIDAD_MAX = float(os.getenv("GUARDIA_CARDINALIDAD_MAX", "100000"))  # por encima: ejecutar con límite de filas
+    GUARDIA_EXPLAIN_TIMEOUT = int(os.getenv("GUARDIA_EXPLAIN_TIMEOUT", "5000"))  # milisegundos
+    GUARDIA_CACHE_MAX = int(os.getenv("GUARDIA_CACHE_MAX", "1000"))
+    GUARDIA_CACHE_TTL = int(os.getenv("GUARDIA_CACHE_TTL", "900"))  # segundos; los planes cambian con las estadísticas
+    
+    # Varias bases de datos: registro de destinos y consultas en abanico
+    DESTINOS_RUTA = os.getenv("DESTINOS_RUTA", os.path.join(DIRECTORIO_CONFIG, "destinos.json"))  # sin archivo = solo ORACLE_DSN
+    DESTINOS_TIMEOUT = int(os.getenv("DESTINOS_TIMEOUT", "15000"))  # milisegundos por destino
+    DESTINOS_WORKERS = int(os.getenv("DESTINOS_WORKERS", "16"))
+    DESTINOS_MAX_PENDIENTES = int(os.getenv("DESTINOS_MAX_PENDIENTES", "64"))
+    
+    # Exportación de resultados grandes como documento de Telegram
+    EXPORTAR_UMBRAL_FILAS = int(os.getenv("EXPORTAR_UMBRAL_FILAS", "50"))  # exportación automática a partir de aquí
+    EXPORTAR_FORMATO = os.getenv("EXPORTAR_FORMATO", "csv.gz")  # csv, csv.gz o xlsx
+    EXPORTAR_MAX_FILAS = int(os.getenv("EXPORTAR_MAX_FILAS", "1000000"))
+    EXPORTAR_MAX_BYTES = int(os.getenv("EXPORTAR_MAX_BYTES", str(50 * 1024 * 1024)))  # límite de documentos de la Bot API
+    EXPORTAR_ARRAYSIZE = int(os.getenv("EXPORTAR_ARRAYSIZE", "1000"))
+    EXPORTAR_CALL_TIMEOUT = int(os.getenv("EXPORTAR_CALL_TIMEOUT", "120000"))  # milisegundos
+    EXPORTAR_FILAS_VISTA_PREVIA = int(os.getenv("EXPORTAR_FILAS_VISTA_PREVIA", "5"))
+    EXPORTAR_DIRECTORIO = os.getenv("EXPORTAR_DIRECTORIO", "")  # vacío = directorio temporal del sistema
+    
+    # Recolector de monitoreo: muestreo periódico de las consultas con bloque "muestreo"
+    RECOLECTOR_ACTIVO = os.getenv("RECOLECTOR_ACTIVO", "true").lower() == "true"
+    RECOLECTOR_INTERVALO = float(os.getenv("RECOLECTOR_INTERVALO", "15"))  # segundos, si la consulta no fija el suyo
+    RECOLECTOR_CAPACIDAD = int(os.getenv("RECOLECTOR_CAPACIDAD", "720"))  # muestras por serie (3 h a 15 s)
+    RECOLECTOR_TIMEOUT = int(os.getenv("RECOLECTOR_TIMEOUT", "5000"))  # ms por consulta de muestreo
+    RECOLECTOR_HISTERESIS = float(os.getenv("RECOLECTOR_HISTERESIS", "5"))  # puntos % para salir de una alerta
+    RECOLECTOR_BLOQUEO = os.getenv("RECOLECTOR_BLOQUEO", "")  # archivo de bloqueo: un solo proceso envía alertas; vacío = todos
+    ALERTAS_CHAT_IDS = [c.strip() for c in os.getenv("ALERTAS_CHAT_IDS", "").split(",") if c.strip()]
+    TENDENCIA_MINUTOS_DEFECTO = float(os.getenv("TENDENCIA_MINUTOS_DEFECTO", "30"))
+    
+    # Sesiones por chat: último resultado para seguimientos (filtrar, ordenar, paginar) sin reconsultar
+    SESIONES_MAX = int(os.getenv("SESIONES_MAX", "1000"))  # chats; se expulsa el de uso más antiguo
+    SESIONES_TTL = int(os.getenv("SESIONES_TTL", "1800"))  # segundos sin uso
+    
+    # Despachador de salida hacia Telegram (límites de la Bot API: ~1 msg/s por chat, ~30 msg/s global)
+    TELEGRAM_TASA_GLOBAL = float(os.getenv("TELEGRAM_TASA_GLOBAL", "30"))
+    TELEGRAM_RAFAGA_GLOBAL = float(os.getenv("TELEGRAM_RAFAGA_GLOBAL", "30"))
+    TELEGRAM_TASA_CHAT = float(os.getenv("TELEGRAM_TASA_CHAT", "1"))
+    TELEGRAM_RAFAGA_CHAT = float(os.getenv("TELEGRAM_RAFAGA_CHAT", "3"))
+    TELEGRAM_MAX_PENDIENTES = int(os.getenv("TELEGRAM_MAX_PENDIENTES", "500"))  # envíos en cola antes de frenar a quien envía
+    TELEGRAM_TRABAJADORES = int(os.getenv("TELEGRAM_TRABAJADORES", "8"))  # envíos simultáneos y conexiones keep-alive
+    TELEGRAM_REINTENTOS = int(os.getenv("TELEGRAM_REINTENTOS", "3"))
+    TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "30"))  # segundos por llamada
+    
+    # Flujo por etapas del coordinador: plazos por etapa y generación SQL especulativa
+    PIPELINE_ESPECULACION = os.getenv("PIPELINE_ESPECULACION", "true").lower() == "true"
+    PIPELINE_ESPECULAR_TRAS = int(os.getenv("PIPELINE_ESPECULAR_TRAS", "50"))  # ms que catálogo/router tienen para decidir
+    PIPELINE_TIMEOUT_GENERACION = float(os.getenv("PIPELINE_TIMEOUT_GENERACION", "40"))  # segundos
+    PIPELINE_TIMEOUT_GUARDIA = float(os.getenv("PIPELINE_TIMEOUT_GUARDIA", "15"))  # segundos
+    
+    # Arranque: "inmediato" inicia loop e hilos al importar app.py; "diferido" los crea en la
+    # primera petición de cada proceso o en el post_fork de gunicorn (ver gunicorn.conf.py)
+    ARRANQUE_MODO = os.getenv("ARRANQUE_MODO", "inmediato").lower()  # inmediato | diferido
+    ARRANQUE_PRECALENTAR = os.getenv("ARRANQUE_PRECALENTAR", "true").lower() == "true"  # catálogo, router, esquema
     
     # Validar que todas las variables estén configuradas
     @classmethod
@@ -29,4 +156,4 @@ class Config:
         if not all(required_vars):
             raise ValueError("❌ Faltan variables de entorno. Revisa tu archivo .env")
         
-        print("✅ Configuración validada correctamente")
+        logger.info("✅ Configuración validada correctamente")
@@ -0,0 +1,213 @@
+# =============================================================================
+# ARCHIVO: database/destinos.py
+# Descripción: Registro de bases de datos destino (DSN, credenciales, etiquetas)
+#              con un pool por destino y ejecución concurrente en varias a la vez
+# =============================================================================
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import Config
+from database.oracle_executor import (
+    OracleExecutor, PoolOracle, MotorEjecucion,
+    obtener_pool_compartido, obtener_motor_compartido
+)
+from database.guardia_sql import GuardiaSQL
+from database.resultado import ResultadoConsulta
+
+logger = logging.getLogger(__name__)
+
+COLUMNA_DESTINO = "DESTINO"
+
+# "en todas las bases", "de todos los destinos" o "... en todas" al final de la pregunta
+PATRON_TODAS = re.compile(
+    r"\b(?:en|de|para)\s+tod[ao]s\s+(?:las|los)\s+(?:bases|bd|bds|destinos)\b|\ben\s+tod[ao]s\s*$"
+)
+
+# Un destino solo se elige si va marcado: "en prod", "en la base ventas", "en prod1 y qa",
+# "en el destino prod1, prod2". Una palabra suelta ("ventas", "prod") no redirige la consulta
+PATRON_EN_DESTINO = re.compile(
+    r"\ben\s+(?:(?:la|el)\s+)?(?:(?:base(?:\s+de\s+datos)?|bd|destino)\s+)?"
+    r"([a-z0-9_\-]+(?:\s*(?:,|\by\b)\s*[a-z0-9_\-]+)*)"
+)
+
+class DestinoOracle:
+    def __init__(self, nombre: str, dsn: str, usuario: str, password: str,
+                 etiquetas: Optional[List[str]] = None, sysdba: bool = True):
+        self.nombre = nombre
+        self.dsn = dsn
+        self.usuario = usuario
+        self.password = password
+        self.etiquetas = [e.lower() for e in (etiquetas or [])]
+        self.sysdba = sysdba
+
+    @classmethod
+    def desde_dict(cls, nombre: str, datos: Dict[str, Any]) -> "DestinoOracle":
+        # Las contraseñas no se guardan en el archivo: se leen de la variable indicada
+        if "password" in datos:
+            raise ValueError(f"Destino '{nombre}': contraseña en claro no admitida, usa 'password_env'")
+        password = os.getenv(datos.get("password_env", ""), "")
+        return cls(
+            nombre=nombre,
+            dsn=datos["dsn"],
+            usuario=datos.get("usuario") or Config.ORACLE_USER,
+            password=password or Config.ORACLE_PASSWORD,
+            etiquetas=datos.get("etiquetas", []),
+            sysdba=datos.get("sysdba", True)
+        )
+
+class RegistroDestinos:
+    def __init__(self, destinos: Optional[List[DestinoOracle]] = None, motor: Optional[MotorEjecucion] = None):
+        self._destinos: Dict[str, DestinoOracle] = {}
+        self._ejecutores: Dict[str, OracleExecutor] = {}
+        # Cada destino tiene su propio optimizador: el plan se revisa allí donde se va a ejecutar
+        self._guardias: Dict[str, GuardiaSQL] = {}
+        self._lock = threading.Lock()
+        # Motor propio para las consultas en abanico: una consulta por destino a la vez
+        self.motor = motor or MotorEjecucion(Config.DESTINOS_WORKERS, Config.DESTINOS_MAX_PENDIENTES)
+        for destino in destinos or []:
+            self._destinos[destino.nombre.lower()] = destino
+
+    @classmethod
+    def desde_archivo(cls, ruta: Optional[str]) -> "RegistroDestinos":
+        # Sin archivo de destinos: solo la base de Config (ORACLE_DSN) como "principal"
+        if not ruta or not os.path.exists(ruta):
+            return cls()
+        with open(ruta, encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+        destinos = [DestinoOracle.desde_dict(nombre, config) for nombre, config in (datos.get("destinos") or {}).items()]
+        logger.info(f"🗄️ Destinos Oracle registrados: {', '.join(d.nombre for d in destinos)}")
+        return cls(destinos)
+
+    @property
+    def nombres(self) -> List[str]:
+        return [d.nombre for d in self._destinos.values()]
+
+    def ejecutor(self, nombre: str) -> OracleExecutor:
+        # Pools perezosos: un destino que nunca se consulta no abre conexiones
+        clave = nombre.lower()
+        with self._lock:
+            ejecutor = self._ejecutores.get(clave)
+            if ejecutor is None:
+                destino = self._destinos.get(clave)
+                if destino is None:
+                    # Sin registro: el destino por defecto comparte pool y motor con el resto del bot
+                    ejecutor = OracleExecutor(pool=obtener_pool_compartido(), motor=obtener_motor_compartido())
+                else:
+                    pool = PoolOracle(nombre=destino.nombre, usuario=destino.usuario, password=destino.password,
+                                      dsn=destino.dsn, sysdba=destino.sysdba)
+                    ejecutor = OracleExecutor(pool=pool, motor=self.motor)
+                self._ejecutores[clave] = ejecutor
+            return ejecutor
+
+    def guardia(self, nombre: str) -> GuardiaSQL:
+        ejecutor = self.ejecutor(nombre)
+        clave = nombre.lower()
+        with self._lock:
+            guardia = self._guardias.get(clave)
+            if guardia is None:
+                guardia = GuardiaSQL(pool=ejecutor.pool, motor=ejecutor.motor)
+                self._guardias[clave] = guardia
+            return guardia
+
+    def resolver(self, texto_normalizado: str) -> List[str]:
+        # "en todas" -> todos los destinos; "en prod" / "en ventas" -> etiqueta o nombre
+        if not self._destinos:
+            return []
+        if PATRON_TODAS.search(texto_normalizado):
+            return self.nombres
+        marcadas = set()
+        for coincidencia in PATRON_EN_DESTINO.finditer(texto_normalizado):
+            marcadas.update(re.findall(r"[a-z0-9_\-]+", coincidencia.group(1)))
+        elegidos = [d.nombre for d in self._destinos.values()
+                    if d.nombre.lower() in marcadas or marcadas.intersection(d.etiquetas)]
+        return elegidos
+
+    async def ejecutar_en(self, sql: str, nombres: List[str], timeout_ms: Optional[int] = None,
+                          parametros: Optional[Dict[str, Any]] = None,
+                          limitar: Optional[bool] = None) -> ResultadoConsulta:
+        # Todas las consultas salen a la vez: la latencia total es la del destino más lento
+        timeout_ms = timeout_ms or Config.DESTINOS_TIMEOUT
+        inicio = time.perf_counter()
+        respuestas = await asyncio.gather(
+            *(self._ejecutar_destino(nombre, sql, timeout_ms, parametros, limitar) for nombre in nombres)
+        )
+        logger.info(f"🗄️ Consulta en {len(nombres)} destinos en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return combinar_resultados(list(zip(nombres, respuestas)))
+
+    async def _ejecutar_destino(self, nombre: str, sql: str, timeout_ms: int,
+                                parametros: Optional[Dict[str, Any]] = None, limitar: Optional[bool] = None):
+        try:
+            # call_timeout del driver y espera del llamador con el mismo presupuesto
+            return await asyncio.wait_for(
+                self.ejecutor(nombre).ejecutar_sql(sql, timeout_ms=timeout_ms, parametros=parametros,
+                                                   limitar=limitar),
+                timeout=timeout_ms / 1000 + 1
+            )
+        except asyncio.TimeoutError:
+            return Exception(f"sin respuesta en {timeout_ms / 1000:.0f}s")
+        except Exception as e:
+            return e
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            ejecutores = dict(self._ejecutores)
+        return {
+            "destinos": self.nombres,
+            "pools": {nombre: ejecutor.pool.estadisticas() for nombre, ejecutor in ejecutores.items()},
+            "motor": self.motor.estadisticas(),
+        }
+
+    def cerrar(self):
+        with self._lock:
+            ejecutores = [e for clave, e in self._ejecutores.items() if clave in self._destinos]
+        for ejecutor in ejecutores:
+            ejecutor.pool.cerrar()
+        self.motor.cerrar()
+
+def combinar_resultados(respuestas: List[Tuple[str, Any]]) -> ResultadoConsulta:
+    # Une los resultados en una sola tabla con la columna DESTINO; los fallos van como avisos
+    columnas: List[str] = []
+    for _, respuesta in respuestas:
+        if isinstance(respuesta, ResultadoConsulta):
+            for columna in respuesta.columnas:
+                if columna not in columnas:
+                    columnas.append(columna)
+
+    filas: List[Tuple] = []
+    avisos: List[str] = []
+    hay_mas = False
+    obtenido_en = None
+    for nombre, respuesta in respuestas:
+        if not isinstance(respuesta, ResultadoConsulta):
+            avisos.append(f"{nombre}: {str(respuesta)}")
+            continue
+        # Versiones distintas pueden devolver columnas distintas: se alinean por nombre
+        posiciones = [respuesta.columnas.index(c) if c in respuesta.columnas else None for c in columnas]
+        for fila in respuesta.filas:
+            filas.append((nombre,) + tuple(fila[i] if i is not None else None for i in posiciones))
+        hay_mas = hay_mas or respuesta.hay_mas
+        obtenido_en = respuesta.obtenido_en if obtenido_en is None else min(obtenido_en, respuesta.obtenido_en)
+
+    if not filas and avisos and len(avisos) == len(respuestas):
+        raise Exception("Ningún destino respondió:\n" + "\n".join(avisos))
+
+    return ResultadoConsulta([COLUMNA_DESTINO] + columnas, filas, hay_mas=hay_mas,
+                             obtenido_en=obtenido_en, avisos=avisos)
+
+_registro_compartido: Optional[RegistroDestinos] = None
+_lock_registro = threading.Lock()
+
+def obtener_registro_destinos() -> RegistroDestinos:
+    global _registro_compartido
+    if _registro_compartido is None:
+        with _lock_registro:
+            if _registro_compartido is None:
+                _registro_compartido = RegistroDestinos.desde_archivo(Config.DESTINOS_RUTA)
+    return _registro_compartido
@@ -0,0 +1,165 @@
+# =============================================================================
+# ARCHIVO: database/exportacion.py
+# Descripción: Escritura en streaming de resultados a CSV, CSV.GZ o XLSX con
+#              memoria constante (las filas pasan del cursor al archivo por bloques)
+# =============================================================================
+
+import csv
+import gzip
+import os
+import re
+import tempfile
+import time
+import logging
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+try:
+    # Opcional: sin openpyxl las exportaciones a Excel se entregan como CSV
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("csv", "csv.gz", "xlsx")
+
+# Solo verbos o formatos explícitos: "archivo" o "fichero" sueltos aparecen en preguntas de
+# monitoreo ("estado del archivo de control", "ruta del fichero spfile")
+PATRON_EXPORTAR = re.compile(r"\b(exporta\w*|descarga\w*|csv|excel|xlsx|gzip|comprimido)\b")
+
+def detectar_formato(texto_normalizado: str) -> Optional[str]:
+    # Devuelve el formato pedido en la pregunta o None si no se pide exportación
+    if not PATRON_EXPORTAR.search(texto_normalizado):
+        return None
+    if re.search(r"\b(excel|xlsx)\b", texto_normalizado):
+        return "xlsx"
+    if re.search(r"\b(gzip|comprimido|gz)\b", texto_normalizado):
+        return "csv.gz"
+    return "csv"
+
+def _texto_celda(valor: Any) -> Any:
+    return "" if valor is None else valor
+
+class EscritorCSV:
+    def __init__(self, ruta: str, comprimir: bool = False):
+        self.ruta = ruta
+        if comprimir:
+            self._archivo = gzip.open(ruta, "wt", encoding="utf-8", newline="")
+        else:
+            # BOM para que Excel detecte UTF-8 al abrir el CSV
+            self._archivo = open(ruta, "w", encoding="utf-8-sig", newline="")
+        self._csv = csv.writer(self._archivo)
+
+    def encabezado(self, columnas: List[str]):
+        self._csv.writerow(columnas)
+
+    def filas(self, bloque: List[Tuple]):
+        self._csv.writerows([[_texto_celda(v) for v in fila] for fila in bloque])
+
+    def cerrar(self):
+        self._archivo.close()
+
+class EscritorXLSX:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        # write_only: cada fila se serializa al añadirla, sin mantener la hoja en memoria
+        self._libro = Workbook(write_only=True)
+        self._hoja = self._libro.create_sheet("Resultados")
+
+    def encabezado(self, columnas: List[str]):
+        self._hoja.append(columnas)
+
+    def filas(self, bloque: List[Tuple]):
+        for fila in bloque:
+            self._hoja.append([_celda_excel(v) for v in fila])
+
+    def cerrar(self):
+        self._libro.save(self.ruta)
+
+def _celda_excel(valor: Any) -> Any:
+    if valor is None or isinstance(valor, (int, float, str)):
+        return valor
+    if isinstance(valor, (datetime, date)) and getattr(valor, "tzinfo", None) is None:
+        return valor
+    # Decimal, fechas con zona, LOBs leídos como bytes...: texto para no romper la hoja
+    return str(valor)
+
+class ArchivoExportado:
+    def __init__(self, ruta: str, nombre: str, formato: str, filas: int, truncado: bool,
+                 columnas: List[str], vista_previa: List[Tuple], segundos: float):
+        self.ruta = ruta
+        self.nombre = nombre
+        self.formato = formato
+        self.filas = filas
+        self.truncado = truncado
+        self.columnas = columnas
+        self.vista_previa = vista_previa
+        self.segundos = segundos
+
+    @property
+    def bytes(self) -> int:
+        try:
+            return os.path.getsize(self.ruta)
+        except OSError:
+            return 0
+
+    def eliminar(self):
+        try:
+            os.remove(self.ruta)
+        except OSError:
+            pass
+
+def crear_escritor(formato: str, directorio: Optional[str] = None) -> Tuple[Any, str, str]:
+    if formato == "xlsx" and Workbook is None:
+        logger.warning("⚠️ openpyxl no está instalado; se exporta en CSV")
+        formato = "csv"
+    nombre = time.strftime("resultado_%Y%m%d_%H%M%S.") + formato
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    descriptor, ruta = tempfile.mkstemp(prefix="agentebd_", suffix="." + formato, dir=directorio or None)
+    os.close(descriptor)
+    if formato == "xlsx":
+        return EscritorXLSX(ruta), nombre, formato
+    return EscritorCSV(ruta, comprimir=formato == "csv.gz"), nombre, formato
+
+def volcar_cursor(cursor, escritor, max_filas: int, filas_vista_previa: int) -> Tuple[List[str], int, bool, List[Tuple]]:
+    # Bucle de exportación: solo un bloque de arraysize filas vive en memoria a la vez
+    columnas = [desc[0] for desc in cursor.description]
+    escritor.encabezado(columnas)
+    vista_previa: List[Tuple] = []
+    total = 0
+    truncado = False
+    while True:
+        bloque = cursor.fetchmany()
+        if not bloque:
+            break
+        if total + len(bloque) > max_filas:
+            bloque = bloque[:max_filas - total]
+            truncado = True
+        if len(vista_previa) < filas_vista_previa:
+            vista_previa.extend(bloque[:filas_vista_previa - len(vista_previa)])
+        escritor.filas(bloque)
+        total += len(bloque)
+        if truncado:
+            break
+    return columnas, total, truncado, vista_previa
+
+def escribir_filas(columnas: List[str], filas: List[Tuple], formato: str, directorio: Optional[str] = None,
+                   filas_vista_previa: int = 5) -> ArchivoExportado:
+    # Filas ya leídas (resultado completo del chat): se escriben sin volver a la base
+    inicio = time.perf_counter()
+    escritor, nombre, formato = crear_escritor(formato, directorio)
+    try:
+        escritor.encabezado(columnas)
+        escritor.filas(filas)
+        escritor.cerrar()
+    except BaseException:
+        escritor.cerrar()
+        try:
+            os.remove(escritor.ruta)
+        except OSError:
+            pass
+        raise
+    return ArchivoExportado(escritor.ruta, nombre, formato, len(filas), False, columnas,
+                            list(filas[:filas_vista_previa]), time.perf_counter() - inicio)
@@ -0,0 +1,204 @@
+# =============================================================================
+# ARCHIVO: database/guardia_sql.py
+# Descripción: Guardián previo a la ejecución de SQL generada: clasifica la
+#              sentencia y revisa su plan (EXPLAIN PLAN) contra umbrales de coste
+# =============================================================================
+
+import oracledb
+import asyncio
+import hashlib
+import re
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import Config
+from database.oracle_executor import (
+    PoolOracle, MotorEjecucion, ColaOracleLlenaError,
+    obtener_pool_compartido, obtener_motor_compartido, es_error_transitorio
+)
+from services.metricas import REGISTRO
+
+logger = logging.getLogger(__name__)
+
+VEREDICTOS = REGISTRO.contador("agentebd_guardia_veredictos_total", "Veredictos del guardián de SQL por acción")
+
+# Tipos de sentencia según su primera palabra clave
+CONSULTA, DML, DDL, PLSQL, DESCONOCIDA = "consulta", "dml", "ddl", "plsql", "desconocida"
+PALABRAS_TIPO = {
+    "SELECT": CONSULTA, "WITH": CONSULTA,
+    "INSERT": DML, "UPDATE": DML, "DELETE": DML, "MERGE": DML, "LOCK": DML,
+    "CREATE": DDL, "ALTER": DDL, "DROP": DDL, "TRUNCATE": DDL, "GRANT": DDL, "REVOKE": DDL,
+    "RENAME": DDL, "COMMENT": DDL, "PURGE": DDL, "FLASHBACK": DDL, "AUDIT": DDL, "NOAUDIT": DDL,
+    "BEGIN": PLSQL, "DECLARE": PLSQL, "CALL": PLSQL, "EXEC": PLSQL, "EXECUTE": PLSQL,
+}
+
+PATRON_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+PATRON_LITERALES = re.compile(r"'(?:[^']|'')*'")
+PATRON_FOR_UPDATE = re.compile(r"\bFOR\s+UPDATE\b", re.IGNORECASE)
+
+SQL_PLAN = """
+SELECT ID, OPERATION, OPTIONS, OBJECT_NAME, COST, CARDINALITY
+FROM PLAN_TABLE
+WHERE STATEMENT_ID = :id
+ORDER BY ID
+"""
+
+def _sin_comentarios_ni_literales(sql: str) -> str:
+    return PATRON_LITERALES.sub("''", PATRON_COMENTARIOS.sub(" ", sql))
+
+def clasificar_sentencia(sql: str) -> str:
+    limpio = _sin_comentarios_ni_literales(sql).strip().lstrip("(").strip()
+    if not limpio:
+        return DESCONOCIDA
+    # Varias sentencias encadenadas nunca se ejecutan tal cual
+    if ";" in limpio.rstrip().rstrip(";"):
+        return DESCONOCIDA
+    primera = re.split(r"[\s(]", limpio, 1)[0].upper()
+    tipo = PALABRAS_TIPO.get(primera, DESCONOCIDA)
+    # SELECT ... FOR UPDATE bloquea filas: se trata como DML
+    if tipo == CONSULTA and PATRON_FOR_UPDATE.search(limpio):
+        return DML
+    return tipo
+
+def hash_sql(sql: str) -> str:
+    normalizada = " ".join(sql.split()).rstrip(";")
+    return hashlib.sha256(normalizada.encode("utf-8")).hexdigest()
+
+class VeredictoPlan:
+    # accion: "permitir", "limitar" (ejecutar con límite de filas) o "rechazar"
+    def __init__(self, accion: str, motivo: str = "", tipo: str = CONSULTA,
+                 coste: Optional[float] = None, cardinalidad: Optional[float] = None,
+                 operaciones: Optional[List[str]] = None):
+        self.accion = accion
+        self.motivo = motivo
+        self.tipo = tipo
+        self.coste = coste
+        self.cardinalidad = cardinalidad
+        self.operaciones = operaciones or []
+
+    @property
+    def permitido(self) -> bool:
+        return self.accion != "rechazar"
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "accion": self.accion,
+            "motivo": self.motivo,
+            "tipo": self.tipo,
+            "coste": self.coste,
+            "cardinalidad": self.cardinalidad,
+            "operaciones": self.operaciones,
+        }
+
+class GuardiaSQL:
+    def __init__(self, pool: Optional[PoolOracle] = None, motor: Optional[MotorEjecucion] = None,
+                 config=Config):
+        self.config = config
+        self.pool = pool or obtener_pool_compartido()
+        self.motor = motor or obtener_motor_compartido()
+        # Veredictos por hash de SQL: (veredicto, expira_en)
+        self._cache: "OrderedDict[str, Tuple[VeredictoPlan, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+
+    async def evaluar(self, sql: str) -> VeredictoPlan:
+        tipo = clasificar_sentencia(sql)
+        if tipo == DESCONOCIDA:
+            return self._contar(VeredictoPlan("rechazar", "Sentencia no reconocida o múltiple", tipo))
+        if tipo in (DDL, PLSQL) or (tipo == DML and not self.config.GUARDIA_PERMITIR_DML):
+            return self._contar(VeredictoPlan("rechazar", f"Sentencias de tipo {tipo.upper()} no permitidas", tipo))
+        if tipo == DML:
+            # DML permitido explícitamente: no hay filas que limitar
+            return self._contar(VeredictoPlan("permitir", "DML permitido por configuración", tipo))
+
+        clave = hash_sql(sql)
+        veredicto = self._obtener_cache(clave)
+        if veredicto is None:
+            veredicto = await self._explicar(sql)
+            with self._lock:
+                self._cache[clave] = (veredicto, time.monotonic() + self.config.GUARDIA_CACHE_TTL)
+                while len(self._cache) > self.config.GUARDIA_CACHE_MAX:
+                    self._cache.popitem(last=False)
+        return self._contar(veredicto)
+
+    def _contar(self, veredicto: VeredictoPlan) -> VeredictoPlan:
+        VEREDICTOS.inc(accion=veredicto.accion)
+        if not veredicto.permitido:
+            logger.warning(f"🛑 SQL rechazada por el guardián: {veredicto.motivo}")
+        return veredicto
+
+    def _obtener_cache(self, clave: str) -> Optional[VeredictoPlan]:
+        with self._lock:
+            entrada = self._cache.get(clave)
+            if entrada is not None and entrada[1] > time.monotonic():
+                self._cache.move_to_end(clave)
+                self._aciertos += 1
+                return entrada[0]
+            self._cache.pop(clave, None)
+            self._fallos += 1
+            return None
+
+    async def _explicar(self, sql: str) -> VeredictoPlan:
+        limite = self.config.GUARDIA_EXPLAIN_TIMEOUT / 1000 + self.config.ORACLE_POOL_WAIT_TIMEOUT / 1000 + 1
+        try:
+            plan = await self.motor.ejecutar(self._explicar_bloqueante, sql, timeout=limite)
+        except oracledb.DatabaseError as e:
+            error, = e.args
+            if es_error_transitorio(e):
+                # Base caída, pool agotado o llamada cortada: no es un veredicto sobre la SQL
+                raise Exception(f"No se pudo revisar el plan: {error.message}")
+            # Error de análisis o semántico: ejecutarla fallaría igual (se cachea como rechazo)
+            return VeredictoPlan("rechazar", f"ORA Error: {error.message}")
+        except ColaOracleLlenaError:
+            # No se cachea una sobrecarga transitoria como si fuera un veredicto del plan
+            raise
+        except asyncio.TimeoutError:
+            raise Exception(f"Tiempo de espera agotado al revisar el plan ({limite:.0f}s)")
+        return self._decidir(plan)
+
+    def _explicar_bloqueante(self, sql: str) -> List[Tuple]:
+        # El STATEMENT_ID no admite binds: se usa un identificador hexadecimal propio
+        id_sentencia = "agbd_" + uuid.uuid4().hex[:20]
+        with self.pool.conexion() as conn:
+            conn.call_timeout = self.config.GUARDIA_EXPLAIN_TIMEOUT
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{id_sentencia}' FOR {sql.rstrip().rstrip(';')}")
+                    cursor.execute(SQL_PLAN, {"id": id_sentencia})
+                    filas = cursor.fetchall()
+                    cursor.execute("DELETE FROM PLAN_TABLE WHERE STATEMENT_ID = :id", {"id": id_sentencia})
+                conn.commit()
+            finally:
+                conn.call_timeout = 0
+        return filas
+
+    def _decidir(self, plan: List[Tuple]) -> VeredictoPlan:
+        if not plan:
+            return VeredictoPlan("permitir", "Sin plan disponible")
+        raiz = plan[0]
+        coste = float(raiz[4]) if raiz[4] is not None else None
+        cardinalidad = float(raiz[5]) if raiz[5] is not None else None
+        operaciones = [" ".join(p for p in (op, opciones, objeto) if p) for _id, op, opciones, objeto, _c, _n in plan]
+
+        if any(op == "MERGE JOIN" and opciones == "CARTESIAN" for _id, op, opciones, *_ in plan):
+            return VeredictoPlan("rechazar", "El plan contiene un producto cartesiano",
+                                 coste=coste, cardinalidad=cardinalidad, operaciones=operaciones)
+        if coste is not None and coste > self.config.GUARDIA_COSTE_MAX:
+            return VeredictoPlan("rechazar", f"Coste estimado {coste:.0f} supera el máximo {self.config.GUARDIA_COSTE_MAX}",
+                                 coste=coste, cardinalidad=cardinalidad, operaciones=operaciones)
+        if cardinalidad is not None and cardinalidad > self.config.GUARDIA_CARDINALIDAD_MAX:
+            return VeredictoPlan("limitar", f"Cardinalidad estimada {cardinalidad:.0f}: se ejecuta con límite de filas",
+                                 coste=coste, cardinalidad=cardinalidad, operaciones=operaciones)
+        return VeredictoPlan("permitir", coste=coste, cardinalidad=cardinalidad, operaciones=operaciones)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entradas": len(self._cache),
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+            }
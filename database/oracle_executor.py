@@ -5,67 +5,543 @@
 
 import oracledb
 import traceback
-from typing import List, Dict, Any
+import threading
+import asyncio
+import atexit
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
 from config.settings import Config
+from database.resultado import ResultadoConsulta
+from database.exportacion import ArchivoExportado, crear_escritor, volcar_cursor
+from services.metricas import FILAS_LEIDAS, REGISTRO
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
-class OracleExecutor:
+SENTENCIAS = REGISTRO.contador("agentebd_oracle_sentencias_total",
+                               "Ejecuciones según lleven binds y si el texto SQL ya se había ejecutado (cursor reutilizable)")
+
+# Errores que indican que la conexión quedó inutilizable y no debe volver al pool
+ERRORES_CONEXION_PERDIDA = ("DPI-1080", "DPY-1001", "DPY-4011", "ORA-03113", "ORA-03114", "ORA-03135", "ORA-12537")
+
+def _es_error_conexion(error: Exception) -> bool:
+    mensaje = str(error)
+    return any(codigo in mensaje for codigo in ERRORES_CONEXION_PERDIDA)
+
+# Errores pasajeros (espera del pool, timeouts, cancelación, recursos ocupados): la misma
+# sentencia puede funcionar en el siguiente intento, no dicen nada de la SQL en sí
+ERRORES_TRANSITORIOS = ERRORES_CONEXION_PERDIDA + (
+    "DPY-4005", "DPY-4024", "DPY-4011", "DPY-6005", "DPI-1067", "ORA-01013", "ORA-00028",
+    "ORA-12170", "ORA-12514", "ORA-12541", "ORA-00054", "ORA-00060", "ORA-04031", "ORA-00018", "ORA-00020",
+)
+
+def es_error_transitorio(error: Exception) -> bool:
+    mensaje = str(error)
+    return any(codigo in mensaje for codigo in ERRORES_TRANSITORIOS)
+
+PATRON_CONSULTA = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+PATRON_YA_LIMITADA = re.compile(r"\bFETCH\s+(FIRST|NEXT)\b|\bROWNUM\b", re.IGNORECASE)
+
+def limitar_sql(sql: str) -> str:
+    # Envuelve una SELECT para que Oracle deje de producir filas al alcanzar el presupuesto
+    if not PATRON_CONSULTA.match(sql) or PATRON_YA_LIMITADA.search(sql):
+        return sql
+    return f"SELECT * FROM (\n{sql}\n) FETCH FIRST :agbd_limite ROWS ONLY"
+
+def _manejador_tipos(cursor, name, default_type, size, precision, scale):
+    # LOBs leídos como texto/bytes: el resultado debe sobrevivir a la devolución de la conexión
+    if default_type == oracledb.DB_TYPE_CLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if default_type == oracledb.DB_TYPE_BLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+
+# Fábrica alternativa de pools (p.ej. el Oracle falso de los benchmarks); None = oracledb.create_pool
+_fabrica_pool = None
+
+def establecer_fabrica_pool(fabrica):
+    global _fabrica_pool
+    _fabrica_pool = fabrica
+
+class PoolOracle:
+    def __init__(self, config=Config, nombre: str = "principal", usuario: Optional[str] = None,
+                 password: Optional[str] = None, dsn: Optional[str] = None, sysdba: bool = True):
+        self.config = config
+        # Credenciales propias de un destino; por defecto las de Config
+        self.nombre = nombre
+        self.usuario = usuario or config.ORACLE_USER
+        self.password = password or config.ORACLE_PASSWORD
+        self.dsn = dsn or config.ORACLE_DSN
+        self.sysdba = sysdba
+        self._pool = None
+        self._pool_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # Métricas de adquisición
+        self._adquisiciones = 0
+        self._descartadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._espera_ultima = 0.0
+
+    @property
+    def pool(self):
+        # Creación perezosa: el pool se abre con la primera consulta de cada proceso
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool_pid != os.getpid():
+                    # Pool heredado de un fork: sus sockets son del padre, no se cierran desde aquí
+                    self._pool = None
+                if self._pool is None:
+                    self._pool = self._crear_pool()
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _crear_pool(self):
+        logger.info(
+            f"🔌 Creando pool Oracle '{self.nombre}' (min={self.config.ORACLE_POOL_MIN}, "
+            f"max={self.config.ORACLE_POOL_MAX}, incremento={self.config.ORACLE_POOL_INCREMENT})"
+        )
+        fabrica = _fabrica_pool or oracledb.create_pool
+        return fabrica(
+            user=self.usuario,
+            password=self.password,
+            dsn=self.dsn,
+            mode=oracledb.AUTH_MODE_SYSDBA if self.sysdba else oracledb.AUTH_MODE_DEFAULT,
+            min=self.config.ORACLE_POOL_MIN,
+            max=self.config.ORACLE_POOL_MAX,
+            increment=self.config.ORACLE_POOL_INCREMENT,
+            # El pool hace ping a las conexiones inactivas más de este tiempo al adquirirlas
+            ping_interval=self.config.ORACLE_POOL_PING_INTERVAL,
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=self.config.ORACLE_POOL_WAIT_TIMEOUT,
+            stmtcachesize=self.config.ORACLE_STMT_CACHE_SIZE
+        )
+
+    def adquirir(self):
+        inicio = time.perf_counter()
+        conn = self.pool.acquire()
+        espera = time.perf_counter() - inicio
+
+        with self._lock:
+            self._adquisiciones += 1
+            self._espera_total += espera
+            self._espera_ultima = espera
+            self._espera_max = max(self._espera_max, espera)
+
+        return conn
+
+    def liberar(self, conn, descartar: bool = False):
+        if descartar:
+            # La conexión está rota: se elimina del pool en lugar de reutilizarla
+            logger.warning("⚠️ Descartando conexión Oracle inválida del pool")
+            with self._lock:
+                self._descartadas += 1
+            try:
+                self.pool.drop(conn)
+            except Exception as e:
+                logger.error(f"❌ Error descartando conexión: {str(e)}")
+            return
+        self.pool.release(conn)
+
+    @contextmanager
+    def conexion(self):
+        conn = self.adquirir()
+        descartar = False
+        try:
+            yield conn
+        except oracledb.DatabaseError as e:
+            descartar = _es_error_conexion(e)
+            raise
+        finally:
+            self.liberar(conn, descartar)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            adquisiciones = self._adquisiciones
+            stats = {
+                "adquisiciones": adquisiciones,
+                "descartadas": self._descartadas,
+                "espera_media_ms": (self._espera_total / adquisiciones * 1000) if adquisiciones else 0.0,
+                "espera_max_ms": self._espera_max * 1000,
+                "espera_ultima_ms": self._espera_ultima * 1000,
+            }
+        pool = self._pool
+        stats["abiertas"] = pool.opened if pool is not None else 0
+        stats["ocupadas"] = pool.busy if pool is not None else 0
+        return stats
+
+    def cerrar(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            heredado = self._pool_pid != os.getpid()
+        if pool is not None and not heredado:
+            logger.info(f"🔌 Cerrando pool Oracle '{self.nombre}'")
+            try:
+                pool.close(force=True)
+            except Exception as e:
+                logger.error(f"❌ Error cerrando pool Oracle: {str(e)}")
+
+# Pool único compartido por todas las solicitudes del proceso
+_pool_compartido: Optional[PoolOracle] = None
+_pool_compartido_lock = threading.Lock()
+
+def obtener_pool_compartido() -> PoolOracle:
+    global _pool_compartido
+    if _pool_compartido is None:
+        with _pool_compartido_lock:
+            if _pool_compartido is None:
+                _pool_compartido = PoolOracle()
+                atexit.register(cerrar_pool_compartido)
+    return _pool_compartido
+
+def cerrar_pool_compartido():
+    if _pool_compartido is not None:
+        _pool_compartido.cerrar()
+
+class RegistroSentencias:
+    # Textos SQL ejecutados (LRU acotado): un texto repetido reutiliza el cursor ya parseado del
+    # statement cache del driver y el plan compartido de la base; uno nuevo cuesta un hard parse
+    def __init__(self, capacidad: int = 2000):
+        self.capacidad = capacidad
+        self._textos: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ejecuciones = 0
+        self._repetidas = 0
+        self._con_binds = 0
+
+    def registrar(self, sql: str, con_binds: bool) -> bool:
+        with self._lock:
+            repetida = sql in self._textos
+            if repetida:
+                self._textos[sql] += 1
+                self._textos.move_to_end(sql)
+                self._repetidas += 1
+            else:
+                self._textos[sql] = 1
+                if len(self._textos) > self.capacidad:
+                    self._textos.popitem(last=False)
+            self._ejecuciones += 1
+            if con_binds:
+                self._con_binds += 1
+        SENTENCIAS.inc(binds="si" if con_binds else "no", texto="repetido" if repetida else "nuevo")
+        return repetida
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            ejecuciones = self._ejecuciones
+            return {
+                "textos_distintos": len(self._textos),
+                "ejecuciones": ejecuciones,
+                "con_binds": self._con_binds,
+                "repetidas": self._repetidas,
+                "tasa_reutilizacion": (self._repetidas / ejecuciones) if ejecuciones else 0.0,
+            }
+
+# Compartido por todos los ejecutores del proceso (el shared pool es de la base, no del pool)
+_registro_sentencias = RegistroSentencias()
+
+class ColaOracleLlenaError(Exception):
+    """Se lanza cuando el motor de ejecución ya tiene demasiado trabajo pendiente"""
+    pass
+
+class TokenCancelacion:
+    # Permite interrumpir desde el event loop una llamada bloqueante en curso
     def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self.cancelado = False
+
+    def vincular(self, conn):
+        with self._lock:
+            if self.cancelado:
+                raise asyncio.CancelledError()
+            self._conn = conn
+
+    def desvincular(self):
+        with self._lock:
+            self._conn = None
+
+    def cancelar(self):
+        with self._lock:
+            self.cancelado = True
+            conn = self._conn
+        if conn is not None:
+            try:
+                conn.cancel()
+            except Exception as e:
+                logger.error(f"❌ Error cancelando llamada Oracle: {str(e)}")
+
+class MotorEjecucion:
+    def __init__(self, max_workers: int, max_pendientes: int):
+        self.max_workers = max_workers
+        self.max_pendientes = max_pendientes
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._rechazadas = 0
+        self._timeouts = 0
+        self._canceladas = 0
+
+    def _hilos(self) -> ThreadPoolExecutor:
+        # Los hilos no sobreviven a un fork: cada proceso crea su propio executor
+        with self._lock:
+            if self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="oracle")
+                self._executor_pid = os.getpid()
+                self._pendientes = 0
+            return self._executor
+
+    def _reservar(self):
+        with self._lock:
+            if self._pendientes >= self.max_pendientes:
+                self._rechazadas += 1
+                raise ColaOracleLlenaError(
+                    f"Base de datos ocupada: {self._pendientes} consultas en curso. Intenta de nuevo en unos segundos."
+                )
+            self._pendientes += 1
+
+    def _liberar(self, _future=None):
+        with self._lock:
+            self._pendientes -= 1
+
+    async def ejecutar(self, funcion, *args, timeout: Optional[float] = None, token: Optional[TokenCancelacion] = None):
+        # Rechazo inmediato si la cola está llena, sin esperar un hilo libre
+        hilos = self._hilos()
+        self._reservar()
+        try:
+            futuro = hilos.submit(funcion, *args)
+        except Exception:
+            self._liberar()
+            raise
+        # El hueco se libera cuando el hilo termina de verdad, no cuando el llamador deja de esperar
+        futuro.add_done_callback(self._liberar)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            self._interrumpir(futuro, token)
+            raise
+        except asyncio.CancelledError:
+            with self._lock:
+                self._canceladas += 1
+            self._interrumpir(futuro, token)
+            raise
+
+    def _interrumpir(self, futuro, token: Optional[TokenCancelacion]):
+        # Si aún no empezó se descarta; si ya corre se cancela la llamada en la conexión
+        if not futuro.cancel() and token is not None:
+            token.cancelar()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pendientes": self.max_pendientes,
+                "pendientes": self._pendientes,
+                "rechazadas": self._rechazadas,
+                "timeouts": self._timeouts,
+                "canceladas": self._canceladas,
+            }
+
+    def cerrar(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+_motor_compartido: Optional[MotorEjecucion] = None
+
+def obtener_motor_compartido() -> MotorEjecucion:
+    global _motor_compartido
+    if _motor_compartido is None:
+        with _pool_compartido_lock:
+            if _motor_compartido is None:
+                _motor_compartido = MotorEjecucion(Config.ORACLE_WORKERS, Config.ORACLE_MAX_PENDIENTES)
+    return _motor_compartido
+
+class OracleExecutor:
+    def __init__(self, pool: Optional[PoolOracle] = None, motor: Optional[MotorEjecucion] = None):
         self.config = Config
-    
-    async def ejecutar_sql(self, sql: str) -> List[Dict[str, Any]]:
+        self.pool = pool or obtener_pool_compartido()
+        self.motor = motor or obtener_motor_compartido()
+        self.sentencias = _registro_sentencias
+
+    async def ejecutar_sql(self, sql: str, timeout_ms: Optional[int] = None,
+                           max_filas: Optional[int] = None, limitar: Optional[bool] = None,
+                           parametros: Optional[Dict[str, Any]] = None) -> ResultadoConsulta:
         logger.info(f"📥 Ejecutando SQL: {sql[:100]}...")
-        
-        conn = None
-        cursor = None
-        
+
+        timeout_ms = timeout_ms or self.config.ORACLE_CALL_TIMEOUT
+        max_filas = max_filas or self.config.ORACLE_MAX_FILAS
+        limitar = self.config.ORACLE_LIMITAR_SQL if limitar is None else limitar
+        # Margen sobre el call_timeout del driver para cubrir la espera de conexión del pool
+        limite = (timeout_ms + self.config.ORACLE_POOL_WAIT_TIMEOUT) / 1000 + 1
+        token = TokenCancelacion()
+
         try:
-            # Conexión a Oracle
-            conn = oracledb.connect(
-                user=self.config.ORACLE_USER,
-                password=self.config.ORACLE_PASSWORD,
-                dsn=self.config.ORACLE_DSN,
-                mode=oracledb.AUTH_MODE_SYSDBA
+            return await self.motor.ejecutar(
+                self._ejecutar_bloqueante, sql, timeout_ms, max_filas, limitar, token, parametros,
+                timeout=limite, token=token
             )
-            cursor = conn.cursor()
-            
-            # Ejecutar SQL
-            cursor.execute(sql)
-            
-            # Si no hay descripción, no es una consulta SELECT
-            if cursor.description is None:
-                conn.commit()
-                logger.info("✅ Consulta ejecutada sin resultados (no SELECT).")
-                return []
-            
-            # Obtener resultados de una SELECT
-            columnas = [desc[0] for desc in cursor.description]
-            filas = cursor.fetchall()
-            
-            resultado = []
-            for fila in filas:
-                item = {col: str(val) if val is not None else None 
-                       for col, val in zip(columnas, fila)}
-                resultado.append(item)
-            
-            logger.info(f"✅ Consulta ejecutada. {len(resultado)} filas obtenidas.")
-            return resultado
-            
+
+        except ColaOracleLlenaError as e:
+            logger.warning(f"⚠️ {str(e)}")
+            raise
+
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Tiempo de espera agotado ({limite:.0f}s) ejecutando SQL")
+            raise Exception(f"Tiempo de espera agotado al ejecutar SQL ({limite:.0f}s)")
+
         except oracledb.DatabaseError as e:
             error, = e.args
             logger.error(f"❌ Error ORACLE: {error.message}")
             raise Exception(f"ORA Error: {error.message}")
-            
+
+        except asyncio.CancelledError:
+            logger.warning("⚠️ Ejecución SQL cancelada por el llamador")
+            raise
+
         except Exception as e:
             logger.error(f"❌ Error general: {str(e)}")
             traceback.print_exc()
             raise Exception(f"Error general al ejecutar SQL: {str(e)}")
-            
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
 
+    def _ejecutar_bloqueante(self, sql: str, timeout_ms: int, max_filas: int,
+                             limitar: bool, token: TokenCancelacion,
+                             parametros: Optional[Dict[str, Any]] = None) -> ResultadoConsulta:
+        # Corre en un hilo del motor: aquí sí se permiten llamadas bloqueantes
+        # Se pide una fila más que el presupuesto para saber si quedan filas sin leer
+        a_leer = max_filas + 1
+        sql_final = limitar_sql(sql) if limitar else sql
+        # Valores siempre como bind: el texto SQL es el mismo para cualquier valor
+        binds = dict(parametros or {})
+        if sql_final is not sql:
+            binds["agbd_limite"] = a_leer
+        self.sentencias.registrar(sql_final, bool(parametros))
+
+        with self.pool.conexion() as conn:
+            token.vincular(conn)
+            try:
+                # Límite por sentencia aplicado por el propio driver
+                conn.call_timeout = timeout_ms
+                with conn.cursor() as cursor:
+                    # Ajustar los round trips al presupuesto de filas
+                    cursor.prefetchrows = a_leer
+                    cursor.arraysize = min(a_leer, self.config.ORACLE_ARRAYSIZE)
+                    cursor.outputtypehandler = _manejador_tipos
+
+                    # Ejecutar SQL
+                    try:
+                        cursor.execute(sql_final, binds)
+                    except oracledb.DatabaseError as e:
+                        if sql_final is sql or "ORA-00918" not in str(e):
+                            raise
+                        # Columnas repetidas (SELECT * de un join) no valen dentro del envoltorio:
+                        # sin él, el presupuesto de filas lo sigue aplicando fetchmany
+                        logger.info("↩️ ORA-00918 con la SQL limitada; se ejecuta sin envolver")
+                        binds.pop("agbd_limite")
+                        sql_final = sql
+                        self.sentencias.registrar(sql_final, bool(parametros))
+                        cursor.execute(sql_final, binds)
+
+                    # Si no hay descripción, no es una consulta SELECT
+                    if cursor.description is None:
+                        conn.commit()
+                        logger.info("✅ Consulta ejecutada sin resultados (no SELECT).")
+                        return ResultadoConsulta.vacio()
+
+                    # Obtener solo las filas del presupuesto de una SELECT
+                    columnas = [desc[0] for desc in cursor.description]
+                    filas = cursor.fetchmany(a_leer)
+            finally:
+                token.desvincular()
+                conn.call_timeout = 0
+
+        hay_mas = len(filas) > max_filas
+        resultado = ResultadoConsulta(columnas, filas[:max_filas], hay_mas=hay_mas)
+        FILAS_LEIDAS.inc(len(resultado))
+
+        logger.info(f"✅ Consulta ejecutada. {resultado.describir_tamano()} ({len(resultado)} leídas).")
+        return resultado
+
+    async def exportar_sql(self, sql: str, formato: str = "csv", max_filas: Optional[int] = None,
+                           timeout_ms: Optional[int] = None,
+                           parametros: Optional[Dict[str, Any]] = None) -> ArchivoExportado:
+        # Sin presupuesto de filas de chat: el cursor se vuelca por bloques a un archivo temporal
+        logger.info(f"📤 Exportando SQL a {formato}: {sql[:100]}...")
+        timeout_ms = timeout_ms or self.config.EXPORTAR_CALL_TIMEOUT
+        max_filas = max_filas or self.config.EXPORTAR_MAX_FILAS
+        limite = (timeout_ms + self.config.ORACLE_POOL_WAIT_TIMEOUT) / 1000 + 1
+        token = TokenCancelacion()
+
+        try:
+            return await self.motor.ejecutar(
+                self._exportar_bloqueante, sql, formato, max_filas, timeout_ms, token, parametros,
+                timeout=limite, token=token
+            )
+        except ColaOracleLlenaError as e:
+            logger.warning(f"⚠️ {str(e)}")
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Tiempo de espera agotado ({limite:.0f}s) exportando SQL")
+            raise Exception(f"Tiempo de espera agotado al exportar ({limite:.0f}s)")
+        except oracledb.DatabaseError as e:
+            error, = e.args
+            logger.error(f"❌ Error ORACLE: {error.message}")
+            raise Exception(f"ORA Error: {error.message}")
+
+    def _exportar_bloqueante(self, sql: str, formato: str, max_filas: int, timeout_ms: int,
+                             token: TokenCancelacion,
+                             parametros: Optional[Dict[str, Any]] = None) -> ArchivoExportado:
+        inicio = time.perf_counter()
+        self.sentencias.registrar(sql, bool(parametros))
+        escritor, nombre, formato = crear_escritor(formato, self.config.EXPORTAR_DIRECTORIO)
+        try:
+            with self.pool.conexion() as conn:
+                token.vincular(conn)
+                try:
+                    conn.call_timeout = timeout_ms
+                    with conn.cursor() as cursor:
+                        # Bloques grandes: pocos round trips y memoria acotada por arraysize
+                        cursor.prefetchrows = self.config.EXPORTAR_ARRAYSIZE
+                        cursor.arraysize = self.config.EXPORTAR_ARRAYSIZE
+                        cursor.outputtypehandler = _manejador_tipos
+                        cursor.execute(sql, parametros or {})
+                        if cursor.description is None:
+                            raise Exception("La sentencia no devuelve filas para exportar")
+                        columnas, total, truncado, vista_previa = volcar_cursor(
+                            cursor, escritor, max_filas, self.config.EXPORTAR_FILAS_VISTA_PREVIA
+                        )
+                finally:
+                    token.desvincular()
+                    conn.call_timeout = 0
+            escritor.cerrar()
+        except BaseException:
+            escritor.cerrar()
+            try:
+                os.remove(escritor.ruta)
+            except OSError:
+                pass
+            raise
+
+        FILAS_LEIDAS.inc(total)
+        archivo = ArchivoExportado(escritor.ruta, nombre, formato, total, truncado, columnas,
+                                   vista_previa, time.perf_counter() - inicio)
+        logger.info(f"✅ Exportadas {total} filas ({archivo.bytes} bytes) en {archivo.segundos:.2f}s")
+        return archivo
+
+    def estadisticas_pool(self) -> Dict[str, Any]:
+        stats = self.pool.estadisticas()
+        stats["motor"] = self.motor.estadisticas()
+        stats["sentencias"] = self.sentencias.estadisticas()
+        return stats
+
+    def cerrar(self):
+        self.motor.cerrar()
+        self.pool.cerrar()
@@ -0,0 +1,73 @@
+# =============================================================================
+# ARCHIVO: database/resultado.py
+# Descripción: Resultado columnar de una consulta (conversión perezosa a texto)
+# =============================================================================
+
+from typing import List, Tuple, Dict, Any, Optional, Iterator
+import time
+from operator import itemgetter
+
+class ResultadoConsulta:
+    def __init__(self, columnas: List[str], filas: List[Tuple], hay_mas: bool = False,
+                 total: Optional[int] = None, obtenido_en: Optional[float] = None,
+                 avisos: Optional[List[str]] = None):
+        # Nombres de columna una sola vez y filas como tuplas con los valores nativos del driver
+        self.columnas = list(columnas)
+        self.filas = filas
+        self.hay_mas = hay_mas
+        # Total real de filas, solo cuando se conoce sin coste extra (None si hay más sin leer)
+        self.total = total if total is not None else (None if hay_mas else len(filas))
+        self.obtenido_en = obtenido_en if obtenido_en is not None else time.time()
+        # Incidencias no fatales (p.ej. destinos que no respondieron)
+        self.avisos = avisos or []
+
+    @classmethod
+    def vacio(cls) -> "ResultadoConsulta":
+        return cls([], [], hay_mas=False, total=0)
+
+    def __len__(self) -> int:
+        return len(self.filas)
+
+    def __bool__(self) -> bool:
+        return bool(self.filas)
+
+    @staticmethod
+    def formatear_valor(valor: Any) -> Optional[str]:
+        return None if valor is None else str(valor)
+
+    def indice_columna(self, nombre: str) -> int:
+        nombre_upper = nombre.upper()
+        for i, col in enumerate(self.columnas):
+            if col.upper() == nombre_upper:
+                return i
+        raise KeyError(nombre)
+
+    def columna(self, nombre: str) -> List[Any]:
+        i = self.indice_columna(nombre)
+        return [fila[i] for fila in self.filas]
+
+    def columnas_valores(self, *nombres: str) -> List[List[Any]]:
+        # Extracción de columnas en C (itemgetter) para evaluar reglas columna a columna
+        return [list(map(itemgetter(self.indice_columna(nombre)), self.filas)) for nombre in nombres]
+
+    def filas_como_dict(self, limite: Optional[int] = None) -> Iterator[Dict[str, Optional[str]]]:
+        # Solo se convierten a texto las filas que realmente se van a mostrar
+        filas = self.filas if limite is None else self.filas[:limite]
+        for fila in filas:
+            yield {col: self.formatear_valor(val) for col, val in zip(self.columnas, fila)}
+
+    def describir_tamano(self) -> str:
+        if self.total is not None:
+            return f"{self.total} filas"
+        return f"más de {len(self.filas)} filas"
+
+    def edad_segundos(self) -> float:
+        return max(0.0, time.time() - self.obtenido_en)
+
+    def describir_antiguedad(self) -> str:
+        edad = self.edad_segundos()
+        if edad < 1:
+            return "datos en tiempo real"
+        if edad < 120:
+            return f"datos de hace {edad:.0f} s"
+        return f"datos de hace {edad / 60:.0f} min"
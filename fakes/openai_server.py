@@ -0,0 +1,134 @@
+# =============================================================================
+# ARCHIVO: fakes/openai_server.py
+# Descripción: Servidor falso compatible con /v1/chat/completions para pruebas
+#              sin red (latencia y tasa de errores configurables)
+# Uso: python -m fakes.openai_server --puerto 8081
+#      OPENAI_BASE_URL=http://127.0.0.1:8081/v1
+# =============================================================================
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+def responder_por_defecto(modelo: str, mensajes: List[Dict[str, str]]) -> str:
+    # El generador de SQL recibe una consulta válida; el resto, un análisis genérico
+    sistema = mensajes[0]["content"] if mensajes else ""
+    if "generador" in sistema.lower():
+        return "```sql\nSELECT USERNAME, STATUS FROM V$SESSION WHERE USERNAME IS NOT NULL;\n```"
+    return "Todos los valores están dentro de lo esperado; no se observan problemas."
+
+class ServidorOpenAIFalso:
+    def __init__(self, puerto: int = 0, latencia: float = 0.0, jitter: float = 0.0,
+                 tasa_error: float = 0.0, responder: Optional[Callable[[str, List[Dict[str, str]]], str]] = None):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tasa_error = tasa_error
+        self.responder = responder or responder_por_defecto
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._crear_manejador())
+        self._servidor.daemon_threads = True
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def puerto(self) -> int:
+        return self._servidor.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}/v1"
+
+    def _crear_manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _enviar(self, estado: int, cuerpo: dict, cabeceras: Optional[Dict[str, str]] = None):
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                for nombre, valor in (cabeceras or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_POST(self):
+                longitud = int(self.headers.get("Content-Length", 0))
+                peticion = json.loads(self.rfile.read(longitud) or b"{}")
+                with servidor._lock:
+                    servidor.peticiones += 1
+
+                if not self.path.endswith("/chat/completions"):
+                    self._enviar(404, {"error": {"message": "not found"}})
+                    return
+
+                time.sleep(max(0.0, servidor.latencia + random.uniform(-servidor.jitter, servidor.jitter)))
+
+                if random.random() < servidor.tasa_error:
+                    # Alterna entre límite de tasa y error de servidor para ejercitar los reintentos
+                    if random.random() < 0.5:
+                        self._enviar(429, {"error": {"message": "rate limited", "type": "rate_limit_error"}},
+                                     {"retry-after": "0.05"})
+                    else:
+                        self._enviar(500, {"error": {"message": "internal error", "type": "server_error"}})
+                    return
+
+                mensajes = peticion.get("messages", [])
+                contenido = servidor.responder(peticion.get("model", ""), mensajes)
+                tokens_prompt = sum(len(m.get("content", "")) for m in mensajes) // 4
+                tokens_respuesta = len(contenido) // 4
+                self._enviar(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": peticion.get("model", ""),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": contenido},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": tokens_prompt,
+                        "completion_tokens": tokens_respuesta,
+                        "total_tokens": tokens_prompt + tokens_respuesta
+                    }
+                })
+
+        return Manejador
+
+    def iniciar(self) -> "ServidorOpenAIFalso":
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="openai-falso", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor OpenAI falso para pruebas locales")
+    parser.add_argument("--puerto", type=int, default=8081)
+    parser.add_argument("--latencia", type=float, default=0.2, help="segundos por respuesta")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor = ServidorOpenAIFalso(args.puerto, args.latencia, args.jitter, args.tasa_error)
+    print(f"🤖 OpenAI falso escuchando en {servidor.base_url}")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
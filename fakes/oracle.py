@@ -0,0 +1,254 @@
+# =============================================================================
+# ARCHIVO: fakes/oracle.py
+# Descripción: Pool Oracle falso con la misma interfaz que oracledb (latencia,
+#              tasa de errores y tamaño de resultados configurables)
+# Uso: establecer_fabrica_pool(FabricaOracleFalso(latencia=0.02, filas=50))
+# =============================================================================
+
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import oracledb
+
+# Columnas devueltas según la vista consultada
+COLUMNAS_INSTANCIA = ["INST_ID", "INSTANCE_NUMBER", "INSTANCE_NAME", "HOST_NAME", "VERSION", "INICIADA",
+                      "STATUS", "PARALLEL", "THREAD#", "ARCHIVER", "DATABASE_STATUS"]
+COLUMNAS_RECURSOS = ["INST_ID", "RESOURCE_NAME", "CURRENT_UTILIZATION", "MAX_UTILIZATION", "LIMIT_VALUE"]
+COLUMNAS_SESIONES = ["SID", "USERNAME", "STATUS", "MACHINE", "PROGRAM", "LOGON_TIME"]
+COLUMNAS_PLAN = ["ID", "OPERATION", "OPTIONS", "OBJECT_NAME", "COST", "CARDINALITY"]
+
+# Diccionario de datos reducido para el índice de esquema: (SYS.TABLE_NAME, [(columna, tipo)])
+DICCIONARIO = [
+    ("V_$SESSION", [("SID", "NUMBER"), ("SERIAL#", "NUMBER"), ("USERNAME", "VARCHAR2"), ("STATUS", "VARCHAR2"),
+                    ("MACHINE", "VARCHAR2"), ("PROGRAM", "VARCHAR2"), ("LOGON_TIME", "DATE"),
+                    ("BLOCKING_SESSION", "NUMBER"), ("EVENT", "VARCHAR2"), ("SQL_ID", "VARCHAR2")]),
+    ("GV_$INSTANCE", [("INST_ID", "NUMBER"), ("INSTANCE_NAME", "VARCHAR2"), ("HOST_NAME", "VARCHAR2"),
+                      ("STATUS", "VARCHAR2"), ("STARTUP_TIME", "DATE"), ("DATABASE_STATUS", "VARCHAR2")]),
+    ("V_$LOCK", [("SID", "NUMBER"), ("TYPE", "VARCHAR2"), ("LMODE", "NUMBER"), ("REQUEST", "NUMBER"),
+                 ("BLOCK", "NUMBER")]),
+    ("DBA_TABLESPACE_USAGE_METRICS", [("TABLESPACE_NAME", "VARCHAR2"), ("USED_SPACE", "NUMBER"),
+                                      ("TABLESPACE_SIZE", "NUMBER"), ("USED_PERCENT", "NUMBER")]),
+    ("DBA_DATA_FILES", [("FILE_NAME", "VARCHAR2"), ("TABLESPACE_NAME", "VARCHAR2"), ("BYTES", "NUMBER"),
+                        ("AUTOEXTENSIBLE", "VARCHAR2")]),
+    ("DBA_OBJECTS", [("OWNER", "VARCHAR2"), ("OBJECT_NAME", "VARCHAR2"), ("OBJECT_TYPE", "VARCHAR2"),
+                     ("STATUS", "VARCHAR2"), ("LAST_DDL_TIME", "DATE")]),
+]
+
+class ErrorOracleFalso:
+    def __init__(self, mensaje: str):
+        self.message = mensaje
+        self.full_code = mensaje.split(":")[0]
+
+    def __str__(self):
+        return self.message
+
+def _generar_filas(sql: str, cantidad: int) -> Tuple[List[str], List[Tuple]]:
+    sql_upper = sql.upper()
+    if "V$FIXED_VIEW_DEFINITION" in sql_upper:
+        vistas = [tabla.replace("V_$", "V$", 1) for tabla, _ in DICCIONARIO if "$" in tabla]
+        return ["VIEW_NAME"], [(v,) for v in vistas]
+    if "DBA_TAB_COLUMNS" in sql_upper:
+        filas = [(tabla, columna, tipo) for tabla, columnas in DICCIONARIO for columna, tipo in columnas]
+        return ["TABLE_NAME", "COLUMN_NAME", "DATA_TYPE"], filas
+    if "GV$INSTANCE" in sql_upper:
+        filas = [
+            (i, i, f"ORCL{i}", f"dbhost{i}", "19.0.0.0.0", "01-ENE-2025 08:00:00",
+             "OPEN", "YES", i, "STARTED", "ACTIVE")
+            for i in range(1, min(cantidad, 4) + 1)
+        ]
+        return COLUMNAS_INSTANCIA, filas
+    if "RESOURCE_LIMIT" in sql_upper:
+        filas = []
+        for recurso, limite in (("processes", 1000), ("sessions", 1528), ("transactions", 1680)):
+            for inst in (1, 2):
+                actual = random.randint(50, int(limite * 0.9))
+                filas.append((inst, recurso, actual, min(limite, actual + random.randint(0, 100)), str(limite)))
+        return COLUMNAS_RECURSOS, filas[:cantidad]
+    filas = [
+        (i, f"USUARIO{i % 37}", random.choice(("ACTIVE", "INACTIVE")), f"app{i % 11}.local",
+         "JDBC Thin Client", "16-OCT-2026 10:15:00")
+        for i in range(1, cantidad + 1)
+    ]
+    return COLUMNAS_SESIONES, filas
+
+class CursorFalso:
+    def __init__(self, conexion: "ConexionFalsa"):
+        self._conexion = conexion
+        self.prefetchrows = 2
+        self.arraysize = 100
+        self.outputtypehandler = None
+        self.description: Optional[List[Tuple]] = None
+        self._filas: List[Tuple] = []
+        self._posicion = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._filas = []
+
+    def execute(self, sql: str, parametros: Optional[Dict[str, Any]] = None):
+        fabrica = self._conexion.fabrica
+        fabrica.registrar_ejecucion(sql)
+        self._conexion._esperar(fabrica.latencia_consulta())
+
+        if random.random() < fabrica.tasa_error:
+            raise oracledb.DatabaseError(ErrorOracleFalso("ORA-00942: table or view does not exist"))
+
+        sql_upper = sql.upper()
+        if sql_upper.lstrip().startswith("EXPLAIN PLAN"):
+            fabrica.registrar_plan(sql)
+            self.description = None
+            return
+        if "FROM PLAN_TABLE" in sql_upper and sql_upper.lstrip().startswith("SELECT"):
+            self.description = [(col, None, None, None, None, None, True) for col in COLUMNAS_PLAN]
+            self._filas = fabrica.planes.get((parametros or {}).get("id"), [])
+            self._posicion = 0
+            return
+
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            if "PLAN_TABLE" in sql_upper:
+                fabrica.planes.pop((parametros or {}).get("id"), None)
+            self.description = None
+            return
+
+        columnas, filas = _generar_filas(sql, fabrica.filas)
+        limite = (parametros or {}).get("agbd_limite")
+        if limite is not None:
+            filas = filas[:limite]
+        self.description = [(col, None, None, None, None, None, True) for col in columnas]
+        self._filas = filas
+        self._posicion = 0
+
+    def fetchmany(self, cantidad: Optional[int] = None) -> List[Tuple]:
+        cantidad = cantidad or self.arraysize
+        bloque = self._filas[self._posicion:self._posicion + cantidad]
+        self._posicion += len(bloque)
+        return bloque
+
+    def fetchall(self) -> List[Tuple]:
+        bloque = self._filas[self._posicion:]
+        self._posicion = len(self._filas)
+        return bloque
+
+    def var(self, *args, **kwargs):
+        return None
+
+class ConexionFalsa:
+    def __init__(self, fabrica: "FabricaOracleFalso"):
+        self.fabrica = fabrica
+        self.call_timeout = 0
+        self._cancelada = threading.Event()
+
+    def _esperar(self, segundos: float):
+        # Espera interrumpible por cancel() y acotada por call_timeout, como el driver real
+        limite = segundos
+        if self.call_timeout and self.call_timeout / 1000 < segundos:
+            limite = self.call_timeout / 1000
+        self._cancelada.clear()
+        if self._cancelada.wait(limite):
+            raise oracledb.DatabaseError(ErrorOracleFalso("ORA-01013: user requested cancel of current operation"))
+        if limite < segundos:
+            raise oracledb.DatabaseError(ErrorOracleFalso("DPY-4024: call timeout exceeded"))
+
+    def cursor(self) -> CursorFalso:
+        return CursorFalso(self)
+
+    def commit(self):
+        pass
+
+    def cancel(self):
+        self._cancelada.set()
+
+    def ping(self):
+        pass
+
+class PoolFalso:
+    def __init__(self, fabrica: "FabricaOracleFalso", min: int, max: int, **kwargs):
+        self.fabrica = fabrica
+        self.max = max
+        self._libres = [ConexionFalsa(fabrica) for _ in range(min)]
+        self._ocupadas = 0
+        self._condicion = threading.Condition()
+        self.wait_timeout = kwargs.get("wait_timeout", 5000)
+
+    @property
+    def opened(self) -> int:
+        with self._condicion:
+            return len(self._libres) + self._ocupadas
+
+    @property
+    def busy(self) -> int:
+        with self._condicion:
+            return self._ocupadas
+
+    def acquire(self) -> ConexionFalsa:
+        with self._condicion:
+            fin = time.monotonic() + self.wait_timeout / 1000
+            while not self._libres and self._ocupadas >= self.max:
+                restante = fin - time.monotonic()
+                if restante <= 0 or not self._condicion.wait(restante):
+                    raise oracledb.DatabaseError(ErrorOracleFalso("DPY-4005: timed out waiting for the connection pool"))
+            conexion = self._libres.pop() if self._libres else ConexionFalsa(self.fabrica)
+            self._ocupadas += 1
+            return conexion
+
+    def release(self, conexion: ConexionFalsa):
+        with self._condicion:
+            self._ocupadas -= 1
+            self._libres.append(conexion)
+            self._condicion.notify()
+
+    def drop(self, conexion: ConexionFalsa):
+        with self._condicion:
+            self._ocupadas -= 1
+            self._condicion.notify()
+
+    def close(self, force: bool = False):
+        with self._condicion:
+            self._libres = []
+
+class FabricaOracleFalso:
+    # Se instala con establecer_fabrica_pool(); recibe los mismos argumentos que oracledb.create_pool
+    def __init__(self, latencia: float = 0.02, jitter: float = 0.0, tasa_error: float = 0.0, filas: int = 20):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tasa_error = tasa_error
+        self.filas = filas
+        self.ejecuciones = 0
+        self.explicaciones = 0
+        # Planes de EXPLAIN PLAN por STATEMENT_ID, como PLAN_TABLE
+        self.planes: Dict[str, List[Tuple]] = {}
+        self._lock = threading.Lock()
+
+    def latencia_consulta(self) -> float:
+        return max(0.0, self.latencia + random.uniform(-self.jitter, self.jitter))
+
+    def registrar_ejecucion(self, sql: str):
+        with self._lock:
+            self.ejecuciones += 1
+
+    def registrar_plan(self, sql: str):
+        # Plan sintético: CROSS JOIN -> producto cartesiano; el coste crece con las filas configuradas
+        coincidencia = re.search(r"STATEMENT_ID\s*=\s*'([^']+)'\s+FOR\s+(.*)", sql, re.IGNORECASE | re.DOTALL)
+        if not coincidencia:
+            return
+        id_sentencia, consulta = coincidencia.groups()
+        if re.search(r"\bCROSS\s+JOIN\b", consulta, re.IGNORECASE):
+            plan = [(0, "SELECT STATEMENT", None, None, 5_000_000, 10_000_000),
+                    (1, "MERGE JOIN", "CARTESIAN", None, 5_000_000, 10_000_000)]
+        else:
+            plan = [(0, "SELECT STATEMENT", None, None, 3 + self.filas // 10, self.filas),
+                    (1, "FIXED TABLE", "FULL", "X$KSUSE", 3 + self.filas // 10, self.filas)]
+        with self._lock:
+            self.explicaciones += 1
+            self.planes[id_sentencia] = plan
+
+    def __call__(self, min: int = 1, max: int = 4, **kwargs) -> PoolFalso:
+        return PoolFalso(self, min=min, max=max, **kwargs)
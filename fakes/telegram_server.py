@@ -0,0 +1,138 @@
+# =============================================================================
+# ARCHIVO: fakes/telegram_server.py
+# Descripción: Servidor falso de la Bot API de Telegram (sendMessage y afines)
+#              que registra lo enviado con su marca de tiempo
+# Uso: python -m fakes.telegram_server --puerto 8082
+#      TELEGRAM_BASE_URL=http://127.0.0.1:8082/bot
+# =============================================================================
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+class ServidorTelegramFalso:
+    def __init__(self, puerto: int = 0, latencia: float = 0.0, tasa_error: float = 0.0):
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        # Cada llamada recibida: {"metodo", "chat_id", "texto", "instante", ...}
+        self.llamadas: List[Dict[str, Any]] = []
+        self._siguiente_id = 1
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._crear_manejador())
+        self._servidor.daemon_threads = True
+
+    @property
+    def puerto(self) -> int:
+        return self._servidor.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}/bot"
+
+    def _registrar(self, metodo: str, parametros: Dict[str, Any]) -> int:
+        with self._lock:
+            message_id = self._siguiente_id
+            self._siguiente_id += 1
+            self.llamadas.append({
+                "metodo": metodo,
+                "chat_id": parametros.get("chat_id"),
+                "texto": parametros.get("text"),
+                "message_id": message_id,
+                "instante": time.perf_counter(),
+            })
+            return message_id
+
+    def _crear_manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _leer_parametros(self) -> Dict[str, Any]:
+                longitud = int(self.headers.get("Content-Length", 0))
+                cuerpo = self.rfile.read(longitud) if longitud else b""
+                tipo = self.headers.get("Content-Type", "")
+                if "json" in tipo:
+                    return json.loads(cuerpo or b"{}")
+                if "multipart" in tipo:
+                    # Documentos: solo interesa el chat destino
+                    texto = cuerpo.decode("utf-8", "ignore")
+                    marcador = 'name="chat_id"'
+                    if marcador in texto:
+                        valor = texto.split(marcador, 1)[1].split("\r\n\r\n", 1)[1].split("\r\n", 1)[0]
+                        return {"chat_id": valor}
+                    return {}
+                return {k: v[0] for k, v in parse_qs(cuerpo.decode()).items()}
+
+            def _enviar(self, estado: int, cuerpo: dict):
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_POST(self):
+                metodo = self.path.rstrip("/").rsplit("/", 1)[-1]
+                parametros = self._leer_parametros()
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+
+                if random.random() < servidor.tasa_error:
+                    self._enviar(429, {"ok": False, "error_code": 429,
+                                       "description": "Too Many Requests: retry after 1",
+                                       "parameters": {"retry_after": 1}})
+                    return
+
+                if metodo == "getMe":
+                    self._enviar(200, {"ok": True, "result": {
+                        "id": 1, "is_bot": True, "first_name": "AgenteBD", "username": "agentebd_bot"}})
+                    return
+
+                message_id = servidor._registrar(metodo, parametros)
+                chat_id = parametros.get("chat_id")
+                self._enviar(200, {"ok": True, "result": {
+                    "message_id": int(parametros.get("message_id") or message_id),
+                    "date": int(time.time()),
+                    "chat": {"id": int(chat_id) if chat_id is not None else 0, "type": "private"},
+                    "text": parametros.get("text", "")
+                }})
+
+        return Manejador
+
+    def iniciar(self) -> "ServidorTelegramFalso":
+        threading.Thread(target=self._servidor.serve_forever, name="telegram-falso", daemon=True).start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def llamadas_de(self, chat_id: Any) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [l for l in self.llamadas if str(l["chat_id"]) == str(chat_id)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso de la Bot API de Telegram")
+    parser.add_argument("--puerto", type=int, default=8082)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor = ServidorTelegramFalso(args.puerto, args.latencia, args.tasa_error)
+    print(f"✉️ Telegram falso escuchando en {servidor.base_url}")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# =============================================================================
+# ARCHIVO: gunicorn.conf.py
+# Descripción: Varios workers con precarga: catálogo, router e índice de esquema se
+#              construyen una vez en el maestro; loop, hilos y pools, en cada worker
+# Uso: gunicorn -c gunicorn.conf.py app:app
+# =============================================================================
+
+import os
+import re
+import tempfile
+
+# Antes de importar app: nada de hilos ni conexiones en el maestro que va a hacer fork
+os.environ.setdefault("ARRANQUE_MODO", "diferido")
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+# Todos los workers muestrean; solo uno envía las alertas proactivas
+os.environ.setdefault("RECOLECTOR_BLOQUEO", os.path.join(
+    tempfile.gettempdir(), "agentebd_recolector_" + re.sub(r"\W", "_", bind) + ".lock"
+))
+
+def when_ready(server):
+    # Maestro con la app ya importada y antes de crear los workers
+    import app
+    if app.Config.ARRANQUE_PRECALENTAR:
+        app.precalentar(antes_de_fork=True)
+
+def post_fork(server, worker):
+    # Cada worker arranca su propio loop e hilo del recolector y (al primer uso) pools y clientes
+    import app
+    app.iniciar_proceso()
@@ -0,0 +1,66 @@
+# =============================================================================
+# ARCHIVO: services/arranque.py
+# Descripción: Tiempos de arranque del proceso (import, precalentamiento, primera
+#              solicitud) y preparación de la memoria compartida antes de un fork
+# =============================================================================
+
+import gc
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class TiemposArranque:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self._fases: Dict[str, float] = {}
+        self._pid_primera: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def marcar(self, fase: str, segundos: float):
+        with self._lock:
+            self._fases[fase] = segundos
+        logger.info(f"⏱️ Arranque: {fase} en {segundos * 1000:.0f} ms")
+
+    @contextmanager
+    def medir(self, fase: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.marcar(fase, time.perf_counter() - inicio)
+
+    def registrar_solicitud(self, segundos: float):
+        # Solo la primera de cada proceso: paga la creación perezosa de clientes, pools y loops
+        pid = os.getpid()
+        if self._pid_primera == pid:
+            return
+        with self._lock:
+            if self._pid_primera == pid:
+                return
+            self._pid_primera = pid
+        self.marcar("primera_solicitud", segundos)
+
+    def fases(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._fases)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "fases_ms": {fase: round(s * 1000, 1) for fase, s in self.fases().items()},
+        }
+
+def congelar_memoria():
+    # Antes del fork: lo construido hasta aquí pasa a la generación permanente para que el
+    # GC de los workers no lo recorra (y no ensucie esas páginas compartidas copy-on-write)
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+        logger.info(f"🧊 {gc.get_freeze_count()} objetos congelados antes del fork")
+
+TIEMPOS = TiemposArranque()
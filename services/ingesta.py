@@ -0,0 +1,166 @@
+# =============================================================================
+# ARCHIVO: services/ingesta.py
+# Descripción: Ingesta asíncrona de updates de Telegram (ack inmediato + cola)
+# =============================================================================
+
+import asyncio
+import os
+import threading
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACEPTADO = "aceptado"
+DUPLICADO = "duplicado"
+LLENO = "lleno"
+
+class BucleFondo:
+    # Event loop persistente en un hilo propio, compartido por todas las peticiones WSGI
+    def __init__(self, nombre: str = "agentebd-loop"):
+        self.nombre = nombre
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def iniciar(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Tras un fork el hilo del loop no existe en el hijo: se crea uno propio
+                self.loop, self._hilo = None, None
+            if self.loop is None:
+                self._pid = os.getpid()
+                listo = threading.Event()
+                self.loop = asyncio.new_event_loop()
+                self._hilo = threading.Thread(target=self._correr, args=(listo,), name=self.nombre, daemon=True)
+                self._hilo.start()
+                listo.wait()
+        return self.loop
+
+    def _correr(self, listo: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(listo.set)
+        self.loop.run_forever()
+
+    def ejecutar(self, coro: Awaitable) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.iniciar())
+
+    def detener(self):
+        with self._lock:
+            loop, hilo = self.loop, self._hilo
+            self.loop, self._hilo = None, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            hilo.join(timeout=5)
+
+class ColaIngesta:
+    def __init__(self, procesador: Callable[[Dict[str, Any]], Awaitable[Any]], concurrencia: int,
+                 max_pendientes: int, tamano_dedup: int):
+        self._procesador = procesador
+        self.concurrencia = concurrencia
+        self.max_pendientes = max_pendientes
+        self.tamano_dedup = tamano_dedup
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        # update_id recientes para descartar reintentos de Telegram
+        self._vistos: "OrderedDict[Any, None]" = OrderedDict()
+        # Una cola por chat: los mensajes de un mismo chat se procesan en orden
+        self._colas_chat: Dict[Any, deque] = {}
+        self._tareas: Set[asyncio.Task] = set()
+        self._pendientes = 0
+
+        self._aceptados = 0
+        self._duplicados = 0
+        self._rechazados = 0
+        self._errores = 0
+
+    def vincular(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def enviar(self, update: Dict[str, Any], chat_id: Any) -> Tuple[str, Optional[Future]]:
+        # Puede llamarse desde cualquier hilo; decide de inmediato para poder responder a Telegram
+        estado = self._admitir(update.get("update_id"))
+        if estado != ACEPTADO:
+            return estado, None
+
+        futuro: Future = Future()
+        if self._en_hilo_del_loop():
+            self._encolar(chat_id, update, futuro)
+        else:
+            self._loop.call_soon_threadsafe(self._encolar, chat_id, update, futuro)
+        return estado, futuro
+
+    def _en_hilo_del_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _admitir(self, update_id: Any) -> str:
+        with self._lock:
+            if update_id is not None:
+                if update_id in self._vistos:
+                    self._vistos.move_to_end(update_id)
+                    self._duplicados += 1
+                    return DUPLICADO
+            if self._pendientes >= self.max_pendientes:
+                self._rechazados += 1
+                return LLENO
+            if update_id is not None:
+                self._vistos[update_id] = None
+                if len(self._vistos) > self.tamano_dedup:
+                    self._vistos.popitem(last=False)
+            self._pendientes += 1
+            self._aceptados += 1
+            return ACEPTADO
+
+    def _encolar(self, chat_id: Any, update: Dict[str, Any], futuro: Future):
+        # Se ejecuta siempre en el hilo del loop
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.concurrencia)
+        cola = self._colas_chat.get(chat_id)
+        if cola is not None:
+            cola.append((update, futuro))
+            return
+        self._colas_chat[chat_id] = deque([(update, futuro)])
+        # El loop solo guarda referencias débiles a sus tareas: sin esta, el GC podría recogerla
+        tarea = asyncio.ensure_future(self._trabajador_chat(chat_id))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    async def _trabajador_chat(self, chat_id: Any):
+        cola = self._colas_chat[chat_id]
+        try:
+            while cola:
+                update, futuro = cola.popleft()
+                try:
+                    async with self._semaforo:
+                        resultado = await self._procesador(update)
+                    futuro.set_result(resultado)
+                except Exception as e:
+                    with self._lock:
+                        self._errores += 1
+                    logger.error(f"❌ Error procesando update {update.get('update_id')}: {str(e)}")
+                    futuro.set_exception(e)
+                finally:
+                    with self._lock:
+                        self._pendientes -= 1
+        finally:
+            del self._colas_chat[chat_id]
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrencia": self.concurrencia,
+                "pendientes": self._pendientes,
+                "chats_activos": len(self._colas_chat),
+                "aceptados": self._aceptados,
+                "duplicados": self._duplicados,
+                "rechazados": self._rechazados,
+                "errores": self._errores,
+            }
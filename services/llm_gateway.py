@@ -0,0 +1,233 @@
+# =============================================================================
+# ARCHIVO: services/llm_gateway.py
+# Descripción: Gateway LLM compartido por todos los agentes (cliente asíncrono,
+#              conexiones keep-alive, límite de concurrencia y tasa, reintentos)
+# =============================================================================
+
+import asyncio
+import random
+import threading
+import time
+import weakref
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# El SDK de OpenAI tarda medio segundo en importarse: se carga con el primer cliente
+# (o en el precalentamiento previo al fork, para que los workers lo hereden ya cargado)
+openai = None
+
+def cargar_sdk():
+    global openai
+    if openai is None:
+        import openai as sdk
+        openai = sdk
+    return openai
+
+class LimitadorTasa:
+    # Token bucket: `tasa` peticiones por segundo con ráfagas de hasta `capacidad`
+    def __init__(self, tasa: float, capacidad: float):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reservar(self) -> float:
+        # Reserva un token y devuelve cuánto hay que esperar para que exista
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.tasa
+
+    async def adquirir(self):
+        if self.tasa <= 0:
+            return
+        espera = self._reservar()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def intentar(self) -> float:
+        # Sin esperar: toma un token si lo hay (0.0) o dice cuánto falta para el siguiente
+        if self.tasa <= 0:
+            return 0.0
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.tasa
+
+class UsoAgente:
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.tokens_prompt = 0
+        self.tokens_respuesta = 0
+        self.latencia_total = 0.0
+        self.latencia_max = 0.0
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "llamadas": self.llamadas,
+            "errores": self.errores,
+            "reintentos": self.reintentos,
+            "tokens_prompt": self.tokens_prompt,
+            "tokens_respuesta": self.tokens_respuesta,
+            "latencia_media_ms": (self.latencia_total / self.llamadas * 1000) if self.llamadas else 0.0,
+            "latencia_max_ms": self.latencia_max * 1000,
+        }
+
+class GatewayLLM:
+    def __init__(self, api_key: str, base_url: Optional[str] = None, max_concurrencia: int = 8,
+                 tasa_por_segundo: float = 5, rafaga: float = 10, timeout: float = 30,
+                 reintentos: int = 3, max_conexiones: int = 20):
+        self.api_key = api_key
+        self.base_url = base_url or None
+        self.max_concurrencia = max_concurrencia
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.max_conexiones = max_conexiones
+        self.limitador = LimitadorTasa(tasa_por_segundo, rafaga)
+
+        # Cliente HTTP y semáforo pertenecen a un event loop concreto
+        self._por_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._uso: Dict[str, UsoAgente] = {}
+        self._en_curso = 0
+
+    def _recursos_loop(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        recursos = self._por_loop.get(loop)
+        if recursos is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_conexiones,
+                    max_keepalive_connections=self.max_conexiones,
+                    keepalive_expiry=60
+                ),
+                timeout=self.timeout
+            )
+            recursos = {
+                # Los reintentos los gestiona el gateway, no el SDK
+                "cliente": cargar_sdk().AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                                    max_retries=0, timeout=self.timeout, http_client=http_client),
+                "semaforo": asyncio.Semaphore(self.max_concurrencia),
+            }
+            self._por_loop[loop] = recursos
+        return recursos
+
+    def _uso_agente(self, agente: str) -> UsoAgente:
+        uso = self._uso.get(agente)
+        if uso is None:
+            uso = self._uso.setdefault(agente, UsoAgente())
+        return uso
+
+    @staticmethod
+    def _es_reintentable(error: Exception) -> bool:
+        sdk = cargar_sdk()
+        if isinstance(error, (sdk.RateLimitError, sdk.APIConnectionError, asyncio.TimeoutError)):
+            return True
+        return isinstance(error, sdk.APIStatusError) and error.status_code >= 500
+
+    @staticmethod
+    def _espera_reintento(error: Exception, intento: int) -> float:
+        # Respetar Retry-After si el servidor lo indica; si no, backoff exponencial con jitter completo
+        respuesta = getattr(error, "response", None)
+        if respuesta is not None:
+            retry_after = respuesta.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(8.0, 0.5 * (2 ** intento)))
+
+    async def completar(self, agente: str, *, model: str, messages: List[Dict[str, str]],
+                        timeout: Optional[float] = None, **kwargs) -> str:
+        recursos = self._recursos_loop()
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + (timeout or self.timeout)
+        uso = self._uso_agente(agente)
+        intento = 0
+
+        while True:
+            restante = limite - loop.time()
+            if restante <= 0:
+                raise asyncio.TimeoutError(f"Plazo agotado llamando al LLM ({agente})")
+
+            try:
+                await self.limitador.adquirir()
+                async with recursos["semaforo"]:
+                    inicio = time.perf_counter()
+                    with self._lock:
+                        self._en_curso += 1
+                    try:
+                        respuesta = await asyncio.wait_for(
+                            recursos["cliente"].chat.completions.create(model=model, messages=messages, **kwargs),
+                            timeout=max(0.1, limite - loop.time())
+                        )
+                    finally:
+                        with self._lock:
+                            self._en_curso -= 1
+            except Exception as e:
+                intento += 1
+                puede_reintentar = self._es_reintentable(e) and intento <= self.reintentos
+                with self._lock:
+                    if puede_reintentar:
+                        uso.reintentos += 1
+                    else:
+                        uso.errores += 1
+                if not puede_reintentar:
+                    raise
+                espera = min(self._espera_reintento(e, intento), max(0.0, limite - loop.time()))
+                logger.warning(f"⚠️ LLM ({agente}) falló con {type(e).__name__}; reintento {intento} en {espera:.2f}s")
+                await asyncio.sleep(espera)
+                continue
+
+            latencia = time.perf_counter() - inicio
+            with self._lock:
+                uso.llamadas += 1
+                uso.latencia_total += latencia
+                uso.latencia_max = max(uso.latencia_max, latencia)
+                if respuesta.usage is not None:
+                    uso.tokens_prompt += respuesta.usage.prompt_tokens or 0
+                    uso.tokens_respuesta += respuesta.usage.completion_tokens or 0
+            return respuesta.choices[0].message.content.strip()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "en_curso": self._en_curso,
+                "max_concurrencia": self.max_concurrencia,
+                "agentes": {agente: uso.como_dict() for agente, uso in self._uso.items()},
+            }
+
+_gateway: Optional[GatewayLLM] = None
+_gateway_lock = threading.Lock()
+
+def obtener_gateway() -> GatewayLLM:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = GatewayLLM(
+                    api_key=Config.OPENAI_API_KEY,
+                    base_url=Config.OPENAI_BASE_URL,
+                    max_concurrencia=Config.LLM_MAX_CONCURRENCIA,
+                    tasa_por_segundo=Config.LLM_TASA_POR_SEGUNDO,
+                    rafaga=Config.LLM_RAFAGA,
+                    timeout=Config.LLM_TIMEOUT,
+                    reintentos=Config.LLM_REINTENTOS,
+                    max_conexiones=Config.LLM_MAX_CONEXIONES
+                )
+    return _gateway
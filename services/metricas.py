@@ -0,0 +1,232 @@
+# =============================================================================
+# ARCHIVO: services/metricas.py
+# Descripción: Métricas en memoria (contadores, histogramas), exportación en
+#              formato Prometheus y trazas por solicitud en logs JSON
+# =============================================================================
+
+import contextvars
+import json
+import math
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger_trazas = logging.getLogger("agentebd.trazas")
+
+CUANTILES = (0.5, 0.95, 0.99)
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+def _clave_etiquetas(etiquetas: Dict[str, Any]) -> Etiquetas:
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+def _formatear_etiquetas(etiquetas: Etiquetas, extra: Etiquetas = ()) -> str:
+    todas = etiquetas + extra
+    if not todas:
+        return ""
+    pares = ",".join(f'{k}="{_escapar(v)}"' for k, v in todas)
+    return "{" + pares + "}"
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _formatear_valor(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor))
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._valores: Dict[Etiquetas, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1, **etiquetas):
+        clave = _clave_etiquetas(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + valor
+
+    def exportar(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for clave, valor in self._valores.items():
+                lineas.append(f"{self.nombre}{_formatear_etiquetas(clave)} {_formatear_valor(valor)}")
+        return lineas
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, buckets: Iterable[float] = BUCKETS_SEGUNDOS, ventana: int = 2048):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(sorted(buckets))
+        self.ventana = ventana
+        # Por combinación de etiquetas: [conteos por bucket, suma, total, muestras recientes]
+        self._series: Dict[Etiquetas, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **etiquetas):
+        clave = _clave_etiquetas(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = [[0] * len(self.buckets), 0.0, 0, deque(maxlen=self.ventana)]
+                self._series[clave] = serie
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+            serie[3].append(valor)
+
+    def series(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [dict(clave) for clave in self._series]
+
+    def cuantiles(self, **etiquetas) -> Dict[float, float]:
+        with self._lock:
+            serie = self._series.get(_clave_etiquetas(etiquetas))
+            muestras = sorted(serie[3]) if serie else []
+        return self._calcular_cuantiles(muestras)
+
+    @staticmethod
+    def _calcular_cuantiles(muestras: List[float]) -> Dict[float, float]:
+        if not muestras:
+            return {}
+        return {q: muestras[min(len(muestras) - 1, int(q * len(muestras)))] for q in CUANTILES}
+
+    def exportar(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        cuantiles = [
+            f"# HELP {self.nombre}_cuantil Cuantiles sobre las últimas {self.ventana} observaciones",
+            f"# TYPE {self.nombre}_cuantil gauge"
+        ]
+        with self._lock:
+            series = [(clave, list(s[0]), s[1], s[2], sorted(s[3])) for clave, s in self._series.items()]
+        for clave, conteos, suma, total, muestras in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(clave, (('le', _formatear_valor(limite)),))} {acumulado}")
+            lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(clave, (('le', '+Inf'),))} {total}")
+            lineas.append(f"{self.nombre}_sum{_formatear_etiquetas(clave)} {_formatear_valor(suma)}")
+            lineas.append(f"{self.nombre}_count{_formatear_etiquetas(clave)} {total}")
+            for q, valor in self._calcular_cuantiles(muestras).items():
+                cuantiles.append(f"{self.nombre}_cuantil{_formatear_etiquetas(clave, (('quantile', str(q)),))} {_formatear_valor(valor)}")
+        return lineas + cuantiles
+
+# Un colector devuelve en cada scrape: [(nombre, tipo, ayuda, [(etiquetas, valor)])]
+Colector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]
+
+class RegistroMetricas:
+    def __init__(self):
+        self._metricas: Dict[str, Any] = {}
+        self._colectores: List[Colector] = []
+        self._lock = threading.Lock()
+
+    def contador(self, nombre: str, ayuda: str) -> Contador:
+        with self._lock:
+            return self._metricas.setdefault(nombre, Contador(nombre, ayuda))
+
+    def histograma(self, nombre: str, ayuda: str, buckets: Iterable[float] = BUCKETS_SEGUNDOS) -> Histograma:
+        with self._lock:
+            return self._metricas.setdefault(nombre, Histograma(nombre, ayuda, buckets))
+
+    def registrar_colector(self, colector: Colector):
+        with self._lock:
+            self._colectores.append(colector)
+
+    def exportar(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+            colectores = list(self._colectores)
+        lineas: List[str] = []
+        for metrica in metricas:
+            lineas.extend(metrica.exportar())
+        for colector in colectores:
+            try:
+                familias = colector()
+            except Exception as e:
+                logger_trazas.error(f"❌ Error en colector de métricas: {str(e)}")
+                continue
+            for nombre, tipo, ayuda, muestras in familias:
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                for etiquetas, valor in muestras:
+                    lineas.append(f"{nombre}{_formatear_etiquetas(_clave_etiquetas(etiquetas))} {_formatear_valor(valor)}")
+        return "\n".join(lineas) + "\n"
+
+REGISTRO = RegistroMetricas()
+
+# Métricas comunes del pipeline
+LATENCIA_ETAPA = REGISTRO.histograma("agentebd_etapa_segundos", "Duración de cada etapa del procesamiento")
+SOLICITUDES = REGISTRO.contador("agentebd_solicitudes_total", "Solicitudes procesadas por resultado")
+FILAS_LEIDAS = REGISTRO.contador("agentebd_oracle_filas_leidas_total", "Filas leídas de Oracle")
+
+# -----------------------------------------------------------------------------
+# Trazas por solicitud
+# -----------------------------------------------------------------------------
+
+class Traza:
+    def __init__(self, **contexto):
+        self.id = uuid.uuid4().hex[:16]
+        self.contexto = contexto
+        self.inicio = time.perf_counter()
+        self.etapas: List[Dict[str, Any]] = []
+        self.atributos: Dict[str, Any] = {}
+
+    def registrar(self, etapa: str, inicio: float, duracion: float, **atributos):
+        registro = {
+            "etapa": etapa,
+            "inicio_ms": round((inicio - self.inicio) * 1000, 3),
+            "duracion_ms": round(duracion * 1000, 3),
+        }
+        registro.update(atributos)
+        self.etapas.append(registro)
+
+    def como_dict(self) -> Dict[str, Any]:
+        datos = {"traza_id": self.id}
+        datos.update(self.contexto)
+        datos.update(self.atributos)
+        datos["duracion_ms"] = round((time.perf_counter() - self.inicio) * 1000, 3)
+        datos["etapas"] = self.etapas
+        return datos
+
+_traza_actual: contextvars.ContextVar[Optional[Traza]] = contextvars.ContextVar("traza_actual", default=None)
+
+def traza_actual() -> Optional[Traza]:
+    return _traza_actual.get()
+
+def anotar(**atributos):
+    # Añade atributos a la traza en curso (p.ej. origen de la SQL, filas, aciertos de caché)
+    traza = _traza_actual.get()
+    if traza is not None:
+        traza.atributos.update(atributos)
+
+@contextmanager
+def iniciar_traza(**contexto):
+    traza = Traza(**contexto)
+    token = _traza_actual.set(traza)
+    try:
+        yield traza
+    finally:
+        _traza_actual.reset(token)
+        LATENCIA_ETAPA.observar(time.perf_counter() - traza.inicio, etapa="total")
+        logger_trazas.info(json.dumps(traza.como_dict(), ensure_ascii=False, default=str))
+
+@contextmanager
+def medir(etapa: str, **atributos):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        LATENCIA_ETAPA.observar(duracion, etapa=etapa)
+        traza = _traza_actual.get()
+        if traza is not None:
+            traza.registrar(etapa, inicio, duracion, **atributos)
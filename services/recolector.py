@@ -0,0 +1,336 @@
+# =============================================================================
+# ARCHIVO: services/recolector.py
+# Descripción: Recolector en segundo plano de las consultas de monitoreo del
+#              catálogo: muestreo periódico, series temporales y alertas
+# =============================================================================
+
+import os
+import re
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Sin fcntl (Windows) no hay bloqueo entre procesos: cada uno alerta
+    fcntl = None
+
+from config.settings import Config
+from database.oracle_executor import PoolOracle, _es_error_conexion, _manejador_tipos
+from database.resultado import ResultadoConsulta
+from services.metricas import REGISTRO
+from services.series_tiempo import AlmacenSeries, resumir_ventana
+
+logger = logging.getLogger("agentebd.recolector")
+
+MUESTRAS = REGISTRO.contador("agentebd_recolector_muestras_total", "Muestreos de consultas de monitoreo por resultado")
+ALERTAS = REGISTRO.contador("agentebd_recolector_alertas_total", "Alertas proactivas emitidas por nivel")
+
+NIVELES = ("normal", "aviso", "critico")
+
+# "últimos 30 minutos", "ultima hora", "últimas 2 h"; sin cifra, "tendencia"/"evolución"
+PATRON_VENTANA = re.compile(r"\bultim[oa]s?\s+(?:(\d+)\s*)?(segundos?|seg|s|minutos?|min|m|horas?|h)\b")
+PATRON_TENDENCIA = re.compile(r"\b(tendencia|evolucion|historico|historial)\b")
+SEGUNDOS_UNIDAD = {"s": 1, "m": 60, "h": 3600}
+
+def detectar_ventana(texto_normalizado: str) -> Optional[int]:
+    # Segundos de historia pedidos en la pregunta o None si no es una pregunta de tendencia
+    coincidencia = PATRON_VENTANA.search(texto_normalizado)
+    if coincidencia:
+        cantidad = int(coincidencia.group(1) or 1)
+        return cantidad * SEGUNDOS_UNIDAD[coincidencia.group(2)[0]]
+    if PATRON_TENDENCIA.search(texto_normalizado):
+        return int(Config.TENDENCIA_MINUTOS_DEFECTO * 60)
+    return None
+
+def describir_ventana(segundos: int) -> str:
+    if segundos % 3600 == 0:
+        return f"{segundos // 3600} h"
+    if segundos % 60 == 0:
+        return f"{segundos // 60} min"
+    return f"{segundos} s"
+
+def _a_numero(valor: Any) -> Optional[float]:
+    # LIMIT_VALUE llega como texto y puede ser 'UNLIMITED'
+    try:
+        return float(str(valor).strip())
+    except (TypeError, ValueError):
+        return None
+
+class RecolectorMonitoreo:
+    # Cada consulta del catálogo con bloque "muestreo" se ejecuta cada N segundos;
+    # las preguntas del bot sobre ella se responden desde la última muestra
+    def __init__(self, catalogo, pool: PoolOracle, capacidad: Optional[int] = None,
+                 notificar: Optional[Callable[[str], None]] = None):
+        self.catalogo = catalogo
+        self.pool = pool
+        self.notificar = notificar
+        self.almacen = AlmacenSeries(capacidad or Config.RECOLECTOR_CAPACIDAD)
+        self._instantaneas: Dict[str, ResultadoConsulta] = {}
+        self._proxima: Dict[str, float] = {}
+        # (consulta, clave, métrica) -> nivel de alerta vigente (índice en NIVELES)
+        self._niveles: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+        self._hilo_pid: Optional[int] = None
+        # Todos los workers muestrean (cada uno responde tendencias desde su almacén), pero
+        # solo envía alertas el proceso que tiene el archivo de bloqueo
+        self._archivo_bloqueo = None
+        self._bloqueo_pid: Optional[int] = None
+        self._ciclos = 0
+        self._errores = 0
+        self._alertas = 0
+        self._ultimo_ciclo_ms = 0.0
+
+    # -------------------------------------------------------------------------
+    # Planificación
+    # -------------------------------------------------------------------------
+
+    def _consultas_muestreadas(self) -> Dict[str, Dict[str, Any]]:
+        # Las plantillas con parámetros no tienen valores que muestrear: solo consultas fijas
+        return {nombre: config for nombre, config in self.catalogo.consultas.items()
+                if config.get("muestreo") and not config.get("parametros")}
+
+    @staticmethod
+    def _intervalo(config: Dict[str, Any]) -> float:
+        return float(config["muestreo"].get("intervalo", Config.RECOLECTOR_INTERVALO))
+
+    def asegurar_inicio(self):
+        # Hilo de muestreo creado una vez por proceso (seguro tras fork)
+        if not Config.RECOLECTOR_ACTIVO or self._hilo_pid == os.getpid():
+            return
+        with self._lock:
+            if self._hilo_pid == os.getpid():
+                return
+            self._hilo_pid = os.getpid()
+        threading.Thread(target=self._bucle, name="recolector-monitoreo", daemon=True).start()
+        logger.info(f"📈 Recolector de monitoreo iniciado ({len(self._consultas_muestreadas())} consultas)")
+
+    def _designado(self) -> bool:
+        # Bloqueo exclusivo no bloqueante: si el proceso que lo tiene muere, el SO lo libera
+        # y otro worker lo toma en su siguiente intento
+        ruta = Config.RECOLECTOR_BLOQUEO
+        if not ruta or fcntl is None:
+            return True
+        if self._bloqueo_pid == os.getpid():
+            return True
+        archivo = open(ruta, "a+")
+        try:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        archivo.truncate(0)
+        archivo.write(f"{os.getpid()}\n")
+        archivo.flush()
+        self._archivo_bloqueo, self._bloqueo_pid = archivo, os.getpid()
+        logger.info(f"📈 Proceso {os.getpid()} designado para enviar alertas ({ruta})")
+        return True
+
+    def _bucle(self):
+        while True:
+            ahora = time.monotonic()
+            consultas = self._consultas_muestreadas()
+            pendientes = [n for n in consultas if self._proxima.get(n, 0.0) <= ahora]
+            if pendientes:
+                self.muestrear([(n, consultas[n]) for n in pendientes])
+                for nombre in pendientes:
+                    self._proxima[nombre] = ahora + self._intervalo(consultas[nombre])
+            siguiente = min(self._proxima.values(), default=ahora + Config.RECOLECTOR_INTERVALO)
+            time.sleep(max(0.5, siguiente - time.monotonic()))
+
+    # -------------------------------------------------------------------------
+    # Muestreo
+    # -------------------------------------------------------------------------
+
+    def muestrear(self, consultas: List[Tuple[str, Dict[str, Any]]]):
+        # Todas las consultas vencidas del ciclo comparten una sola conexión
+        inicio = time.perf_counter()
+        try:
+            with self.pool.conexion() as conn:
+                conn.call_timeout = Config.RECOLECTOR_TIMEOUT
+                try:
+                    for nombre, config in consultas:
+                        self._muestrear_consulta(conn, nombre, config)
+                finally:
+                    conn.call_timeout = 0
+        except Exception as e:
+            # Base caída o pool agotado: se reintenta en el siguiente ciclo
+            with self._lock:
+                self._errores += 1
+            MUESTRAS.inc(resultado="error")
+            logger.warning(f"⚠️ Recolector sin conexión: {str(e)}")
+        with self._lock:
+            self._ciclos += 1
+            self._ultimo_ciclo_ms = (time.perf_counter() - inicio) * 1000
+
+    def _muestrear_consulta(self, conn, nombre: str, config: Dict[str, Any]):
+        try:
+            with conn.cursor() as cursor:
+                cursor.outputtypehandler = _manejador_tipos
+                cursor.execute(config["sql"])
+                columnas = [desc[0] for desc in cursor.description]
+                # Una fila de más para saber si la muestra quedó cortada
+                filas = cursor.fetchmany(Config.ORACLE_MAX_FILAS + 1)
+        except Exception as e:
+            if _es_error_conexion(e):
+                # Conexión rota: que el pool la descarte y se corte el ciclo
+                raise
+            with self._lock:
+                self._errores += 1
+            MUESTRAS.inc(consulta=nombre, resultado="error")
+            logger.warning(f"⚠️ Error muestreando '{nombre}': {str(e)}")
+            return
+
+        hay_mas = len(filas) > Config.ORACLE_MAX_FILAS
+        resultado = ResultadoConsulta(columnas, filas[:Config.ORACLE_MAX_FILAS], hay_mas=hay_mas)
+        if hay_mas:
+            logger.warning(f"⚠️ Muestra de '{nombre}' cortada en {Config.ORACLE_MAX_FILAS} filas")
+        with self._lock:
+            self._instantaneas[nombre] = resultado
+        MUESTRAS.inc(consulta=nombre, resultado="ok")
+        try:
+            self._registrar_series(nombre, config, resultado)
+        except KeyError as e:
+            # Bloque "muestreo" que nombra columnas que la consulta no devuelve
+            logger.warning(f"⚠️ Muestreo de '{nombre}' mal configurado: columna {str(e)} inexistente")
+
+    def _registrar_series(self, nombre: str, config: Dict[str, Any], resultado: ResultadoConsulta):
+        muestreo = config["muestreo"]
+        instante = resultado.obtenido_en
+        claves = self._claves(resultado, muestreo.get("claves", []))
+
+        for metrica in muestreo.get("metricas", []):
+            for clave, valor in zip(claves, resultado.columna(metrica)):
+                numero = _a_numero(valor)
+                if numero is not None:
+                    self.almacen.agregar(nombre, metrica.upper(), clave, instante, numero)
+
+        # Columnas de estado: 1 si coincide con el valor esperado, 0 si no
+        for columna, esperado in (muestreo.get("esperados") or {}).items():
+            for clave, valor in zip(claves, resultado.columna(columna)):
+                correcto = str(valor).upper() == str(esperado).upper()
+                self.almacen.agregar(nombre, columna.upper(), clave, instante, 1.0 if correcto else 0.0)
+                self._actualizar_nivel(nombre, clave, columna.upper(), 0 if correcto else 2,
+                                       f"{columna}={valor} (esperado {esperado})")
+
+        alerta = muestreo.get("alerta")
+        if alerta:
+            self._evaluar_utilizacion(nombre, config, resultado, claves, alerta)
+
+    @staticmethod
+    def _claves(resultado: ResultadoConsulta, columnas_clave: List[str]) -> List[str]:
+        if not columnas_clave:
+            return [str(i) for i in range(len(resultado))]
+        valores = [resultado.columna(c) for c in columnas_clave]
+        return ["/".join(str(v) for v in fila) for fila in zip(*valores)]
+
+    # -------------------------------------------------------------------------
+    # Alertas
+    # -------------------------------------------------------------------------
+
+    def _evaluar_utilizacion(self, nombre: str, config: Dict[str, Any], resultado: ResultadoConsulta,
+                             claves: List[str], alerta: Dict[str, str]):
+        umbrales = config.get("umbrales") or {}
+        aviso = float(umbrales.get("aviso_pct", Config.REGLAS_UMBRAL_AVISO))
+        critico = float(umbrales.get("critico_pct", Config.REGLAS_UMBRAL_CRITICO))
+        metrica = alerta["valor"].upper()
+        valores = resultado.columna(alerta["valor"])
+        limites = resultado.columna(alerta["limite"])
+        for clave, valor, limite in zip(claves, valores, limites):
+            actual, maximo = _a_numero(valor), _a_numero(limite)
+            if actual is None or not maximo:
+                continue
+            pct = actual * 100 / maximo
+            nivel = self._nivel(pct, self._niveles.get((nombre, clave, metrica), 0), aviso, critico)
+            self._actualizar_nivel(nombre, clave, metrica, nivel,
+                                   f"{actual:.0f}/{maximo:.0f} ({pct:.1f}%, aviso {aviso:.0f}%, crítico {critico:.0f}%)")
+
+    @staticmethod
+    def _nivel(pct: float, previo: int, aviso: float, critico: float) -> int:
+        # Histéresis: un nivel ya activo solo se abandona al bajar del umbral con margen
+        margen = Config.RECOLECTOR_HISTERESIS
+        if pct >= critico or (previo == 2 and pct >= critico - margen):
+            return 2
+        if pct >= aviso or (previo >= 1 and pct >= aviso - margen):
+            return 1
+        return 0
+
+    def _actualizar_nivel(self, nombre: str, clave: str, metrica: str, nivel: int, detalle: str):
+        # Todos los procesos siguen el nivel (así el que herede el bloqueo no repite alertas
+        # ya activas), pero solo el designado la emite
+        with self._lock:
+            previo = self._niveles.get((nombre, clave, metrica), 0)
+            if nivel == previo:
+                return
+            self._niveles[(nombre, clave, metrica)] = nivel
+        try:
+            designado = self._designado()
+        except OSError as e:
+            logger.warning(f"⚠️ Archivo de bloqueo del recolector inaccesible: {str(e)}")
+            designado = False
+        if not designado:
+            return
+        with self._lock:
+            self._alertas += 1
+        ALERTAS.inc(nivel=NIVELES[nivel])
+        encabezado = "✅ Recuperado" if nivel == 0 else f"{'🔴' if nivel == 2 else '🟠'} Alerta {NIVELES[nivel].upper()}"
+        texto = f"{encabezado}: {nombre} · {metrica} en {clave}: {detalle}"
+        logger.warning(texto)
+        if self.notificar is not None:
+            try:
+                self.notificar(texto)
+            except Exception as e:
+                logger.error(f"❌ Error enviando alerta: {str(e)}")
+
+    # -------------------------------------------------------------------------
+    # Consulta del almacén
+    # -------------------------------------------------------------------------
+
+    def muestrea(self, nombre: str) -> bool:
+        config = self.catalogo.obtener(nombre)
+        return bool(Config.RECOLECTOR_ACTIVO and config and config.get("muestreo") and not config.get("parametros"))
+
+    def instantanea(self, nombre: str) -> Optional[ResultadoConsulta]:
+        # Última muestra si aún es reciente (dos intervalos de muestreo)
+        if not self.muestrea(nombre):
+            return None
+        config = self.catalogo.obtener(nombre)
+        with self._lock:
+            resultado = self._instantaneas.get(nombre)
+        if resultado is None or resultado.edad_segundos() > 2 * self._intervalo(config):
+            return None
+        return resultado
+
+    def tendencia(self, nombre: str, segundos: int) -> Optional[ResultadoConsulta]:
+        # Resumen por serie de la ventana pedida, sin consultar la base de datos
+        desde = time.time() - segundos
+        filas = []
+        for metrica, clave in self.almacen.series_de(nombre):
+            resumen = resumir_ventana(*self.almacen.ventana(nombre, metrica, clave, desde))
+            if resumen is None:
+                continue
+            filas.append((clave, metrica, resumen["muestras"], resumen["primero"], resumen["ultimo"],
+                          resumen["minimo"], resumen["maximo"], round(resumen["media"], 2),
+                          round(resumen["pendiente_min"], 3)))
+        if not filas:
+            return None
+        columnas = ["CLAVE", "METRICA", "MUESTRAS", "PRIMERO", "ULTIMO", "MINIMO", "MAXIMO", "MEDIA", "PENDIENTE_MIN"]
+        return ResultadoConsulta(columnas, filas)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "activo": self._hilo_pid == os.getpid(),
+                "designado": self._hilo_pid == os.getpid() and (
+                    not Config.RECOLECTOR_BLOQUEO or fcntl is None or self._bloqueo_pid == os.getpid()
+                ),
+                "consultas": sorted(self._instantaneas),
+                "ciclos": self._ciclos,
+                "errores": self._errores,
+                "alertas": self._alertas,
+                "alertas_activas": sum(1 for nivel in self._niveles.values() if nivel),
+                "ultimo_ciclo_ms": self._ultimo_ciclo_ms,
+            }
+        stats.update(self.almacen.estadisticas())
+        return stats
@@ -0,0 +1,104 @@
+# =============================================================================
+# ARCHIVO: services/series_tiempo.py
+# Descripción: Series temporales en memoria sobre buffers circulares de tamaño
+#              fijo (array de doubles), por métrica y clave (instancia, recurso)
+# =============================================================================
+
+import math
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+class BufferCircular:
+    # Dos arrays contiguos (instantes y valores): 16 bytes por muestra, sin objetos por punto
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._instantes = array("d", bytes(8 * capacidad))
+        self._valores = array("d", bytes(8 * capacidad))
+        self._siguiente = 0
+        self._cantidad = 0
+
+    def __len__(self) -> int:
+        return self._cantidad
+
+    def agregar(self, instante: float, valor: float):
+        self._instantes[self._siguiente] = instante
+        self._valores[self._siguiente] = valor
+        self._siguiente = (self._siguiente + 1) % self.capacidad
+        self._cantidad = min(self._cantidad + 1, self.capacidad)
+
+    def ultimo(self) -> Optional[Tuple[float, float]]:
+        if not self._cantidad:
+            return None
+        i = (self._siguiente - 1) % self.capacidad
+        return self._instantes[i], self._valores[i]
+
+    def _indices(self):
+        inicio = (self._siguiente - self._cantidad) % self.capacidad
+        for k in range(self._cantidad):
+            yield (inicio + k) % self.capacidad
+
+    def ventana(self, desde: float) -> Tuple[List[float], List[float]]:
+        # Muestras con instante >= desde, de la más antigua a la más reciente
+        instantes, valores = [], []
+        for i in self._indices():
+            if self._instantes[i] >= desde:
+                instantes.append(self._instantes[i])
+                valores.append(self._valores[i])
+        return instantes, valores
+
+def resumir_ventana(instantes: List[float], valores: List[float]) -> Optional[Dict[str, float]]:
+    if not valores:
+        return None
+    n = len(valores)
+    media = sum(valores) / n
+    # Pendiente por mínimos cuadrados, en unidades por minuto
+    pendiente = 0.0
+    if n > 1:
+        media_t = sum(instantes) / n
+        varianza_t = sum((t - media_t) ** 2 for t in instantes)
+        if varianza_t > 0:
+            covarianza = sum((t - media_t) * (v - media) for t, v in zip(instantes, valores))
+            pendiente = covarianza / varianza_t * 60
+    return {
+        "muestras": n,
+        "primero": valores[0],
+        "ultimo": valores[-1],
+        "minimo": min(valores),
+        "maximo": max(valores),
+        "media": media,
+        "pendiente_min": pendiente if math.isfinite(pendiente) else 0.0,
+        "desde": instantes[0],
+        "hasta": instantes[-1],
+    }
+
+class AlmacenSeries:
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        # (consulta, métrica, clave) -> buffer; la clave identifica la fila (p.ej. "1/sessions")
+        self._series: Dict[Tuple[str, str, str], BufferCircular] = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, consulta: str, metrica: str, clave: str, instante: float, valor: float):
+        with self._lock:
+            buffer = self._series.get((consulta, metrica, clave))
+            if buffer is None:
+                buffer = self._series[(consulta, metrica, clave)] = BufferCircular(self.capacidad)
+            buffer.agregar(instante, valor)
+
+    def series_de(self, consulta: str) -> List[Tuple[str, str]]:
+        with self._lock:
+            return sorted((metrica, clave) for c, metrica, clave in self._series if c == consulta)
+
+    def ventana(self, consulta: str, metrica: str, clave: str, desde: float) -> Tuple[List[float], List[float]]:
+        with self._lock:
+            buffer = self._series.get((consulta, metrica, clave))
+            return buffer.ventana(desde) if buffer is not None else ([], [])
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "muestras": sum(len(b) for b in self._series.values()),
+                "bytes": len(self._series) * self.capacidad * 16,
+            }
@@ -0,0 +1,333 @@
+# =============================================================================
+# ARCHIVO: services/telegram_salida.py
+# Descripción: Despachador de salida hacia la Bot API de Telegram (sesión HTTP
+#              persistente, límites por chat y global, reintentos y cola acotada)
+# =============================================================================
+
+import asyncio
+import json
+import random
+import threading
+import time
+import weakref
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from config.settings import Config
+from services.llm_gateway import LimitadorTasa
+from services.metricas import REGISTRO
+
+logger = logging.getLogger(__name__)
+
+# Límite de la Bot API para el texto de un mensaje
+MAX_TEXTO_TELEGRAM = 4096
+
+LATENCIA_ENVIO = REGISTRO.histograma("agentebd_telegram_envio_segundos", "Duración de cada llamada a la Bot API (reintentos incluidos)")
+ENVIOS = REGISTRO.contador("agentebd_telegram_envios_total", "Llamadas a la Bot API por método y resultado")
+LIMITADAS = REGISTRO.contador("agentebd_telegram_limitadas_total", "Respuestas 429 de Telegram (flood control)")
+
+class ErrorTelegram(Exception):
+    def __init__(self, descripcion: str, codigo: int = 0, retry_after: Optional[float] = None):
+        super().__init__(descripcion)
+        self.codigo = codigo
+        self.retry_after = retry_after
+
+class TrabajoEnvio:
+    # Llamadas de un mismo mensaje (trozos en orden) y por dónde va su envío
+    def __init__(self, chat_id: Any, llamadas: List[Tuple[str, Dict[str, Any], Optional[Tuple[str, str]]]],
+                 futuro: asyncio.Future):
+        self.chat_id = chat_id
+        self.clave = str(chat_id)
+        self.llamadas = llamadas
+        self.futuro = futuro
+        self.resultados: List[Dict[str, Any]] = []
+        self.intento = 0
+        self.inicio_llamada = time.perf_counter()
+
+    @property
+    def terminado(self) -> bool:
+        return len(self.resultados) == len(self.llamadas)
+
+def dividir_texto(texto: str, limite: int = MAX_TEXTO_TELEGRAM) -> List[str]:
+    # Trozos en orden, cortando preferentemente en saltos de línea
+    trozos = []
+    while len(texto) > limite:
+        corte = texto.rfind("\n", 0, limite)
+        if corte < limite // 2:
+            corte = limite
+        trozos.append(texto[:corte])
+        texto = texto[corte:].lstrip("\n")
+    if texto or not trozos:
+        trozos.append(texto)
+    return trozos
+
+class DespachadorTelegram:
+    def __init__(self, token: str, base_url: str, tasa_global: float = 30, rafaga_global: float = 30,
+                 tasa_chat: float = 1, rafaga_chat: float = 3, max_pendientes: int = 500,
+                 trabajadores: int = 8, reintentos: int = 3, timeout: float = 30):
+        self.url = f"{base_url}{token}"
+        self.max_pendientes = max_pendientes
+        self.trabajadores = trabajadores
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self.tasa_chat = tasa_chat
+        self.rafaga_chat = rafaga_chat
+        self.limitador_global = LimitadorTasa(tasa_global, rafaga_global)
+        # Un token bucket por chat; se olvidan los de chats inactivos más antiguos
+        self._limitadores_chat: "OrderedDict[str, LimitadorTasa]" = OrderedDict()
+        # Tras un 429 nadie envía hasta este instante (monotonic): el flood control es del bot
+        self._pausa_hasta = 0.0
+
+        # Cliente HTTP, cola y trabajadores pertenecen a un event loop concreto
+        self._por_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._enviados = 0
+        self._errores = 0
+        self._reintentos = 0
+        self._limitadas = 0
+        self._trozos = 0
+        self._diferidos = 0
+
+    def _recursos_loop(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        recursos = self._por_loop.get(loop)
+        if recursos is None:
+            cliente = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.trabajadores, max_keepalive_connections=self.trabajadores,
+                                    keepalive_expiry=60),
+                timeout=self.timeout
+            )
+            # La cola lleva trabajos nuevos y avisos de "chat listo"; la admisión acotada es la
+            # contrapresión hacia la ingesta (con max_pendientes en vuelo quien envía espera)
+            recursos = {
+                "cliente": cliente,
+                "cola": asyncio.Queue(),
+                "admision": asyncio.Semaphore(self.max_pendientes),
+                "pendientes": 0,
+                # Chat con un envío en curso o esperando turno -> trabajos detrás de él, en orden
+                "por_chat": {},
+                "tareas": [],
+            }
+            self._por_loop[loop] = recursos
+            recursos["tareas"] = [loop.create_task(self._trabajador(recursos)) for _ in range(self.trabajadores)]
+        return recursos
+
+    def _limitador_chat(self, chat_id: Any) -> LimitadorTasa:
+        clave = str(chat_id)
+        with self._lock:
+            limitador = self._limitadores_chat.get(clave)
+            if limitador is None:
+                limitador = self._limitadores_chat[clave] = LimitadorTasa(self.tasa_chat, self.rafaga_chat)
+                if len(self._limitadores_chat) > 10000:
+                    self._limitadores_chat.popitem(last=False)
+            else:
+                self._limitadores_chat.move_to_end(clave)
+            return limitador
+
+    # -------------------------------------------------------------------------
+    # API pública (corrutinas: se esperan desde el loop que atiende el update)
+    # -------------------------------------------------------------------------
+
+    async def enviar_mensaje(self, chat_id: Any, texto: str) -> int:
+        # Textos largos salen en varios mensajes consecutivos; devuelve el id del primero
+        trozos = dividir_texto(texto)
+        if len(trozos) > 1:
+            with self._lock:
+                self._trozos += len(trozos)
+        llamadas = [("sendMessage", {"chat_id": chat_id, "text": trozo}, None) for trozo in trozos]
+        resultados = await self._encolar(chat_id, llamadas)
+        return resultados[0]["message_id"]
+
+    async def editar_mensaje(self, chat_id: Any, message_id: Any, texto: str):
+        try:
+            await self._encolar(chat_id, [("editMessageText", {"chat_id": chat_id, "message_id": message_id, "text": texto}, None)])
+        except ErrorTelegram as e:
+            # Editar con el mismo texto no es un error para quien llama
+            if "message is not modified" not in str(e):
+                raise
+
+    async def enviar_documento(self, chat_id: Any, ruta: str, nombre: str, leyenda: str = "") -> int:
+        archivo = (ruta, nombre)
+        resultados = await self._encolar(chat_id, [("sendDocument", {"chat_id": chat_id, "caption": leyenda}, archivo)])
+        return resultados[0]["message_id"]
+
+    async def _encolar(self, chat_id: Any, llamadas: List[Tuple[str, Dict[str, Any], Optional[Tuple[str, str]]]]) -> List[Dict[str, Any]]:
+        recursos = self._recursos_loop()
+        await recursos["admision"].acquire()
+        recursos["pendientes"] += 1
+        futuro = asyncio.get_running_loop().create_future()
+        # Los trozos de un mismo mensaje viajan juntos para que lleguen en orden
+        recursos["cola"].put_nowait(TrabajoEnvio(chat_id, llamadas, futuro))
+        return await futuro
+
+    # -------------------------------------------------------------------------
+    # Envío
+    # -------------------------------------------------------------------------
+
+    async def _trabajador(self, recursos: Dict[str, Any]):
+        # Un trabajador nunca duerme esperando a un chat: si el trabajo debe esperar (límite
+        # del chat, reintento o 429) se aparca y vuelve a la cola cuando le toca
+        cola: asyncio.Queue = recursos["cola"]
+        por_chat: Dict[str, deque] = recursos["por_chat"]
+        while True:
+            entrada = await cola.get()
+            try:
+                if isinstance(entrada, TrabajoEnvio):
+                    trabajo = entrada
+                    if trabajo.clave in por_chat:
+                        # Ese chat ya tiene un envío en curso o aparcado: este va detrás
+                        por_chat[trabajo.clave].append(trabajo)
+                        continue
+                    por_chat[trabajo.clave] = deque()
+                else:
+                    # Aviso de "chat listo": se retoma el primero de sus trabajos
+                    trabajo = por_chat[entrada].popleft()
+                await self._atender(recursos, trabajo)
+            finally:
+                cola.task_done()
+
+    async def _atender(self, recursos: Dict[str, Any], trabajo: TrabajoEnvio):
+        por_chat: Dict[str, deque] = recursos["por_chat"]
+        try:
+            espera = await self._avanzar(recursos["cliente"], trabajo)
+        except Exception as e:
+            espera = None
+            self._terminar(recursos, trabajo, error=e)
+        if espera is not None:
+            por_chat[trabajo.clave].appendleft(trabajo)
+            with self._lock:
+                self._diferidos += 1
+            asyncio.get_running_loop().call_later(espera, recursos["cola"].put_nowait, trabajo.clave)
+            return
+        if trabajo.terminado:
+            self._terminar(recursos, trabajo)
+        if por_chat[trabajo.clave]:
+            recursos["cola"].put_nowait(trabajo.clave)
+        else:
+            del por_chat[trabajo.clave]
+
+    def _terminar(self, recursos: Dict[str, Any], trabajo: TrabajoEnvio, error: Optional[Exception] = None):
+        if not trabajo.futuro.done():
+            if error is None:
+                trabajo.futuro.set_result(trabajo.resultados)
+            else:
+                trabajo.futuro.set_exception(error)
+        recursos["pendientes"] -= 1
+        recursos["admision"].release()
+
+    async def _avanzar(self, cliente: httpx.AsyncClient, trabajo: TrabajoEnvio) -> Optional[float]:
+        # Envía las llamadas pendientes del trabajo; devuelve los segundos que debe esperar
+        # antes de seguir o None si terminó
+        limitador_chat = self._limitador_chat(trabajo.chat_id)
+        while not trabajo.terminado:
+            metodo, parametros, archivo = trabajo.llamadas[len(trabajo.resultados)]
+            espera = self._pausa_hasta - time.monotonic()
+            if espera > 0:
+                return espera
+            espera = limitador_chat.intentar()
+            if espera > 0:
+                return espera
+            await self.limitador_global.adquirir()
+            try:
+                resultado = await self._peticion(cliente, metodo, parametros, archivo)
+            except ErrorTelegram as e:
+                trabajo.intento += 1
+                reintentable = e.codigo == 429 or e.codigo >= 500
+                if e.codigo == 429:
+                    LIMITADAS.inc(metodo=metodo)
+                    with self._lock:
+                        self._limitadas += 1
+                    if e.retry_after is not None:
+                        self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + e.retry_after)
+                if not reintentable or trabajo.intento > self.reintentos:
+                    self._contar_error(metodo)
+                    raise
+                espera = e.retry_after if e.retry_after is not None else random.uniform(0, min(8.0, 0.5 * (2 ** trabajo.intento)))
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                trabajo.intento += 1
+                if trabajo.intento > self.reintentos:
+                    self._contar_error(metodo)
+                    raise ErrorTelegram(f"Sin conexión con Telegram: {type(e).__name__}")
+                espera = random.uniform(0, min(8.0, 0.5 * (2 ** trabajo.intento)))
+            else:
+                LATENCIA_ENVIO.observar(time.perf_counter() - trabajo.inicio_llamada, metodo=metodo)
+                ENVIOS.inc(metodo=metodo, resultado="ok")
+                with self._lock:
+                    self._enviados += 1
+                trabajo.resultados.append(resultado)
+                trabajo.intento = 0
+                trabajo.inicio_llamada = time.perf_counter()
+                continue
+            with self._lock:
+                self._reintentos += 1
+            logger.warning(f"⚠️ Telegram {metodo} al chat {trabajo.chat_id}: reintento {trabajo.intento} en {espera:.2f}s")
+            return espera
+        return None
+
+    async def _peticion(self, cliente: httpx.AsyncClient, metodo: str, parametros: Dict[str, Any],
+                        archivo: Optional[Tuple[str, str]]) -> Dict[str, Any]:
+        url = f"{self.url}/{metodo}"
+        if archivo is None:
+            respuesta = await cliente.post(url, json=parametros)
+        else:
+            ruta, nombre = archivo
+            # El archivo se reabre en cada intento: un reintento vuelve a enviarlo completo
+            with open(ruta, "rb") as contenido:
+                datos = {k: str(v) for k, v in parametros.items() if v is not None}
+                respuesta = await cliente.post(url, data=datos, files={"document": (nombre, contenido)})
+        try:
+            cuerpo = respuesta.json()
+        except json.JSONDecodeError:
+            raise ErrorTelegram(f"Respuesta no válida de Telegram (HTTP {respuesta.status_code})", respuesta.status_code)
+        if not cuerpo.get("ok"):
+            retry_after = (cuerpo.get("parameters") or {}).get("retry_after")
+            raise ErrorTelegram(cuerpo.get("description", "Error de Telegram"),
+                                cuerpo.get("error_code", respuesta.status_code),
+                                float(retry_after) if retry_after is not None else None)
+        resultado = cuerpo.get("result")
+        return resultado if isinstance(resultado, dict) else {"message_id": None}
+
+    def _contar_error(self, metodo: str):
+        ENVIOS.inc(metodo=metodo, resultado="error")
+        with self._lock:
+            self._errores += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        pendientes = sum(r["pendientes"] for r in list(self._por_loop.values()))
+        with self._lock:
+            return {
+                "pendientes": pendientes,
+                "max_pendientes": self.max_pendientes,
+                "enviados": self._enviados,
+                "errores": self._errores,
+                "reintentos": self._reintentos,
+                "limitadas": self._limitadas,
+                "trozos": self._trozos,
+                "diferidos": self._diferidos,
+                "pausa_global_s": round(max(0.0, self._pausa_hasta - time.monotonic()), 1),
+                "chats_limitados": len(self._limitadores_chat),
+            }
+
+_despachador: Optional[DespachadorTelegram] = None
+_despachador_lock = threading.Lock()
+
+def obtener_despachador() -> DespachadorTelegram:
+    global _despachador
+    if _despachador is None:
+        with _despachador_lock:
+            if _despachador is None:
+                _despachador = DespachadorTelegram(
+                    token=Config.TELEGRAM_TOKEN,
+                    base_url=Config.TELEGRAM_BASE_URL,
+                    tasa_global=Config.TELEGRAM_TASA_GLOBAL,
+                    rafaga_global=Config.TELEGRAM_RAFAGA_GLOBAL,
+                    tasa_chat=Config.TELEGRAM_TASA_CHAT,
+                    rafaga_chat=Config.TELEGRAM_RAFAGA_CHAT,
+                    max_pendientes=Config.TELEGRAM_MAX_PENDIENTES,
+                    trabajadores=Config.TELEGRAM_TRABAJADORES,
+                    reintentos=Config.TELEGRAM_REINTENTOS,
+                    timeout=Config.TELEGRAM_TIMEOUT
+                )
+    return _despachador
@@ -0,0 +1,25 @@
+# =============================================================================
+# ARCHIVO: tests/conftest.py
+# Descripción: Entorno mínimo para las pruebas: raíz del repo en sys.path y
+#              configuración falsa antes de que se importe config.settings
+# =============================================================================
+
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+# Sin credenciales reales: ninguna prueba sale a Oracle, OpenAI ni Telegram
+for clave, valor in {
+    "TELEGRAM_TOKEN": "123456:PRUEBAS",
+    "OPENAI_API_KEY": "sk-pruebas",
+    "ORACLE_USER": "pruebas",
+    "ORACLE_PASSWORD": "pruebas",
+    "ORACLE_DSN": "pruebas/falso",
+    "SQL_CACHE_RUTA": "",
+    "ESQUEMA_INDICE_RUTA": "",
+    "RECOLECTOR_ACTIVO": "false",
+}.items():
+    os.environ.setdefault(clave, valor)
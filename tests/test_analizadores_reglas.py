@@ -0,0 +1,70 @@
+# =============================================================================
+# ARCHIVO: tests/test_analizadores_reglas.py
+# Descripción: Analizadores locales por reglas (umbrales, límites sin valor,
+#              etiquetas por destino y estado de instancias)
+# =============================================================================
+
+from agents.analizadores_reglas import REGISTRO_ANALIZADORES
+from database.resultado import ResultadoConsulta
+
+COLUMNAS_RECURSOS = ["INST_ID", "RESOURCE_NAME", "CURRENT_UTILIZATION", "MAX_UTILIZATION", "LIMIT_VALUE"]
+UMBRALES = {"aviso_pct": 80, "critico_pct": 95}
+
+def _recursos(filas, destinos=None) -> ResultadoConsulta:
+    if destinos is None:
+        return ResultadoConsulta(COLUMNAS_RECURSOS, filas)
+    return ResultadoConsulta(["DESTINO"] + COLUMNAS_RECURSOS, [(d,) + f for d, f in zip(destinos, filas)])
+
+def test_sin_alertas_resume_el_maximo_por_recurso():
+    analisis = REGISTRO_ANALIZADORES.analizar("procesos_sesiones", _recursos([
+        (1, "processes", 100, 120, "  300"),
+        (2, "processes", 150, 160, "  300"),
+        (1, "sessions", 10, 20, "  472"),
+    ]), UMBRALES)
+    assert analisis.startswith("✅")
+    assert "processes 50.0%" in analisis and "sessions 2.1%" in analisis
+
+def test_aviso_critico_y_pico():
+    analisis = REGISTRO_ANALIZADORES.analizar("procesos_sesiones", _recursos([
+        (1, "processes", 290, 295, "300"),   # crítico por uso actual
+        (1, "sessions", 400, 410, "472"),    # aviso
+        (2, "sessions", 100, 470, "472"),    # solo el pico supera el crítico
+        (1, "transactions", 9999, 9999, "UNLIMITED"),
+    ]), UMBRALES)
+    lineas = analisis.split("\n")
+    assert lineas[0].startswith("🔴 processes en instancia 1: 290/300")
+    assert lineas[1].startswith("🟠 sessions en instancia 1")
+    assert lineas[2].startswith("🟠 sessions en instancia 2") and "pico 99.6%" in lineas[2]
+    assert "transactions" not in analisis
+
+def test_solo_cinco_alertas_con_etiqueta_de_destino():
+    filas = [(1, f"recurso_{i}", 90 + i % 5, 90, "100") for i in range(8)]
+    analisis = REGISTRO_ANALIZADORES.analizar(
+        "procesos_sesiones", _recursos(filas, [f"bd{i}" for i in range(8)]), UMBRALES
+    )
+    lineas = analisis.split("\n")
+    assert lineas[0].startswith("🟠 recurso_4 en instancia bd4/1: 94/100")
+    assert lineas[5] == "... y 3 alertas más"
+
+def test_todo_ilimitado_no_aplica():
+    assert REGISTRO_ANALIZADORES.analizar("procesos_sesiones", _recursos([
+        (1, "processes", 10, 10, "UNLIMITED"), (1, "sessions", 10, 10, None)
+    ]), UMBRALES) is None
+
+def test_forma_inesperada_cae_al_llm():
+    resultado = ResultadoConsulta(["RESOURCE_NAME"], [("processes",)])
+    assert REGISTRO_ANALIZADORES.analizar("procesos_sesiones", resultado, UMBRALES) is None
+
+def test_estado_bd():
+    columnas = ["INSTANCE_NAME", "STATUS", "DATABASE_STATUS", "ARCHIVER"]
+    sano = ResultadoConsulta(columnas, [("ORCL1", "OPEN", "ACTIVE", "STARTED"), ("ORCL2", "open", "ACTIVE", "STARTED")])
+    assert REGISTRO_ANALIZADORES.analizar("estado_bd", sano).startswith("✅ 2 instancia(s)")
+
+    con_fallos = ResultadoConsulta(columnas, [("ORCL1", "MOUNTED", "ACTIVE", "STARTED"),
+                                              ("ORCL2", "OPEN", "ACTIVE", "STOPPED"),
+                                              ("ORCL3", "MOUNTED", "ACTIVE", "STARTED")])
+    assert REGISTRO_ANALIZADORES.analizar("estado_bd", con_fallos).split("\n") == [
+        "🔴 ORCL1: STATUS=MOUNTED (esperado OPEN)",
+        "🔴 ORCL3: STATUS=MOUNTED (esperado OPEN)",
+        "🔴 ORCL2: ARCHIVER=STOPPED (esperado STARTED)",
+    ]
@@ -0,0 +1,75 @@
+# =============================================================================
+# ARCHIVO: tests/test_catalogo.py
+# Descripción: Catálogo de consultas predefinidas: autómata Aho-Corasick,
+#              normalización de patrones y recarga en caliente
+# =============================================================================
+
+import json
+import os
+import random
+
+from agents.catalogo_consultas import AutomataPatrones, CatalogoConsultas
+
+def _ingenuo(patrones, texto):
+    # Referencia: el patrón más largo presente; a igual longitud, el que termina antes
+    # y, en la misma posición, el primero definido
+    mejor = None
+    for fin in range(1, len(texto) + 1):
+        for patron, valor in patrones:
+            if patron and texto[:fin].endswith(patron) and (mejor is None or len(patron) > mejor[2]):
+                mejor = (valor, fin - len(patron), len(patron))
+    return mejor
+
+def test_patron_mas_largo_gana():
+    automata = AutomataPatrones([("sesiones", "corta"), ("sesiones activas", "larga")])
+    assert automata.mejor_coincidencia("lista las sesiones activas") == ("larga", 10, 16)
+    assert automata.mejor_coincidencia("lista las sesiones") == ("corta", 10, 8)
+    assert automata.mejor_coincidencia("tablespaces") is None
+
+def test_solapamientos_por_enlaces_de_fallo():
+    # Clásico he/she/his/hers: las coincidencias dentro de otras salen por los enlaces de fallo
+    automata = AutomataPatrones([("he", 1), ("she", 2), ("his", 3), ("hers", 4)])
+    assert automata.mejor_coincidencia("ushers") == (4, 2, 4)
+    assert automata.mejor_coincidencia("ushe") == (2, 1, 3)
+    assert automata.mejor_coincidencia("ahis") == (3, 1, 3)
+
+def test_empates_y_duplicados():
+    automata = AutomataPatrones([("estado bd", "a"), ("estado bd", "b"), ("uso cpu", "c")])
+    # Mismo patrón dos veces: la primera definición; a igual longitud, la primera en el texto
+    assert automata.mejor_coincidencia("estado bd y uso cpu")[0] == "a"
+    assert automata.num_patrones == 3
+    assert AutomataPatrones([("", "vacio")]).mejor_coincidencia("cualquier cosa") is None
+
+def test_equivale_a_la_busqueda_ingenua():
+    aleatorio = random.Random(3)
+    alfabeto = "abc "
+    for _ in range(200):
+        patrones = [("".join(aleatorio.choice(alfabeto) for _ in range(aleatorio.randint(1, 4))), i)
+                    for i in range(aleatorio.randint(1, 8))]
+        texto = "".join(aleatorio.choice(alfabeto) for _ in range(aleatorio.randint(0, 20)))
+        assert AutomataPatrones(patrones).mejor_coincidencia(texto) == _ingenuo(patrones, texto), (patrones, texto)
+
+def test_catalogo_normaliza_patrones_y_busca():
+    catalogo = CatalogoConsultas.desde_dict({"consultas": {
+        "procesos_sesiones": {"patrones": ["¿Cuántas sesiones?", "límite de procesos"], "sql": ["SELECT 1", "FROM dual"]},
+        "estado_bd": {"patrones": ["estado de la base"], "sql": "SELECT 2 FROM dual"},
+    }})
+    nombre, consulta, _ = catalogo.buscar("dime cuantas sesiones hay")
+    assert nombre == "procesos_sesiones"
+    assert consulta["sql"] == "SELECT 1\nFROM dual" and consulta["tipo"] == "predefinida"
+    assert catalogo.buscar("tablespaces llenos")[0] is None
+
+def test_recarga_en_caliente_y_catalogo_roto(tmp_path):
+    ruta = tmp_path / "catalogo.json"
+    ruta.write_text(json.dumps({"consultas": {"uno": {"patrones": ["primera"], "sql": "SELECT 1 FROM dual"}}}))
+    catalogo = CatalogoConsultas(str(ruta), intervalo_recarga=0)
+    assert catalogo.buscar("la primera")[0] == "uno" and catalogo.version == 1
+
+    ruta.write_text(json.dumps({"consultas": {"dos": {"patrones": ["segunda"], "sql": "SELECT 2 FROM dual"}}}))
+    os.utime(ruta, (1, 1))
+    assert catalogo.buscar("la segunda")[0] == "dos" and catalogo.version == 2
+
+    # Un catálogo roto no sustituye al último válido
+    ruta.write_text("{roto")
+    os.utime(ruta, (2, 2))
+    assert catalogo.buscar("la segunda")[0] == "dos" and catalogo.version == 2
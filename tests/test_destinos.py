@@ -0,0 +1,81 @@
+# =============================================================================
+# ARCHIVO: tests/test_destinos.py
+# Descripción: Unión de resultados de varios destinos, selección de destinos
+#              por la pregunta y validación del archivo de destinos
+# =============================================================================
+
+import asyncio
+
+import pytest
+
+from database.destinos import COLUMNA_DESTINO, DestinoOracle, RegistroDestinos, combinar_resultados
+from database.resultado import ResultadoConsulta
+
+def test_combinar_alinea_columnas_por_nombre():
+    prod = ResultadoConsulta(["SID", "USERNAME"], [(1, "HR"), (2, "SCOTT")], obtenido_en=200.0)
+    # Otra versión de Oracle: columnas en otro orden y una de más
+    qa = ResultadoConsulta(["USERNAME", "SID", "CON_ID"], [("APP", 7, 3)], hay_mas=True, obtenido_en=100.0)
+    resultado = combinar_resultados([("prod", prod), ("qa", qa)])
+    assert resultado.columnas == [COLUMNA_DESTINO, "SID", "USERNAME", "CON_ID"]
+    assert list(resultado.filas) == [("prod", 1, "HR", None), ("prod", 2, "SCOTT", None), ("qa", 7, "APP", 3)]
+    assert resultado.hay_mas and resultado.obtenido_en == 100.0
+    assert resultado.avisos == []
+
+def test_destinos_fallidos_van_como_avisos():
+    prod = ResultadoConsulta(["SID"], [(1,)])
+    resultado = combinar_resultados([("prod", prod), ("qa", Exception("sin respuesta en 5s"))])
+    assert list(resultado.filas) == [("prod", 1)]
+    assert resultado.avisos == ["qa: sin respuesta en 5s"]
+
+def test_un_destino_vacio_no_es_un_fallo():
+    resultado = combinar_resultados([("prod", ResultadoConsulta(["SID"], [])), ("qa", Exception("ORA-12541"))])
+    assert resultado.columnas == [COLUMNA_DESTINO, "SID"] and len(resultado) == 0
+    assert resultado.avisos == ["qa: ORA-12541"]
+
+def test_falla_si_ningun_destino_responde():
+    with pytest.raises(Exception, match="Ningún destino respondió") as error:
+        combinar_resultados([("prod", Exception("ORA-12541")), ("qa", Exception("ORA-01017"))])
+    assert "prod: ORA-12541" in str(error.value) and "qa: ORA-01017" in str(error.value)
+
+def _registro():
+    destinos = [
+        DestinoOracle("prod1", "db1/orcl", "u", "p", etiquetas=["prod"]),
+        DestinoOracle("prod2", "db2/orcl", "u", "p", etiquetas=["prod", "ventas"]),
+        DestinoOracle("qa", "db3/orcl", "u", "p"),
+    ]
+    return RegistroDestinos(destinos, motor=object())
+
+def test_resolver_solo_con_destino_marcado():
+    registro = _registro()
+    assert registro.resolver("sesiones en todas las bases") == ["prod1", "prod2", "qa"]
+    assert registro.resolver("sesiones en prod") == ["prod1", "prod2"]
+    assert registro.resolver("sesiones en la base ventas") == ["prod2"]
+    assert registro.resolver("sesiones en prod1 y qa") == ["prod1", "qa"]
+    # Una palabra suelta no redirige la consulta
+    assert registro.resolver("ventas por usuario") == []
+    assert RegistroDestinos(motor=object()).resolver("sesiones en prod") == []
+
+def test_ejecutar_en_combina_respuestas_y_errores():
+    registro = _registro()
+
+    class _Ejecutor:
+        def __init__(self, nombre):
+            self.nombre = nombre
+
+        async def ejecutar_sql(self, sql, **kwargs):
+            if self.nombre == "qa":
+                raise Exception("ORA-01017: invalid username/password")
+            return ResultadoConsulta(["N"], [(len(self.nombre),)])
+
+    registro.ejecutor = _Ejecutor
+    resultado = asyncio.run(registro.ejecutar_en("SELECT COUNT(*) n FROM v$session", ["prod1", "qa"], timeout_ms=1000))
+    assert list(resultado.filas) == [("prod1", 5)]
+    assert resultado.avisos == ["qa: ORA-01017: invalid username/password"]
+
+def test_destino_con_contrasena_en_claro_se_rechaza(monkeypatch):
+    with pytest.raises(ValueError, match="password_env"):
+        DestinoOracle.desde_dict("prod", {"dsn": "db1/orcl", "password": "secreto"})
+    monkeypatch.setenv("AGBD_TEST_PASSWORD", "desde_entorno")
+    destino = DestinoOracle.desde_dict("prod", {"dsn": "db1/orcl", "password_env": "AGBD_TEST_PASSWORD",
+                                                "etiquetas": ["PROD"]})
+    assert destino.password == "desde_entorno" and destino.etiquetas == ["prod"]
@@ -0,0 +1,76 @@
+# =============================================================================
+# ARCHIVO: tests/test_dos_fases.py
+# Descripción: Respuesta en dos fases: la exportación en paralelo nunca queda
+#              suelta si la solicitud falla o se cancela
+# =============================================================================
+
+import asyncio
+
+import pytest
+
+from agents.agent_master import AgentMaster
+from database.resultado import ResultadoConsulta
+
+RESULTADOS = ResultadoConsulta(["SID"], [(1,), (2,)])
+
+def _master(monkeypatch, estado: dict) -> AgentMaster:
+    master = AgentMaster()
+
+    async def analizar(*args):
+        await asyncio.sleep(0.01)
+        return {"exito": True, "analisis": "todo bien"}
+
+    async def exportar(*args):
+        try:
+            await asyncio.sleep(0.2)
+            estado["exportacion"] = "terminada"
+        except asyncio.CancelledError:
+            estado["exportacion"] = "cancelada"
+            raise
+
+    monkeypatch.setattr(master, "_analizar_con_medicion", analizar)
+    monkeypatch.setattr(master, "_exportar_con_aviso", exportar)
+    return master
+
+async def _enviar(texto):
+    return 1
+
+async def _documento(*args):
+    return None
+
+def test_exportacion_se_espera_si_todo_va_bien(monkeypatch):
+    estado = {}
+    master = _master(monkeypatch, estado)
+
+    async def editar(mensaje_id, texto):
+        return None
+
+    respuesta = asyncio.run(master._responder_en_dos_fases(
+        RESULTADOS, "SELECT 1", "sesiones", _enviar, editar, {}, _documento
+    ))
+    assert respuesta["exito"] and estado["exportacion"] == "terminada"
+
+def test_exportacion_se_cancela_si_falla_la_respuesta(monkeypatch):
+    estado = {}
+    master = _master(monkeypatch, estado)
+    enviados = []
+
+    async def editar(mensaje_id, texto):
+        raise RuntimeError("sin red")
+
+    async def enviar(texto):
+        enviados.append(texto)
+        if len(enviados) > 1:
+            # El reenvío del análisis tampoco sale: la solicitud falla
+            raise RuntimeError("sin red")
+        return 1
+
+    async def responder():
+        with pytest.raises(RuntimeError):
+            await master._responder_en_dos_fases(RESULTADOS, "SELECT 1", "sesiones", enviar, editar, {}, _documento)
+        # Al volver, la tarea de exportación ya terminó (cancelada), no sigue en el loop
+        pendientes = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return pendientes
+
+    assert asyncio.run(responder()) == []
+    assert estado["exportacion"] == "cancelada"
@@ -0,0 +1,33 @@
+# =============================================================================
+# ARCHIVO: tests/test_exportacion.py
+# Descripción: Detección del formato pedido y escritura de archivos exportados
+# =============================================================================
+
+import csv
+
+from database import exportacion
+from database.exportacion import detectar_formato, escribir_filas
+
+def test_detectar_formato():
+    assert detectar_formato("exporta las sesiones") == "csv"
+    assert detectar_formato("sesiones en excel") == "xlsx"
+    assert detectar_formato("descarga comprimido") == "csv.gz"
+    # "archivo" suelto es vocabulario de Oracle, no una petición de exportación
+    assert detectar_formato("modo archivo de la base") is None
+
+def test_escribir_filas_csv(tmp_path):
+    archivo = escribir_filas(["SID", "USERNAME"], [(1, "SCOTT"), (2, None)], "csv", str(tmp_path), 1)
+    try:
+        with open(archivo.ruta, encoding="utf-8-sig", newline="") as f:
+            assert list(csv.reader(f)) == [["SID", "USERNAME"], ["1", "SCOTT"], ["2", ""]]
+        assert archivo.formato == "csv" and archivo.filas == 2 and archivo.vista_previa == [(1, "SCOTT")]
+    finally:
+        archivo.eliminar()
+
+def test_excel_sin_openpyxl_se_entrega_en_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(exportacion, "Workbook", None)
+    archivo = escribir_filas(["SID"], [(1,)], "xlsx", str(tmp_path))
+    try:
+        assert archivo.formato == "csv" and archivo.nombre.endswith(".csv")
+    finally:
+        archivo.eliminar()
@@ -0,0 +1,66 @@
+# =============================================================================
+# ARCHIVO: tests/test_limitador_tasa.py
+# Descripción: Token bucket del gateway LLM: ráfagas, recarga, esperas
+#              reservadas por adquirir() e intentar() sin bloquear
+# =============================================================================
+
+import asyncio
+
+import pytest
+
+from services import llm_gateway
+from services.llm_gateway import LimitadorTasa
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(llm_gateway.time, "monotonic", reloj)
+    return reloj
+
+def test_rafaga_y_recarga(reloj):
+    limitador = LimitadorTasa(tasa=2, capacidad=3)
+    assert [limitador.intentar() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Cubo vacío: el siguiente token llega en 1/tasa segundos y no se consume nada
+    assert limitador.intentar() == pytest.approx(0.5)
+    assert limitador.intentar() == pytest.approx(0.5)
+    reloj.ahora += 0.25
+    assert limitador.intentar() == pytest.approx(0.25)
+    reloj.ahora += 0.25
+    assert limitador.intentar() == 0.0
+    # La recarga no supera la capacidad aunque pase mucho tiempo
+    reloj.ahora += 60
+    assert [limitador.intentar() for _ in range(4)][-1] == pytest.approx(0.5)
+
+def test_reservar_encola_esperas_crecientes(reloj):
+    limitador = LimitadorTasa(tasa=4, capacidad=1)
+    # Cada reserva se apunta aunque no haya token: las esperas se escalonan
+    assert [limitador._reservar() for _ in range(4)] == pytest.approx([0.0, 0.25, 0.5, 0.75])
+    assert limitador.intentar() == pytest.approx(1.0)
+
+def test_adquirir_duerme_lo_reservado(reloj, monkeypatch):
+    esperas = []
+
+    async def dormir(segundos):
+        esperas.append(segundos)
+
+    monkeypatch.setattr(llm_gateway.asyncio, "sleep", dormir)
+    limitador = LimitadorTasa(tasa=10, capacidad=2)
+
+    async def escenario():
+        for _ in range(4):
+            await limitador.adquirir()
+
+    asyncio.run(escenario())
+    assert esperas == pytest.approx([0.1, 0.2])
+
+def test_tasa_cero_desactiva_el_limite(reloj):
+    limitador = LimitadorTasa(tasa=0, capacidad=0)
+    assert all(limitador.intentar() == 0.0 for _ in range(100))
+    asyncio.run(limitador.adquirir())
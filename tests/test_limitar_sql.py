@@ -0,0 +1,93 @@
+# =============================================================================
+# ARCHIVO: tests/test_limitar_sql.py
+# Descripción: Envoltorio FETCH FIRST del presupuesto de filas y su bind
+# =============================================================================
+
+from contextlib import contextmanager
+
+import oracledb
+
+from database.oracle_executor import OracleExecutor, TokenCancelacion, limitar_sql
+
+def test_limitar_sql_envuelve_consultas():
+    sql = "SELECT sid, username FROM v$session"
+    assert limitar_sql(sql) == f"SELECT * FROM (\n{sql}\n) FETCH FIRST :agbd_limite ROWS ONLY"
+    assert limitar_sql("  with t as (select 1 x from dual) select * from t").endswith(
+        "FETCH FIRST :agbd_limite ROWS ONLY")
+
+def test_limitar_sql_respeta_limites_y_no_consultas():
+    for sql in (
+        "SELECT * FROM v$session FETCH FIRST 10 ROWS ONLY",
+        "select * from v$session offset 5 rows fetch next 5 rows only",
+        "SELECT * FROM v$session WHERE ROWNUM <= 10",
+        "UPDATE t SET x = 1",
+        "BEGIN dbms_stats.gather_schema_stats('HR'); END;",
+        "SELECTION",
+    ):
+        assert limitar_sql(sql) == sql
+
+class _Cursor:
+    def __init__(self, filas, falla_envuelta=False):
+        self.filas = filas
+        self.falla_envuelta = falla_envuelta
+        self.ejecutadas = []
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, binds):
+        self.ejecutadas.append((sql, dict(binds)))
+        if self.falla_envuelta and "agbd_limite" in sql:
+            raise oracledb.DatabaseError("ORA-00918: column ambiguously defined")
+        self.description = [("SID",)]
+
+    def fetchmany(self, n):
+        return self.filas[:n]
+
+class _Pool:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @contextmanager
+    def conexion(self):
+        pool = self
+
+        class _Conexion:
+            call_timeout = 0
+
+            def cursor(self):
+                return pool.cursor
+
+        yield _Conexion()
+
+def _ejecutar(cursor, sql, limitar=True, parametros=None):
+    ejecutor = OracleExecutor(pool=_Pool(cursor), motor=object())
+    return ejecutor._ejecutar_bloqueante(sql, 1000, 3, limitar, TokenCancelacion(), parametros)
+
+def test_bind_de_limite_es_presupuesto_mas_uno():
+    cursor = _Cursor([(i,) for i in range(4)])
+    resultado = _ejecutar(cursor, "SELECT sid FROM v$session WHERE username = :u", parametros={"u": "HR"})
+    sql, binds = cursor.ejecutadas[0]
+    assert "FETCH FIRST :agbd_limite" in sql
+    # Una fila más que el presupuesto para saber si quedan filas sin leer
+    assert binds == {"u": "HR", "agbd_limite": 4}
+    assert len(resultado) == 3 and resultado.hay_mas
+
+def test_sin_limitar_no_hay_bind():
+    cursor = _Cursor([(1,), (2,)])
+    resultado = _ejecutar(cursor, "SELECT sid FROM v$session", limitar=False)
+    assert cursor.ejecutadas == [("SELECT sid FROM v$session", {})]
+    assert len(resultado) == 2 and not resultado.hay_mas
+
+def test_columnas_repetidas_se_ejecutan_sin_envolver():
+    cursor = _Cursor([(i,) for i in range(10)], falla_envuelta=True)
+    sql = "SELECT * FROM v$session s JOIN v$process p ON p.addr = s.paddr"
+    resultado = _ejecutar(cursor, sql)
+    assert [s for s, _ in cursor.ejecutadas][1] == sql
+    assert cursor.ejecutadas[1][1] == {}
+    # El presupuesto lo sigue aplicando fetchmany
+    assert len(resultado) == 3 and resultado.hay_mas
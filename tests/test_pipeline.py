@@ -0,0 +1,150 @@
+# =============================================================================
+# ARCHIVO: tests/test_pipeline.py
+# Descripción: Motor de etapas (DAG): dependencias, exclusiones, corte por
+#              respuesta, etapas opcionales, plazos y ejecución especulativa
+# =============================================================================
+
+import asyncio
+import time
+
+import pytest
+
+from agents.pipeline import Etapa, ErrorEtapa, Pipeline
+
+def _correr(pipeline: Pipeline, contexto=None) -> dict:
+    return asyncio.run(pipeline.ejecutar(dict(contexto or {})))
+
+def _etapa(registro: list, nombre: str, salida: dict, espera: float = 0.0):
+    async def funcion(ctx):
+        registro.append(("inicio", nombre))
+        await asyncio.sleep(espera)
+        registro.append(("fin", nombre))
+        return dict(salida)
+    return funcion
+
+def test_dependencias_en_orden_e_independientes_en_paralelo():
+    registro = []
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("a", _etapa(registro, "a", {"x": 1}, 0.1), produce=["x"]))
+    pipeline.registrar(Etapa("b", _etapa(registro, "b", {"y": 2}, 0.1), produce=["y"]))
+    pipeline.registrar(Etapa("c", _etapa(registro, "c", {"respuesta": "ok"}), produce=["respuesta"],
+                             requiere=["x", "y"]))
+    inicio = time.perf_counter()
+    contexto = _correr(pipeline)
+    assert contexto["respuesta"] == "ok"
+    # a y b a la vez: ~0.1 s, no 0.2 s
+    assert time.perf_counter() - inicio < 0.18
+    assert registro.index(("inicio", "c")) > max(registro.index(("fin", "a")), registro.index(("fin", "b")))
+
+def test_solo_se_publica_lo_declarado_en_produce():
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("a", _etapa([], "a", {"x": 1, "intruso": 2}), produce=["x"]))
+    contexto = _correr(pipeline)
+    assert contexto["x"] == 1 and "intruso" not in contexto
+
+def test_excluye_y_entradas_imposibles_omiten_la_etapa():
+    registro = []
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("router", _etapa(registro, "router", {"consulta": "q"}), produce=["consulta", "nada"]))
+    pipeline.registrar(Etapa("generador", _etapa(registro, "generador", {"sql": "s"}), produce=["sql"],
+                             excluye=["consulta"]))
+    # "nada" nunca se produce: la etapa que la necesita se descarta sin bloquear la ejecución
+    pipeline.registrar(Etapa("huerfana", _etapa(registro, "huerfana", {}), produce=[], requiere=["nada"]))
+    pipeline.registrar(Etapa("plan", _etapa(registro, "plan", {"plan": 1}), produce=["plan"],
+                             requiere_alguna=["consulta", "sql"]))
+    contexto = _correr(pipeline)
+    nombres = {n for _, n in registro}
+    assert contexto["plan"] == 1
+    assert "generador" not in nombres and "huerfana" not in nombres
+
+def test_despues_y_condicion():
+    registro = []
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("lenta", _etapa(registro, "lenta", {"a": 1}, 0.05), produce=["a"]))
+    pipeline.registrar(Etapa("segunda", _etapa(registro, "segunda", {"b": 1}), produce=["b"], despues=["lenta"]))
+    pipeline.registrar(Etapa("nunca", _etapa(registro, "nunca", {"c": 1}), produce=["c"],
+                             condicion=lambda ctx: ctx.get("activar", False)))
+    contexto = _correr(pipeline)
+    assert registro.index(("inicio", "segunda")) > registro.index(("fin", "lenta"))
+    assert "c" not in contexto
+
+def test_la_respuesta_cancela_el_resto():
+    cancelada = []
+
+    async def lenta(ctx):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelada.append(True)
+            raise
+
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("lenta", lenta, produce=["x"]))
+    pipeline.registrar(Etapa("saludo", _etapa([], "saludo", {"respuesta": "hola"}), produce=["respuesta"]))
+
+    async def correr():
+        contexto = await pipeline.ejecutar({})
+        await asyncio.sleep(0)
+        return contexto
+
+    assert asyncio.run(correr())["respuesta"] == "hola"
+    assert cancelada == [True]
+
+def test_opcional_que_falla_no_aborta_y_obligatoria_si():
+    async def falla(ctx):
+        raise RuntimeError("caída")
+
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("extra", falla, produce=["extra"], opcional=True))
+    pipeline.registrar(Etapa("fin", _etapa([], "fin", {"respuesta": 1}), produce=["respuesta"],
+                             requiere_alguna=["extra", "base"]))
+    pipeline.registrar(Etapa("base", _etapa([], "base", {"base": 1}), produce=["base"]))
+    assert _correr(pipeline)["respuesta"] == 1
+
+    pipeline.registrar(Etapa("extra", falla, produce=["extra"]))
+    with pytest.raises(RuntimeError):
+        _correr(pipeline)
+
+def test_plazo_agotado():
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("lenta", _etapa([], "lenta", {}, 1.0), produce=["x"], timeout=0.05))
+    with pytest.raises(ErrorEtapa):
+        _correr(pipeline)
+
+def _pipeline_especulativa(registro: list, router_encuentra: bool, especular_tras: float = 0.0,
+                           espera_router: float = 0.1) -> Pipeline:
+    # El router decide si hay consulta predefinida; el generador se lanza a la vez por si no la hay
+    pipeline = Pipeline()
+    pipeline.registrar(Etapa("router", _etapa(registro, "router", {"consulta": "q"} if router_encuentra else {},
+                                              espera_router), produce=["consulta"]))
+    pipeline.registrar(Etapa("generador", _etapa(registro, "generador", {"sql": "generada"}, 0.1),
+                             produce=["sql"], excluye=["consulta"], especulativa=True,
+                             especular_tras=especular_tras))
+    return pipeline
+
+def test_especulacion_aprovechada_ahorra_la_espera():
+    registro = []
+    inicio = time.perf_counter()
+    contexto = _correr(_pipeline_especulativa(registro, router_encuentra=False))
+    assert contexto["sql"] == "generada"
+    # El generador corrió mientras decidía el router: ~0.1 s en vez de 0.2 s
+    assert time.perf_counter() - inicio < 0.17
+    assert registro.index(("inicio", "generador")) < registro.index(("fin", "router"))
+
+def test_especulacion_cancelada_si_gana_la_otra_rama():
+    registro = []
+    contexto = _correr(_pipeline_especulativa(registro, router_encuentra=True, espera_router=0.02))
+    assert contexto["consulta"] == "q" and "sql" not in contexto
+    assert ("fin", "generador") not in registro
+
+def test_especulacion_terminada_antes_de_decidir_se_retiene_y_descarta():
+    registro = []
+    contexto = _correr(_pipeline_especulativa(registro, router_encuentra=True, espera_router=0.2))
+    # Terminó antes que el router, pero su salida no se publica porque la rama perdió
+    assert ("fin", "generador") in registro
+    assert "sql" not in contexto
+
+def test_especular_tras_no_lanza_si_la_decision_llega_antes():
+    registro = []
+    _correr(_pipeline_especulativa(registro, router_encuentra=True, especular_tras=0.2, espera_router=0.02))
+    assert ("inicio", "generador") not in registro
@@ -0,0 +1,75 @@
+# =============================================================================
+# ARCHIVO: tests/test_plantillas.py
+# Descripción: Plantillas con variables bind: detección de binds, parámetros
+#              tipados, palabras que no son identificadores y validación
+# =============================================================================
+
+import pytest
+
+from agents.catalogo_consultas import CatalogoConsultas, ParametroPlantilla, variables_bind
+
+def test_variables_bind_ignora_literales_y_repeticiones():
+    sql = ("SELECT TO_CHAR(logon_time, 'HH24:MI:SS') FROM v$session "
+           "WHERE username = :Usuario AND inst_id = :inst AND 'a:b' <> :usuario")
+    assert variables_bind(sql) == ["inst", "usuario"]
+    assert variables_bind("SELECT 1 FROM dual") == []
+    # Comillas escapadas dentro del literal
+    assert variables_bind("SELECT 'it''s :no' FROM dual WHERE x = :si") == ["si"]
+
+def test_tipo_entero():
+    parametro = ParametroPlantilla("inst", {"tipo": "entero", "extraer": r"instancia\s+(\S+)"})
+    assert parametro.extraer("estado de la instancia 2") == 2
+    with pytest.raises(ValueError):
+        parametro.extraer("estado de la instancia dos")
+    with pytest.raises(ValueError):
+        parametro.convertir("1" * 19)
+
+def test_tipo_identificador_en_mayusculas_y_validado():
+    parametro = ParametroPlantilla("usuario", {"tipo": "identificador", "extraer": [r"usuario\s+(\S+)"]})
+    assert parametro.extraer("sesiones del usuario scott") == "SCOTT"
+    assert parametro.convertir("app_user$1") == "APP_USER$1"
+    for invalido in ("1abc", "x' OR '1'='1", "a" * 129):
+        with pytest.raises(ValueError):
+            parametro.convertir(invalido)
+
+def test_palabras_de_la_pregunta_no_son_identificadores():
+    parametro = ParametroPlantilla("usuario", {"tipo": "identificador", "extraer": [r"usuario\s+(\w+)"],
+                                              "excluir": ["Sistema"]})
+    with pytest.raises(ValueError):
+        parametro.extraer("sesiones del usuario actual")
+    with pytest.raises(ValueError):
+        parametro.extraer("sesiones del usuario sistema")
+    # Se prueban todas las capturas: la primera es una palabra vacía, la segunda vale
+    assert parametro.extraer("usuario con mas sesiones: usuario hr") == "HR"
+
+def test_defecto_texto_y_tipo_invalido():
+    parametro = ParametroPlantilla("filtro", {"extraer": [r"programa\s+(\S+)"], "defecto": "%", "max_longitud": 10})
+    assert parametro.extraer("sesiones activas") == "%"
+    assert parametro.extraer("programa sqlplus") == "sqlplus"
+    with pytest.raises(ValueError):
+        parametro.extraer("programa demasiado_largo")
+    with pytest.raises(ValueError):
+        ParametroPlantilla("x", {"tipo": "fecha"})
+
+def test_binds_y_parametros_declarados_deben_coincidir():
+    with pytest.raises(ValueError, match="no coinciden"):
+        CatalogoConsultas.desde_dict({"consultas": {"mal": {
+            "patrones": ["x"], "sql": "SELECT * FROM v$session WHERE sid = :sid", "parametros": {},
+        }}})
+
+def test_extraer_parametros_del_catalogo():
+    catalogo = CatalogoConsultas.desde_dict({"consultas": {"sesiones_usuario": {
+        "patrones": ["sesiones del usuario"],
+        "sql": "SELECT * FROM gv$session WHERE username = :usuario AND inst_id = :inst",
+        "parametros": {
+            "usuario": {"tipo": "identificador", "extraer": [r"usuario\s+(\w+)"]},
+            "INST": {"tipo": "entero", "extraer": [r"instancia\s+(\d+)"], "defecto": 1},
+        },
+    }}})
+    consulta = catalogo.obtener("sesiones_usuario")
+    # Los acentos se quitan antes de extraer
+    assert catalogo.extraer_parametros(consulta, "sesiones del usuario José en la instancia 2") == \
+        {"usuario": "JOSE", "inst": 2}
+    assert catalogo.extraer_parametros(consulta, "sesiones del usuario hr") == {"usuario": "HR", "inst": 1}
+    assert catalogo.extraer_parametros(consulta, "sesiones del usuario actual") is None
+    assert catalogo.extraer_parametros(consulta, "sesiones de alguien") is None
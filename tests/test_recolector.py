@@ -0,0 +1,100 @@
+# =============================================================================
+# ARCHIVO: tests/test_recolector.py
+# Descripción: Recolector de monitoreo: todos los procesos muestrean y solo el
+#              que tiene el archivo de bloqueo emite las alertas
+# =============================================================================
+
+from config.settings import Config
+from database.resultado import ResultadoConsulta
+from services.recolector import RecolectorMonitoreo, describir_ventana, detectar_ventana
+
+CONFIG = {
+    "muestreo": {
+        "claves": ["INST_ID", "RESOURCE_NAME"],
+        "metricas": ["CURRENT_UTILIZATION"],
+        "alerta": {"valor": "CURRENT_UTILIZATION", "limite": "LIMIT_VALUE"},
+    },
+    "umbrales": {"aviso_pct": 80, "critico_pct": 95},
+}
+COLUMNAS = ["INST_ID", "RESOURCE_NAME", "CURRENT_UTILIZATION", "LIMIT_VALUE"]
+
+def _muestra(recolector: RecolectorMonitoreo, uso: int):
+    resultado = ResultadoConsulta(COLUMNAS, [(1, "sessions", uso, "100"), (1, "processes", 10, "UNLIMITED")])
+    recolector._registrar_series("procesos_sesiones", CONFIG, resultado)
+
+def test_todos_muestrean_y_solo_el_designado_alerta(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RECOLECTOR_BLOQUEO", str(tmp_path / "recolector.lock"))
+    enviadas = {"a": [], "b": []}
+    a = RecolectorMonitoreo(None, None, capacidad=10, notificar=enviadas["a"].append)
+    b = RecolectorMonitoreo(None, None, capacidad=10, notificar=enviadas["b"].append)
+
+    for uso in (50, 85, 97):
+        _muestra(a, uso)
+        _muestra(b, uso)
+
+    # Ambos almacenes tienen la serie completa para responder tendencias
+    for recolector in (a, b):
+        _, valores = recolector.almacen.ventana("procesos_sesiones", "CURRENT_UTILIZATION", "1/sessions", 0)
+        assert valores == [50.0, 85.0, 97.0]
+    assert len(enviadas["a"]) == 2 and "AVISO" in enviadas["a"][0] and "CRITICO" in enviadas["a"][1]
+    assert enviadas["b"] == []
+
+    # Al morir el designado el otro hereda el bloqueo sin repetir la alerta ya activa
+    a._archivo_bloqueo.close()
+    _muestra(b, 97)
+    assert enviadas["b"] == []
+    _muestra(b, 20)
+    assert len(enviadas["b"]) == 1 and "Recuperado" in enviadas["b"][0]
+
+def test_sin_archivo_de_bloqueo_todos_alertan(monkeypatch):
+    monkeypatch.setattr(Config, "RECOLECTOR_BLOQUEO", "")
+    enviadas = []
+    a = RecolectorMonitoreo(None, None, capacidad=10, notificar=enviadas.append)
+    b = RecolectorMonitoreo(None, None, capacidad=10, notificar=enviadas.append)
+    _muestra(a, 99)
+    _muestra(b, 99)
+    assert len(enviadas) == 2
+
+def test_detectar_y_describir_ventana():
+    assert detectar_ventana("sesiones de los ultimos 30 minutos") == 1800
+    assert detectar_ventana("uso en la ultima hora") == 3600
+    assert detectar_ventana("cuantas sesiones hay") is None
+    assert describir_ventana(1800) == "30 min"
+    assert describir_ventana(7200) == "2 h"
+    assert describir_ventana(45) == "45 s"
+
+class _CursorLista:
+    def __init__(self, filas):
+        self._filas = filas
+        self.description = [("SID",)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql):
+        pass
+
+    def fetchmany(self, cantidad):
+        return self._filas[:cantidad]
+
+class _ConexionLista:
+    def __init__(self, filas):
+        self._filas = filas
+
+    def cursor(self):
+        return _CursorLista(self._filas)
+
+def test_muestra_cortada_marca_hay_mas(monkeypatch):
+    monkeypatch.setattr(Config, "ORACLE_MAX_FILAS", 2)
+    recolector = RecolectorMonitoreo(None, None, capacidad=10)
+    config = {"sql": "SELECT sid FROM v$session", "muestreo": {}}
+
+    recolector._muestrear_consulta(_ConexionLista([(1,), (2,), (3,)]), "sesiones", config)
+    muestra = recolector._instantaneas["sesiones"]
+    assert muestra.filas == [(1,), (2,)] and muestra.hay_mas and muestra.describir_tamano() == "más de 2 filas"
+
+    recolector._muestrear_consulta(_ConexionLista([(1,), (2,)]), "sesiones", config)
+    assert not recolector._instantaneas["sesiones"].hay_mas
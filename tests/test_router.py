@@ -0,0 +1,87 @@
+# =============================================================================
+# ARCHIVO: tests/test_router.py
+# Descripción: Router local de intenciones (TF-IDF de n-gramas): umbral de
+#              confianza, margen frente al segundo candidato y vocabulario
+# =============================================================================
+
+import asyncio
+
+import pytest
+
+from agents.agent_router import AgentRouterIntenciones, IndiceIntenciones, raiz
+from agents.catalogo_consultas import CatalogoConsultas
+from benchmarks.bench_router import CASOS
+from config.settings import Config
+
+CATALOGO = {"consultas": {
+    "procesos_sesiones": {"patrones": ["sesiones disponibles", "limite de procesos"], "sql": "SELECT 1 FROM dual"},
+    "estado_bd": {"patrones": ["estado de la base de datos"], "sql": "SELECT 2 FROM dual"},
+    "sesiones_usuario": {
+        "patrones": ["sesiones del usuario"],
+        "sql": "SELECT * FROM v$session WHERE username = :usuario",
+        "parametros": {"usuario": {"tipo": "identificador", "extraer": ["usuario\\s+(\\w+)"]}},
+    },
+}}
+
+def _router(umbral=None, datos=CATALOGO) -> AgentRouterIntenciones:
+    return AgentRouterIntenciones(CatalogoConsultas.desde_dict(datos), umbral=umbral)
+
+def _enrutar(router: AgentRouterIntenciones, texto: str) -> dict:
+    return asyncio.run(router.process({"texto": texto}))
+
+def test_raiz_singulariza():
+    assert raiz("sesiones") == raiz("sesion") == "sesion"
+    assert raiz("activas") == "activa"
+    assert raiz("bd") == "bd"
+
+def test_candidatos_uno_por_consulta_y_ordenados():
+    indice = IndiceIntenciones([("sesiones disponibles", "a"), ("sesiones libres", "a"), ("estado general", "b")])
+    candidatos = indice.candidatos("sesiones disponibles")
+    assert [etiqueta for etiqueta, _ in candidatos] == ["a"]
+    assert candidatos[0][1] == pytest.approx(1.0)
+    assert indice.candidatos("xyz") == []
+
+def test_palabras_ajenas_bajan_la_confianza():
+    indice = IndiceIntenciones([("sesiones disponibles", "a")])
+    exacta = indice.buscar("sesiones disponibles")[1]
+    con_ruido = indice.buscar("sesiones disponibles en el datawarehouse nocturno")[1]
+    assert con_ruido < exacta
+
+def test_motivo_descarte():
+    indice = IndiceIntenciones([("sesiones disponibles", "a"), ("estado de la instancia", "b")])
+    assert indice.motivo_descarte("sesiones disponibles", "a") is None
+    assert indice.motivo_descarte("que tal esta la bd", "a") == "sin palabras en común"
+    assert indice.motivo_descarte("sesiones disponibles en la instancia", "a") == "nombra instancia de otra consulta"
+
+def test_pregunta_exacta_se_resuelve_en_local():
+    respuesta = _enrutar(_router(), "Sesiones disponibles")
+    assert respuesta["tipo"] == "predefinida" and respuesta["nombre_consulta"] == "procesos_sesiones"
+    assert respuesta["confianza"] >= Config.ROUTER_UMBRAL
+
+def test_por_debajo_del_umbral_va_al_generador():
+    respuesta = _enrutar(_router(umbral=1.01), "sesiones disponibles")
+    assert respuesta["tipo"] == "personalizada"
+
+def test_empate_dentro_del_margen_va_al_generador():
+    datos = {"consultas": {
+        "uno": {"patrones": ["sesiones bloqueadas"], "sql": "SELECT 1 FROM dual"},
+        "dos": {"patrones": ["bloqueos de sesiones"], "sql": "SELECT 2 FROM dual"},
+    }}
+    router = _router(datos=datos)
+    (_, primera), (_, segunda) = router._obtener_indice().candidatos("sesiones bloqueadas por bloqueos")
+    assert primera >= router.umbral and primera - segunda < router.margen
+    assert _enrutar(router, "sesiones bloqueadas por bloqueos")["tipo"] == "personalizada"
+    # Sin rival cercano la misma consulta sí se resuelve
+    assert _enrutar(router, "sesiones bloqueadas")["nombre_consulta"] == "uno"
+
+def test_plantilla_con_y_sin_parametro():
+    router = _router()
+    respuesta = _enrutar(router, "sesiones del usuario scott")
+    assert respuesta["nombre_consulta"] == "sesiones_usuario" and respuesta["parametros"] == {"usuario": "SCOTT"}
+    # "actual" no es un nombre de usuario: sin valor la plantilla no aplica
+    assert _enrutar(router, "sesiones del usuario actual")["tipo"] == "personalizada"
+
+@pytest.mark.parametrize("pregunta, esperada", CASOS)
+def test_casos_de_regresion_con_el_catalogo_real(pregunta, esperada):
+    router = AgentRouterIntenciones(CatalogoConsultas(Config.CATALOGO_CONSULTAS_RUTA))
+    assert _enrutar(router, pregunta).get("nombre_consulta") == esperada
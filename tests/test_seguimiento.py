@@ -0,0 +1,122 @@
+# =============================================================================
+# ARCHIVO: tests/test_seguimiento.py
+# Descripción: Refinamiento local del último resultado (orden, top-N, filtros,
+#              agrupación y páginas) sin volver a Oracle
+# =============================================================================
+
+import asyncio
+
+from agents.agent_seguimiento import AgentSeguimiento, ordenar_indices
+from cache.sesiones import CacheSesiones
+from database.resultado import ResultadoConsulta
+
+COLUMNAS = ["RESOURCE_NAME", "CURRENT_UTILIZATION", "LIMIT_VALUE"]
+FILAS = [
+    ("processes", 120, "300"),
+    ("sessions", None, "472"),
+    ("transactions", 5, "UNLIMITED"),
+    ("enqueue_locks", 80, None),
+]
+
+def _agente() -> AgentSeguimiento:
+    agente = AgentSeguimiento(CacheSesiones(10, 600))
+    agente.recordar(1, ResultadoConsulta(COLUMNAS, list(FILAS)), "SELECT ...", "limites de recursos")
+    return agente
+
+def _preguntar(agente: AgentSeguimiento, texto: str) -> dict:
+    return asyncio.run(agente.process({"chat_id": 1, "texto": texto}))
+
+def _columna(respuesta: dict, nombre: str) -> list:
+    return respuesta["resultados"].columna(nombre)
+
+def test_orden_ascendente_deja_nulos_al_final():
+    valores = [3, None, 1, 2]
+    assert ordenar_indices([0, 1, 2, 3], valores, descendente=False) == [2, 3, 0, 1]
+
+def test_orden_descendente_deja_nulos_al_final():
+    valores = [3, None, 1, 2]
+    assert ordenar_indices([0, 1, 2, 3], valores, descendente=True) == [0, 3, 2, 1]
+
+def test_tipos_mezclados_numeros_antes_que_texto_en_ambos_sentidos():
+    # LIMIT_VALUE: cifras como texto, 'UNLIMITED' y NULL en la misma columna
+    valores = ["300", "UNLIMITED", None, "472", "abc"]
+    assert ordenar_indices(list(range(5)), valores, descendente=False) == [0, 3, 4, 1, 2]
+    assert ordenar_indices(list(range(5)), valores, descendente=True) == [3, 0, 1, 4, 2]
+
+def test_top_por_uso_no_devuelve_la_fila_nula():
+    respuesta = _preguntar(_agente(), "top 2 por uso")
+    assert respuesta["exito"]
+    assert _columna(respuesta, "CURRENT_UTILIZATION") == [120, 80]
+
+def test_ordenar_descendente_y_ascendente_con_nulos():
+    agente = _agente()
+    descendente = _preguntar(agente, "ordena por uso de mayor a menor")
+    assert _columna(descendente, "CURRENT_UTILIZATION")[-1] is None
+    ascendente = _preguntar(agente, "ordena por uso ascendente")
+    assert _columna(ascendente, "CURRENT_UTILIZATION") == [5, 80, 120, None]
+
+def test_menores_por_limite_ordena_cifras_en_texto_como_numeros():
+    respuesta = _preguntar(_agente(), "2 menores por limite")
+    assert _columna(respuesta, "LIMIT_VALUE") == ["300", "472"]
+
+def test_pedir_datos_nuevos_no_se_resuelve_en_local():
+    assert not _preguntar(_agente(), "actualiza los datos")["exito"]
+
+def test_sin_sesion_no_aplica():
+    agente = AgentSeguimiento(CacheSesiones(10, 600))
+    assert not asyncio.run(agente.process({"chat_id": 2, "texto": "top 2 por uso"}))["exito"]
+
+# Resultado más largo (12 filas, dos instancias) para filtros, agrupación y páginas
+RECURSOS = ["processes", "sessions", "transactions", "enqueue_locks", "dml_locks", "ges_procs"]
+FILAS_RAC = [(inst, recurso, inst * 10 + k, "500") for inst in (1, 2) for k, recurso in enumerate(RECURSOS)]
+
+def _agente_rac(hay_mas: bool = False) -> AgentSeguimiento:
+    agente = AgentSeguimiento(CacheSesiones(10, 600))
+    resultado = ResultadoConsulta(["INST_ID", "RESOURCE_NAME", "CURRENT_UTILIZATION", "LIMIT_VALUE"],
+                                  list(FILAS_RAC), hay_mas=hay_mas)
+    agente.recordar(1, resultado, "SELECT ...", "recursos")
+    return agente
+
+def test_filtro_por_columna_y_comparacion():
+    agente = _agente_rac()
+    respuesta = _preguntar(agente, "solo instancia 2")
+    assert set(_columna(respuesta, "INST_ID")) == {2}
+    assert "Filas 1–5 de 6" in respuesta["encabezado"]
+    # Los filtros se acumulan sobre la vista actual
+    respuesta = _preguntar(agente, "filtra uso mayor que 23")
+    assert _columna(respuesta, "CURRENT_UTILIZATION") == [24, 25]
+
+def test_filtro_por_valor_sin_columna():
+    respuesta = _preguntar(_agente_rac(), "solo sessions")
+    assert _columna(respuesta, "RESOURCE_NAME") == ["sessions", "sessions"]
+    # Un valor que no está en ninguna columna no es un seguimiento: pregunta nueva
+    assert not _preguntar(_agente_rac(), "solo tablespaces")["exito"]
+
+def test_agrupar_suma_columnas_numericas_y_no_identificadores():
+    agente = _agente_rac()
+    resultados = _preguntar(agente, "agrupa por instancia")["resultados"]
+    assert resultados.columnas == ["INST_ID", "FILAS", "SUMA_CURRENT_UTILIZATION", "SUMA_LIMIT_VALUE"]
+    assert sorted(resultados.filas) == [(1, 6, 75.0, 3000.0), (2, 6, 135.0, 3000.0)]
+    # Sobre un agrupado no se ordena ni filtra: vuelve al flujo normal
+    assert not _preguntar(agente, "ordena por uso")["exito"]
+
+def test_paginas_y_restablecer():
+    agente = _agente_rac()
+    assert _columna(_preguntar(agente, "mas"), "CURRENT_UTILIZATION") == [15, 20, 21, 22, 23]
+    assert "Filas 11–12 de 12" in _preguntar(agente, "pagina 3")["encabezado"]
+    assert _columna(_preguntar(agente, "anterior"), "CURRENT_UTILIZATION")[0] == 15
+    _preguntar(agente, "solo instancia 1")
+    respuesta = _preguntar(agente, "quita los filtros")
+    assert "Filas 1–5 de 12" in respuesta["encabezado"]
+
+def test_resultado_cortado_no_se_reordena_en_local():
+    agente = _agente_rac(hay_mas=True)
+    # Ordenar o filtrar solo lo leído daría una respuesta falsa: se vuelve a la base
+    assert not _preguntar(agente, "ordena por uso desc")["exito"]
+    assert not _preguntar(agente, "solo instancia 2")["exito"]
+    # Paginar lo leído sí, avisando de que el resultado se cortó
+    respuesta = _preguntar(agente, "pagina 3")
+    assert respuesta["exito"] and "se cortó en 12 filas" in respuesta["encabezado"]
+
+def test_columna_desconocida_no_aplica():
+    assert not _preguntar(_agente_rac(), "ordena por tamano")["exito"]
@@ -0,0 +1,55 @@
+# =============================================================================
+# ARCHIVO: tests/test_series_tiempo.py
+# Descripción: Buffers circulares, almacén de series y resumen de ventanas
+# =============================================================================
+
+import pytest
+
+from services.series_tiempo import AlmacenSeries, BufferCircular, resumir_ventana
+
+def test_buffer_vacio():
+    buffer = BufferCircular(3)
+    assert len(buffer) == 0
+    assert buffer.ultimo() is None
+    assert buffer.ventana(0) == ([], [])
+
+def test_buffer_da_la_vuelta_y_conserva_el_orden():
+    buffer = BufferCircular(3)
+    for t in range(1, 6):
+        buffer.agregar(float(t), t * 10.0)
+    # Solo quedan las tres últimas muestras, de la más antigua a la más reciente
+    assert len(buffer) == 3
+    assert buffer.ultimo() == (5.0, 50.0)
+    assert buffer.ventana(0) == ([3.0, 4.0, 5.0], [30.0, 40.0, 50.0])
+    assert buffer.ventana(4.0) == ([4.0, 5.0], [40.0, 50.0])
+    assert buffer.ventana(6.0) == ([], [])
+
+def test_resumir_ventana():
+    assert resumir_ventana([], []) is None
+    # Sube 1 unidad cada 30 s: 2 por minuto
+    resumen = resumir_ventana([0.0, 30.0, 60.0, 90.0], [10.0, 11.0, 12.0, 13.0])
+    assert resumen["muestras"] == 4
+    assert (resumen["primero"], resumen["ultimo"]) == (10.0, 13.0)
+    assert (resumen["minimo"], resumen["maximo"]) == (10.0, 13.0)
+    assert resumen["media"] == pytest.approx(11.5)
+    assert resumen["pendiente_min"] == pytest.approx(2.0)
+    assert (resumen["desde"], resumen["hasta"]) == (0.0, 90.0)
+
+def test_resumir_ventana_sin_pendiente():
+    assert resumir_ventana([5.0], [7.0])["pendiente_min"] == 0.0
+    # Mismo instante repetido: sin varianza temporal no hay pendiente
+    assert resumir_ventana([5.0, 5.0], [1.0, 9.0])["pendiente_min"] == 0.0
+    assert resumir_ventana([0.0, 60.0], [8.0, 2.0])["pendiente_min"] == pytest.approx(-6.0)
+
+def test_almacen_separa_series_por_consulta_metrica_y_clave():
+    almacen = AlmacenSeries(capacidad=2)
+    almacen.agregar("procesos_sesiones", "USADAS", "1/sessions", 1.0, 10.0)
+    almacen.agregar("procesos_sesiones", "USADAS", "2/sessions", 1.0, 20.0)
+    almacen.agregar("procesos_sesiones", "USADAS", "1/sessions", 2.0, 11.0)
+    almacen.agregar("procesos_sesiones", "USADAS", "1/sessions", 3.0, 12.0)
+    almacen.agregar("estado_bd", "ACTIVAS", "1", 1.0, 5.0)
+
+    assert almacen.series_de("procesos_sesiones") == [("USADAS", "1/sessions"), ("USADAS", "2/sessions")]
+    assert almacen.ventana("procesos_sesiones", "USADAS", "1/sessions", 0) == ([2.0, 3.0], [11.0, 12.0])
+    assert almacen.ventana("procesos_sesiones", "LIBRES", "1/sessions", 0) == ([], [])
+    assert almacen.estadisticas() == {"series": 3, "muestras": 4, "bytes": 3 * 2 * 16}
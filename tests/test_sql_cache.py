@@ -0,0 +1,51 @@
+# =============================================================================
+# ARCHIVO: tests/test_sql_cache.py
+# Descripción: Caché pregunta -> SQL (memoria + SQLite) y su uso desde el
+#              generador sin bloquear el event loop
+# =============================================================================
+
+import asyncio
+import threading
+
+from agents.agent_sql_generator import MODELO, VERSION_PROMPT, AgentSQLGenerator
+from cache.sql_cache import CacheSQL
+
+def test_guardar_obtener_e_invalidar_en_disco(tmp_path):
+    ruta = str(tmp_path / "sql.sqlite")
+    cache = CacheSQL(10, 60, ruta)
+    cache.guardar("cuantas sesiones", "m", "1", "SELECT COUNT(*) FROM v$session")
+
+    # Otro proceso (otra instancia) la encuentra en disco
+    otra = CacheSQL(10, 60, ruta)
+    assert otra.obtener("cuantas sesiones", "m", "1") == "SELECT COUNT(*) FROM v$session"
+    assert otra.estadisticas()["aciertos_disco"] == 1
+    assert otra.obtener("cuantas sesiones", "m", "2") is None
+
+    otra.invalidar("cuantas sesiones", "m", "1")
+    assert CacheSQL(10, 60, ruta).obtener("cuantas sesiones", "m", "1") is None
+
+def test_caducadas_no_se_devuelven(tmp_path):
+    cache = CacheSQL(10, -1, str(tmp_path / "sql.sqlite"))
+    cache.guardar("p", "m", "1", "SELECT 1 FROM dual")
+    assert cache.obtener("p", "m", "1") is None
+
+def test_operaciones_en_disco_fuera_del_loop(tmp_path):
+    generador = AgentSQLGenerator()
+    generador.cache = CacheSQL(10, 60, str(tmp_path / "sql.sqlite"))
+    hilos = []
+    guardar = generador.cache.guardar
+
+    def guardar_registrando(*args):
+        hilos.append(threading.get_ident())
+        guardar(*args)
+
+    generador.cache.guardar = guardar_registrando
+    resultado = {"sql": "SELECT 1 FROM dual", "pregunta_normalizada": "uno", "desde_cache": False}
+
+    async def confirmar():
+        await generador.confirmar(resultado)
+        return threading.get_ident()
+
+    hilo_loop = asyncio.run(confirmar())
+    assert hilos and hilos[0] != hilo_loop
+    assert generador.cache.obtener("uno", MODELO, VERSION_PROMPT) == "SELECT 1 FROM dual"